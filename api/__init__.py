@@ -0,0 +1,6 @@
+"""
+API HTTP sin Streamlit sobre el motor de chat y la transcripción.
+
+`api.server.app` es una aplicación ASGI que se puede servir con cualquier
+servidor ASGI, por ejemplo: `uvicorn api.server:app`.
+"""
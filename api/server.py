@@ -0,0 +1,428 @@
+"""
+Servidor ASGI que expone el motor de chat y la transcripción sin Streamlit.
+
+Rutas:
+    GET  /health                          Estado del servidor
+    POST /conversations                   Crea una conversación con su configuración (JSON)
+    GET  /conversations/{id}/messages     Mensajes de la conversación (?offset=&limit=)
+    POST /conversations/{id}/messages     Envía un mensaje ({"content": ...}); la respuesta
+                                          llega en streaming como Server-Sent Events
+    DELETE /conversations/{id}            Elimina la conversación
+    POST /transcriptions                  Transcribe el audio del cuerpo de la petición
+                                          (?model=&filename=&preprocess=)
+
+Los eventos SSE de un turno son `token` (fragmento de la respuesta), `tool`
+(progreso o resultado de una herramienta), `done` (respuesta final) y `error`.
+
+El historial de cada conversación se guarda en el almacén de `core.store`, por lo
+que cualquier proceso con el mismo almacén puede atender cualquier conversación.
+La API key de Groq se lee de `GROQ_API_KEY`.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from config.settings import (
+    API_MAX_BODY_BYTES,
+    API_MAX_WORKERS,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MODEL,
+    DEFAULT_SYSTEM_PROMPT,
+    DEFAULT_TEMPERATURE,
+    GENERATION_JOB_TTL,
+    MODELOS,
+    TRANSCRIPTION_PREPROCESS,
+    TRANSCRIPTION_SPOOL_MAX_MEMORY
+)
+from core.chat import (
+    EVENT_MESSAGES,
+    EVENT_PROGRESS,
+    EVENT_TEXT,
+    EVENT_TOOL,
+    build_completion_params,
+    clean_function_call_text,
+    clean_response_text,
+    get_agent,
+    prepare_history,
+    search_thinking,
+    should_summarize,
+    stream_agent_turn,
+    stream_completion
+)
+from core.store import ConversationNotFound, get_conversation_store
+from models.groq_client import get_groq_api_key, get_groq_client
+from utils.lazy_imports import is_available
+
+# Configuración de una conversación nueva; el cliente puede sobrescribir cualquier clave
+DEFAULT_CONVERSATION_CONFIG = {
+    "model": DEFAULT_MODEL,
+    "system_prompt": DEFAULT_SYSTEM_PROMPT,
+    "temperature": DEFAULT_TEMPERATURE,
+    "max_tokens": DEFAULT_MAX_TOKENS,
+    "memory": True,
+    "web_search": False,
+    "summarize_history": True
+}
+
+# Marca el final de los eventos de un turno
+_FIN = object()
+
+# Un turno a la vez por conversación, para que el historial no se mezcle. Cada cerrojo
+# vive mientras algún turno lo tiene o lo espera; después se elimina solo
+_conversation_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# Hilos para las llamadas bloqueantes al cliente de Groq (chat sin memoria y transcripciones)
+_executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix="api-groq")
+
+# Resúmenes del historial en curso por conversación, con el momento en que se lanzaron
+_summary_jobs: Dict[str, Tuple[Any, float]] = {}
+
+class HTTPError(Exception):
+    """Error que se devuelve al cliente con el código de estado indicado."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _chat_models() -> List[str]:
+    return MODELOS["Conversación"] + MODELOS["Razonamiento"]
+
+def conversation_config(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida la configuración recibida al crear una conversación y la completa con
+    los valores por defecto.
+
+    Args:
+        payload: La configuración enviada por el cliente
+
+    Returns:
+        La configuración completa
+    """
+    unknown = set(payload) - set(DEFAULT_CONVERSATION_CONFIG)
+    if unknown:
+        raise HTTPError(400, f"Opciones desconocidas: {', '.join(sorted(unknown))}")
+    config = {**DEFAULT_CONVERSATION_CONFIG, **payload}
+    if config["model"] not in _chat_models():
+        raise HTTPError(400, f"Modelo no disponible: {config['model']}")
+    try:
+        config["temperature"] = float(config["temperature"])
+        config["max_tokens"] = int(config["max_tokens"])
+    except (TypeError, ValueError):
+        raise HTTPError(400, "temperature y max_tokens deben ser numéricos")
+    return config
+
+def _web_search_available(config: Dict[str, Any]) -> bool:
+    if not config["web_search"]:
+        return False
+    return bool((os.getenv("TAVILY_API_KEY") and is_available("tavily")) or is_available("duckduckgo_search"))
+
+# --- Utilidades ASGI ---
+
+async def _read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > API_MAX_BODY_BYTES:
+            raise HTTPError(413, "Cuerpo de la petición demasiado grande")
+        if not message.get("more_body", False):
+            return bytes(body)
+
+async def _read_json(receive) -> Dict[str, Any]:
+    body = await _read_body(receive)
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "El cuerpo no es JSON válido")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "El cuerpo debe ser un objeto JSON")
+    return payload
+
+async def _send_json(send, status: int, payload: Any):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _start_sse(send):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")]
+    })
+
+async def _send_sse(send, event: str, data: Any):
+    payload = json.dumps(data, ensure_ascii=False)
+    await send({
+        "type": "http.response.body",
+        "body": f"event: {event}\ndata: {payload}\n\n".encode("utf-8"),
+        "more_body": True
+    })
+
+def _query(scope) -> Dict[str, str]:
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return {key: values[-1] for key, values in params.items()}
+
+def _query_int(params: Dict[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    if name not in params:
+        return default
+    try:
+        return max(int(params[name]), 0)
+    except ValueError:
+        raise HTTPError(400, f"{name} debe ser un entero")
+
+def _client():
+    client = get_groq_client(get_groq_api_key())
+    if client is None:
+        raise HTTPError(503, "No se ha configurado GROQ_API_KEY")
+    return client
+
+# --- Puente de eventos hacia el bucle del servidor ---
+
+async def _iter_events(start: Callable[[Callable[[tuple], None]], "asyncio.Future"]) -> AsyncIterator[tuple]:
+    """
+    Entrega en el bucle del servidor los eventos que emite una tarea que corre en
+    otro hilo o en otro bucle. `start(emit)` lanza la tarea y devuelve su futuro.
+    """
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    def emit(event: tuple):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    future = start(emit)
+    # Los eventos emitidos antes de terminar ya están programados, así que _FIN llega el último
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, _FIN))
+    while True:
+        event = await events.get()
+        if event is _FIN:
+            future.result()
+            return
+        yield event
+
+def _stateless_events(config: Dict[str, Any], content: str) -> AsyncIterator[tuple]:
+    client = _client()
+    messages = [
+        {"role": "system", "content": config["system_prompt"]},
+        {"role": "user", "content": content}
+    ]
+    params = build_completion_params(
+        messages, config["model"], config["temperature"], config["max_tokens"],
+        reasoning_format="raw" if config["model"] in MODELOS["Razonamiento"] else None
+    )
+
+    def start(emit):
+        def run():
+            for delta in stream_completion(client, params):
+                emit((EVENT_TEXT, delta))
+        return asyncio.get_running_loop().run_in_executor(_executor, run)
+
+    return _iter_events(start)
+
+def _agent_events(config: Dict[str, Any], content: str, history: list) -> AsyncIterator[tuple]:
+    from utils.async_runner import submit
+
+    agent = get_agent(get_groq_api_key(), config["model"], _web_search_available(config), config["system_prompt"])
+
+    def start(emit):
+        # El agente usa el cliente HTTP asíncrono compartido, que vive en el bucle en segundo plano
+        return asyncio.wrap_future(submit(stream_agent_turn(agent, content, history, emit)))
+
+    return _iter_events(start)
+
+# --- Rutas ---
+
+async def _create_conversation(scope, receive, send):
+    config = conversation_config(await _read_json(receive))
+    conversation_id = get_conversation_store().create(config)
+    await _send_json(send, 201, {"id": conversation_id, "config": config})
+
+async def _list_messages(conversation_id: str, scope, receive, send):
+    params = _query(scope)
+    messages = get_conversation_store().get_messages(
+        conversation_id, _query_int(params, "offset", 0), _query_int(params, "limit", None)
+    )
+    await _send_json(send, 200, {"messages": messages})
+
+def _prune_summary_jobs():
+    # Descartar los resúmenes terminados de conversaciones que ya no reciben mensajes
+    now = time.monotonic()
+    expired = [conversation_id for conversation_id, (job, started) in _summary_jobs.items()
+               if job.done() and now - started > GENERATION_JOB_TTL]
+    for conversation_id in expired:
+        del _summary_jobs[conversation_id]
+
+async def _delete_conversation(conversation_id: str, scope, receive, send):
+    store = get_conversation_store()
+    if not store.exists(conversation_id):
+        raise ConversationNotFound(conversation_id)
+    store.delete(conversation_id)
+    _summary_jobs.pop(conversation_id, None)
+    await _send_json(send, 200, {"id": conversation_id, "deleted": True})
+
+async def _agent_turn(conversation_id: str, config: Dict[str, Any], content: str,
+                      send) -> str:
+    from utils.summarizer import start_summary
+
+    store = get_conversation_store()
+    summary_job = _summary_jobs.get(conversation_id, (None, 0.0))[0]
+    stored_history = store.get_history(conversation_id)
+    history, _, budget = prepare_history(stored_history, summary_job, config["max_tokens"])
+    if summary_job is not None and summary_job.done():
+        _summary_jobs.pop(conversation_id, None)
+
+    parts: List[str] = []
+    tool_uses: List[Dict[str, Any]] = []
+    async for event, data in _agent_events(config, content, history):
+        if event == EVENT_TEXT:
+            parts.append(data)
+            await _send_sse(send, "token", {"text": data})
+        elif event == EVENT_PROGRESS:
+            await _send_sse(send, "tool", {"status": data})
+        elif event == EVENT_TOOL:
+            tool_uses.append(data)
+            await _send_sse(send, "tool", {"tool": data["tool"], "query": data["query"],
+                                           "result": data["resultado_corto"]})
+        elif event == EVENT_MESSAGES:
+            # Solo se escriben los mensajes nuevos, salvo que el historial se haya recortado
+            store.sync_history(conversation_id, stored_history, data)
+            if (config["summarize_history"] and conversation_id not in _summary_jobs
+                    and should_summarize(data, budget)):
+                job = start_summary(data, _client())
+                if job is not None:
+                    _prune_summary_jobs()
+                    _summary_jobs[conversation_id] = (job, time.monotonic())
+
+    response = "".join(parts)
+    if any(pattern in response for pattern in ("<function=", "search_web(")):
+        response = clean_function_call_text(response)
+    if tool_uses:
+        response = f"<think>{search_thinking(tool_uses)}</think>{response}"
+    return response
+
+async def _stateless_turn(config: Dict[str, Any], content: str, send) -> str:
+    parts: List[str] = []
+    async for event, data in _stateless_events(config, content):
+        if event == EVENT_TEXT:
+            parts.append(data)
+            await _send_sse(send, "token", {"text": data})
+    return clean_response_text("".join(parts))
+
+async def _post_message(conversation_id: str, scope, receive, send):
+    store = get_conversation_store()
+    config = store.get_config(conversation_id)
+    content = (await _read_json(receive)).get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise HTTPError(400, "Falta el contenido del mensaje")
+
+    use_memory = config["memory"] and is_available("pydantic_ai")
+    lock = _conversation_locks.get(conversation_id)
+    if lock is None:
+        lock = _conversation_locks[conversation_id] = asyncio.Lock()
+    async with lock:
+        await _start_sse(send)
+        try:
+            store.append_messages(conversation_id, [{"role": "user", "content": content}])
+            if use_memory:
+                response = await _agent_turn(conversation_id, config, content, send)
+            else:
+                response = await _stateless_turn(config, content, send)
+            store.append_messages(conversation_id, [{"role": "assistant", "content": response}])
+            await _send_sse(send, "done", {"content": response})
+        except Exception as e:
+            # Las cabeceras ya se enviaron: el error se notifica como evento
+            await _send_sse(send, "error", {"error": str(e)})
+        await send({"type": "http.response.body", "body": b""})
+
+async def _transcribe(scope, receive, send):
+    from models.batch_transcription import get_rate_limiter
+    from models.transcription import transcribe_audio
+
+    params = _query(scope)
+    model = params.get("model", MODELOS["Audio a Texto"][0])
+    if model not in MODELOS["Audio a Texto"]:
+        raise HTTPError(400, f"Modelo no disponible: {model}")
+    client = _client()
+
+    # El audio se vuelca por bloques a un archivo temporal que solo pasa a disco si es grande
+    audio = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPTION_SPOOL_MAX_MEMORY)
+    try:
+        while True:
+            message = await receive()
+            audio.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        if not audio.tell():
+            raise HTTPError(400, "No se ha recibido ningún audio")
+        audio.seek(0)
+        preprocess = params["preprocess"] == "1" if "preprocess" in params else TRANSCRIPTION_PREPROCESS
+        # Mismo límite de peticiones por API key que la interfaz
+        rate_limiter = get_rate_limiter(get_groq_api_key())
+        try:
+            text = await asyncio.get_running_loop().run_in_executor(
+                _executor, lambda: transcribe_audio(client, model, audio, params.get("filename", "audio"),
+                                               preprocess=preprocess, rate_limiter=rate_limiter)
+            )
+        except Exception as e:
+            raise HTTPError(502, f"Error al procesar el audio: {str(e)}")
+    finally:
+        audio.close()
+    await _send_json(send, 200, {"text": text})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    """Aplicación ASGI de la API."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    parts = [part for part in scope["path"].split("/") if part]
+    try:
+        if parts == ["health"] and method == "GET":
+            await _send_json(send, 200, {"status": "ok"})
+        elif parts == ["conversations"] and method == "POST":
+            await _create_conversation(scope, receive, send)
+        elif len(parts) == 2 and parts[0] == "conversations" and method == "DELETE":
+            await _delete_conversation(parts[1], scope, receive, send)
+        elif len(parts) == 3 and parts[0] == "conversations" and parts[2] == "messages":
+            if method == "GET":
+                await _list_messages(parts[1], scope, receive, send)
+            elif method == "POST":
+                await _post_message(parts[1], scope, receive, send)
+            else:
+                raise HTTPError(405, "Método no permitido")
+        elif parts == ["transcriptions"] and method == "POST":
+            await _transcribe(scope, receive, send)
+        else:
+            raise HTTPError(404, "Ruta no encontrada")
+    except HTTPError as e:
+        await _send_json(send, e.status, {"error": e.message})
+    except ConversationNotFound:
+        await _send_json(send, 404, {"error": "Conversación no encontrada"})
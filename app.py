@@ -1,45 +1,59 @@
 import streamlit as st
-import groq
 import os
-from typing import List, Dict, Optional, Union
+import uuid
+from typing import List, Dict
 from dotenv import load_dotenv
-import time
-import base64
-import importlib.util
 from datetime import datetime
 
-# Verificar si pydantic_ai está instalado
-pydantic_available = importlib.util.find_spec("pydantic_ai") is not None
-
-# Verificar si tavily-python está instalado
-tavily_available = importlib.util.find_spec("tavily") is not None
-
-# Verificar si duckduckgo-search está instalado
-duckduckgo_available = importlib.util.find_spec("duckduckgo_search") is not None
-
-# Verificar si nest_asyncio está instalado (para entornos Jupyter)
-nest_asyncio_available = importlib.util.find_spec("nest_asyncio") is not None
-
-# Importar pydantic_ai y nest_asyncio si están disponibles
-if pydantic_available:
-    try:
-        from pydantic_ai import Agent, RunContext
-        from pydantic import BaseModel
-        # No importamos directamente duckduckgo_search_tool debido a incompatibilidad con Python 3.9
-        # Usaremos nuestra propia implementación para búsqueda DuckDuckGo
-        # Aplicar nest_asyncio si está disponible (para compatibilidad con Jupyter)
-        if nest_asyncio_available:
-            import nest_asyncio
-            nest_asyncio.apply()
-    except ImportError:
-        pydantic_available = False
+from config.settings import (
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MODEL,
+    DEFAULT_MODEL_TYPE,
+    DEFAULT_SYSTEM_PROMPT,
+    DEFAULT_TEMPERATURE,
+    HISTORY_WINDOW_SIZE,
+    MODELOS,
+    STREAM_MAX_FPS,
+    SUMMARY_MODEL,
+    TRANSCRIPTION_BATCH_CONCURRENCY,
+    TRANSCRIPTION_PREPROCESS,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_TEMPERATURE,
+    TRANSCRIPTION_RATE_LIMIT_PER_MINUTE
+)
+from core.chat import (
+    EVENT_PROGRESS,
+    EVENT_TEXT,
+    EVENT_TOOL,
+    build_completion_params,
+    build_system_prompt,
+    clean_function_call_text,
+    clean_response_text,
+    current_datetime_prompt,
+    get_agent,
+    prepare_history,
+    search_thinking,
+    should_summarize,
+    stream_agent_turn,
+    stream_completion
+)
+from core.generation import get_generation_queue
+from core.response_cache import cache_enabled, get_response_cache, replay_chunks
+from core.store import MessageLog, get_conversation_store
+from models.groq_client import get_groq_api_key, get_groq_client, process_audio_file
+from styles.styling import apply_custom_styles
+from tools.search_cache import get_search_cache
+from utils.lazy_imports import is_available
+from utils.message_cache import get_message_html
+from utils.rendering import history_window, summarize_hidden_messages
+from utils.streaming import RenderScheduler, ThinkTagParser, render_text_html
+from utils.summarizer import start_summary
 
-# Importar tavily-python si está disponible
-if tavily_available:
-    try:
-        from tavily import TavilyClient
-    except ImportError:
-        tavily_available = False
+# Comprobar qué dependencias opcionales están instaladas (una vez por proceso, sin importarlas).
+# pydantic_ai, tavily y duckduckgo_search se importan la primera vez que se usan
+pydantic_available = is_available("pydantic_ai")
+tavily_available = is_available("tavily")
+duckduckgo_available = is_available("duckduckgo_search")
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -52,223 +66,74 @@ st.set_page_config(
 )
 
 # Estilo CSS personalizado
-st.markdown("""
-<style>
-/* Estilos generales para los contenedores de chat */
-.chat-container {
-    border-radius: 12px;
-    margin-bottom: 15px;
-    padding: 15px;
-    box-shadow: 0 1px 2px rgba(0,0,0,0.1);
-    border: 1px solid rgba(0,0,0,0.05);
-}
-
-/* Estilos para mensajes del usuario */
-.user-message {
-    background-color: var(--primary-color-light);
-    text-align: right;
-    color: var(--text-color);
-    font-weight: 500;
-    margin-left: 20%;
-}
-
-/* Estilos para mensajes del asistente */
-.assistant-message {
-    background-color: var(--secondary-background-color);
-    color: var(--text-color);
-    font-weight: 500;
-    margin-right: 20%;
-}
-
-/* Estilos para el texto del chat */
-.chat-text {
-    font-size: 16px;
-    line-height: 1.5;
-    color: var(--text-color) !important;
-}
-
-/* Estilos para encabezados de los mensajes */
-.user-header, .assistant-header {
-    font-weight: 700;
-    margin-bottom: 5px;
-}
-
-.user-header {
-    color: var(--primary-color);
-}
-
-.assistant-header {
-    color: var(--text-color);
-}
-
-/* Ajustes para la zona de entrada de texto */
-.stTextInput input {
-    border-radius: 20px;
-    padding: 10px 15px;
-}
-
-/* Estilos para la sección de razonamiento */
-.reasoning-section {
-    background-color: rgba(var(--primary-color-rgb, 75, 75, 255), 0.05);
-    border-radius: 8px;
-    padding: 15px;
-    margin: 10px 0 15px 0;
-    border-left: 4px solid var(--primary-color);
-    box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-}
-
-.thinking-title {
-    font-weight: 700;
-    color: var(--primary-color);
-    margin-bottom: 8px;
-    font-size: 14px;
-    text-transform: uppercase;
-    letter-spacing: 0.5px;
-    display: flex;
-    align-items: center;
-}
-
-.thinking-title:before {
-    content: "💭";
-    margin-right: 6px;
-}
-
-/* Contenido del razonamiento con estilo diferenciado */
-.reasoning-content {
-    font-family: monospace;
-    font-size: 14px;
-    line-height: 1.6;
-    color: var(--text-color);
-    opacity: 0.85;
-    background-color: rgba(0,0,0,0.03);
-    padding: 10px;
-    border-radius: 4px;
-}
-
-/* Estilo para el mensaje de advertencia */
-.warning-message {
-    background-color: rgba(255, 152, 0, 0.15);
-    border-left: 3px solid #FF9800;
-    padding: 10px;
-    border-radius: 4px;
-    margin: 10px 0;
-}
-
-/* Estilos para botones de conversación */
-.conversation-button {
-    background-color: var(--primary-color);
-    color: white;
-    border: none;
-    border-radius: 8px;
-    padding: 8px 12px;
-    margin: 5px 0;
-    cursor: pointer;
-    width: 100%;
-    font-weight: bold;
-    text-align: center;
-    transition: all 0.3s ease;
-}
-
-.conversation-button:hover {
-    opacity: 0.9;
-    box-shadow: 0 2px 5px rgba(0,0,0,0.2);
-}
-
-.conversation-button.new {
-    background-color: var(--primary-color);
-}
-
-.conversation-button.clear {
-    background-color: #f44336;
-}
-
-.conversation-button.cancel {
-    background-color: #9e9e9e;
-}
-
-.conversation-button.confirm {
-    background-color: #4CAF50;
-}
-
-/* Crear variables personalizadas basadas en el tema actual */
-:root {
-    --primary-color-light: rgba(var(--primary-color-rgb, 255, 75, 75), 0.1);
-}
-
-/* Mejoras para la legibilidad en tema oscuro */
-[data-testid="stMarkdown"] {
-    color: var(--text-color);
-}
-
-/* Estilo mejorado para botones de Streamlit */
-button[data-testid="baseButton-secondary"] {
-    background-color: var(--primary-color);
-    color: white !important;
-    border: none !important;
-    border-radius: 8px;
-    padding: 10px 15px;
-    font-weight: bold;
-    text-align: center;
-    transition: all 0.2s ease;
-    box-shadow: 0 1px 3px rgba(0,0,0,0.2);
-}
-
-button[data-testid="baseButton-secondary"]:hover {
-    opacity: 0.9;
-    box-shadow: 0 2px 5px rgba(0,0,0,0.3);
-    transform: translateY(-1px);
-}
-
-/* Botón de limpiar chat */
-.element-container:has(button:contains("🗑️")) button[data-testid="baseButton-secondary"] {
-    background-color: #f44336;
-}
-
-/* Botón de confirmación */
-.element-container:has(button:contains("✅")) button[data-testid="baseButton-secondary"] {
-    background-color: #4CAF50;
-}
+apply_custom_styles()
 
-/* Botón de cancelar */
-.element-container:has(button:contains("❌")) button[data-testid="baseButton-secondary"] {
-    background-color: #9e9e9e;
-}
-</style>
-""", unsafe_allow_html=True)
 
+# Inicializar las variables de la sesión.
+# La conversación se guarda en el almacén de conversaciones (SQLite por defecto) y su
+# identificador va en la URL, de modo que se recupera tras un reinicio o al expirar la sesión
+if 'conversacion_id' not in st.session_state:
+    st.session_state.conversacion_id = st.query_params.get("conversacion") or uuid.uuid4().hex
+    st.query_params["conversacion"] = st.session_state.conversacion_id
 
-# Inicializar las variables de la sesión
+# Mensajes mostrados: se leen del almacén por páginas, solo los que se muestran
 if 'messages' not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = MessageLog(get_conversation_store(), st.session_state.conversacion_id)
+
+# Número de mensajes del historial que se muestran (el resto se oculta)
+if 'mensajes_visibles' not in st.session_state:
+    st.session_state.mensajes_visibles = HISTORY_WINDOW_SIZE
     
 if 'pydantic_agent' not in st.session_state:
     st.session_state.pydantic_agent = None
     
-if 'pydantic_history' not in st.session_state:
-    st.session_state.pydantic_history = []
-    
 if 'memoria_activa' not in st.session_state:
     st.session_state.memoria_activa = False
 
 # Variable para activar/desactivar herramientas
 if 'usar_tavily' not in st.session_state:
     st.session_state.usar_tavily = True
+
+# Resumen en segundo plano de los turnos antiguos del historial
+if 'resumir_historial' not in st.session_state:
+    st.session_state.resumir_historial = True
+    
+if 'resumen_pendiente' not in st.session_state:
+    st.session_state.resumen_pendiente = None
+
+# Caché de respuestas del modo sin memoria (solo con temperaturas bajas)
+if 'cache_respuestas' not in st.session_state:
+    st.session_state.cache_respuestas = RESPONSE_CACHE_ENABLED
+
+# Transcripción por lotes: archivos en paralelo y peticiones por minuto
+if 'transcripciones_concurrentes' not in st.session_state:
+    st.session_state.transcripciones_concurrentes = TRANSCRIPTION_BATCH_CONCURRENCY
+
+if 'transcripciones_por_minuto' not in st.session_state:
+    st.session_state.transcripciones_por_minuto = TRANSCRIPTION_RATE_LIMIT_PER_MINUTE
+
+# Documento con las transcripciones del último lote, para descargarlo
+if 'preprocesar_audio' not in st.session_state:
+    st.session_state.preprocesar_audio = TRANSCRIPTION_PREPROCESS
+
+if 'exportacion_lote' not in st.session_state:
+    st.session_state.exportacion_lote = None
     
 # Inicializar variables de modelo y tipo
 if 'modelo_seleccionado' not in st.session_state:
-    st.session_state.modelo_seleccionado = "llama-3.3-70b-versatile"
+    st.session_state.modelo_seleccionado = DEFAULT_MODEL
     
 if 'tipo_modelo' not in st.session_state:
-    st.session_state.tipo_modelo = "Conversación"
+    st.session_state.tipo_modelo = DEFAULT_MODEL_TYPE
     
 if 'temperatura' not in st.session_state:
     st.session_state.temperatura = 0.4
     
 if 'max_tokens' not in st.session_state:
-    st.session_state.max_tokens = 1024
+    st.session_state.max_tokens = DEFAULT_MAX_TOKENS
     
 if 'system_prompt' not in st.session_state:
-    st.session_state.system_prompt = "Eres un asistente de inteligencia artificial útil, claro y conciso. Tu objetivo es ayudar al usuario proporcionando respuestas precisas y fáciles de entender. Siempre responde en español, y si el usuario hace una pregunta ambigua, pide amablemente más detalles."
+    st.session_state.system_prompt = DEFAULT_SYSTEM_PROMPT
     
 if 'last_used_system_prompt' not in st.session_state:
     st.session_state.last_used_system_prompt = st.session_state.system_prompt
@@ -299,20 +164,37 @@ if 'config_actual' not in st.session_state:
         'system_prompt': st.session_state.system_prompt,
         'temperatura': 0.4,
         'max_tokens': 1024,
-        'usar_tavily': True
+        'usar_tavily': True,
+        'resumir_historial': True,
+        'cache_respuestas': RESPONSE_CACHE_ENABLED,
+        'transcripciones_concurrentes': TRANSCRIPTION_BATCH_CONCURRENCY,
+        'transcripciones_por_minuto': TRANSCRIPTION_RATE_LIMIT_PER_MINUTE,
+        'preprocesar_audio': TRANSCRIPTION_PREPROCESS
     }
 
+# Empezar una conversación nueva en el almacén, descartando la respuesta en curso.
+# La petición sigue en segundo plano, pero su resultado ya no se añade al chat
+def iniciar_conversacion():
+    get_generation_queue().pop(st.session_state.conversacion_id)
+    st.session_state.conversacion_id = uuid.uuid4().hex
+    st.session_state.messages = MessageLog(get_conversation_store(), st.session_state.conversacion_id)
+    st.query_params["conversacion"] = st.session_state.conversacion_id
+
 # Función para limpiar la conversación
 def clear_conversation():
     # Guardar system prompt actual 
     current_system_prompt = st.session_state.system_prompt
     
     # Limpiar mensajes y reiniciar el historial
-    st.session_state.messages = []
+    iniciar_conversacion()
+    st.session_state.mensajes_visibles = HISTORY_WINDOW_SIZE
+    st.session_state.exportacion_lote = None
     if pydantic_available and st.session_state.memoria_activa:
-        st.session_state.pydantic_history = []
+        st.session_state.resumen_pendiente = None
     if 'last_request_params' in st.session_state:
         del st.session_state['last_request_params']
+    if 'tokens_historial' in st.session_state:
+        del st.session_state['tokens_historial']
     
     # Restaurar el system prompt
     st.session_state.system_prompt = current_system_prompt
@@ -325,11 +207,15 @@ def clear_conversation():
 # Función para nueva conversación
 def new_conversation():
     # Limpiar mensajes y reiniciar el historial
-    st.session_state.messages = []
+    iniciar_conversacion()
+    st.session_state.mensajes_visibles = HISTORY_WINDOW_SIZE
+    st.session_state.exportacion_lote = None
     if pydantic_available and st.session_state.memoria_activa:
-        st.session_state.pydantic_history = []
+        st.session_state.resumen_pendiente = None
     if 'last_request_params' in st.session_state:
         del st.session_state['last_request_params']
+    if 'tokens_historial' in st.session_state:
+        del st.session_state['tokens_historial']
     
     # Reiniciar el agente para que use el system prompt actual
     reset_pydantic_agent()
@@ -370,7 +256,12 @@ def guardar_configuracion():
         'system_prompt': st.session_state.system_prompt,
         'temperatura': st.session_state.temperatura,
         'max_tokens': st.session_state.max_tokens,
-        'usar_tavily': st.session_state.usar_tavily
+        'usar_tavily': st.session_state.usar_tavily,
+        'resumir_historial': st.session_state.resumir_historial,
+        'cache_respuestas': st.session_state.cache_respuestas,
+        'transcripciones_concurrentes': st.session_state.transcripciones_concurrentes,
+        'transcripciones_por_minuto': st.session_state.transcripciones_por_minuto,
+        'preprocesar_audio': st.session_state.preprocesar_audio
     }
     
     # Actualizar las variables globales para que se apliquen de inmediato
@@ -404,33 +295,13 @@ def confirmar_cambio_configuracion():
     else:
         ir_a_configuracion()
     
-# Definición de modelos disponibles
-MODELOS = {
-    "Conversación": [
-        "llama-3.3-70b-versatile",
-        "qwen-2.5-32b",
-        "qwen-2.5-coder-32b",
-        "qwen-qwq-32b"
-    ],
-    "Audio a Texto": [
-        "whisper-large-v3",
-        "whisper-large-v3-turbo",
-        "distil-whisper-large-v3-en"
-    ],
-    "Razonamiento": [
-        "deepseek-r1-distill-llama-70b",
-        "deepseek-r1-distill-qwen-32b"
-    ]
-}
-
 # Función para obtener la API key de Groq de forma segura
-def get_groq_api_key():
-    # Primero intentar obtenerla del archivo .env
-    api_key = os.getenv("GROQ_API_KEY")
+def pedir_groq_api_key():
+    # Primero intentar obtenerla del archivo .env o del entorno
+    api_key = get_groq_api_key()
     
-    # Si no está en el archivo .env, intentar obtenerla del entorno
+    # Como último recurso, pedirla al usuario (solo en desarrollo)
     if not api_key:
-        # Como último recurso, pedirla al usuario (solo en desarrollo)
         api_key = st.sidebar.text_input("Introduce tu API key de Groq:", type="password")
         if not api_key:
             st.sidebar.warning("Por favor, introduce tu API key de Groq para continuar.")
@@ -448,187 +319,30 @@ def get_tavily_api_key():
     
     return api_key
 
-# Función para buscar en internet con Tavily Search API
-def buscar_en_internet(query: str, num_results: int = 5) -> str:
-    """
-    Realiza una búsqueda en internet utilizando Tavily Search API.
-    
-    Args:
-        query (str): La consulta a buscar
-        num_results (int): Número de resultados a devolver (default: 5)
-        
-    Returns:
-        str: Resultados de la búsqueda formateados como texto
-    """
-    try:
-        if not tavily_available:
-            return "Error: La biblioteca tavily-python no está instalada. Instálala con 'pip install tavily-python'."
-        
-        api_key = get_tavily_api_key()
-        if not api_key:
-            return "Error: No se encontró la API key de Tavily. Configura TAVILY_API_KEY en el archivo .env."
-        
-        # Inicializa el cliente de Tavily
-        client = TavilyClient(api_key=api_key)
-        
-        # Realiza la búsqueda
-        search_results = client.search(query=query, max_results=num_results, search_depth="advanced", include_answer=True)
-        
-        # Formatea los resultados como texto
-        results_text = f"Resultados de búsqueda para: '{query}'\n\n"
-        
-        # Añadir respuesta generada por Tavily si está disponible
-        if "answer" in search_results and search_results["answer"]:
-            results_text += f"RESPUESTA GENERADA:\n{search_results['answer']}\n\n"
-        
-        # Añadir resultados de la búsqueda
-        if "results" in search_results and search_results["results"]:
-            results_text += "FUENTES:\n"
-            for i, result in enumerate(search_results["results"][:num_results], 1):
-                title = result.get("title", "Sin título")
-                url = result.get("url", "Sin URL")
-                content = result.get("content", "Sin contenido")
-                score = result.get("score", 0)
-                
-                results_text += f"{i}. {title}\n   URL: {url}\n   Relevancia: {score:.2f}\n   {content[:200]}...\n\n"
-        
-        # Registrar la búsqueda para depuración
-        st.session_state["ultima_busqueda"] = {
-            "query": query,
-            "resultados": results_text
-        }
-        
-        return results_text
-    except Exception as e:
-        error_msg = f"Error al realizar la búsqueda: {str(e)}"
-        st.session_state["ultima_busqueda_error"] = error_msg
-        return error_msg
+# Comprobar si la búsqueda web está habilitada y hay algún proveedor disponible
+def busqueda_web_disponible():
+    if not st.session_state.usar_tavily:
+        return False
+    return bool((get_tavily_api_key() and tavily_available) or duckduckgo_available)
 
-# Función para buscar en DuckDuckGo
-def buscar_en_duckduckgo(query: str, num_results: int = 5) -> str:
-    """
-    Realiza una búsqueda en internet utilizando DuckDuckGo Search.
-    
-    Args:
-        query (str): La consulta a buscar
-        num_results (int): Número de resultados a devolver (default: 5)
-        
-    Returns:
-        str: Resultados de la búsqueda formateados como texto
-    """
-    try:
-        if not duckduckgo_available:
-            return "Error: La biblioteca duckduckgo-search no está instalada. Instálala con 'pip install duckduckgo-search'."
-        
-        # Importamos aquí para evitar problemas de importación si no está disponible
-        from duckduckgo_search import DDGS
-        
-        # Inicializa el cliente de DuckDuckGo
-        ddgs = DDGS()
-        
-        # Realiza la búsqueda
-        search_results = list(ddgs.text(query, max_results=num_results))
-        
-        # Formatea los resultados como texto
-        results_text = f"Resultados de búsqueda en DuckDuckGo para: '{query}'\n\n"
-        
-        # Añadir resultados de la búsqueda
-        if search_results:
-            for i, result in enumerate(search_results, 1):
-                title = result.get("title", "Sin título")
-                url = result.get("href", "Sin URL")
-                content = result.get("body", "Sin contenido")
-                
-                results_text += f"{i}. {title}\n   URL: {url}\n   {content[:200]}...\n\n"
-        else:
-            results_text += "No se encontraron resultados para esta consulta.\n"
-        
-        # Registrar la búsqueda para depuración
-        st.session_state["ultima_busqueda_ddg"] = {
-            "query": query,
-            "resultados": results_text
-        }
-        
-        return results_text
-    except Exception as e:
-        error_msg = f"Error al realizar la búsqueda en DuckDuckGo: {str(e)}"
-        st.session_state["ultima_busqueda_ddg_error"] = error_msg
-        return error_msg
-
-# Configuración del cliente de Groq
-@st.cache_resource
-def get_groq_client(api_key):
-    if not api_key:
-        return None
-    return groq.Groq(api_key=api_key)
-
-# Función para inicializar o actualizar el agente PydanticAI
+# Función para obtener el agente PydanticAI de la configuración actual
 def setup_pydantic_agent(api_key, model_name):
     if not pydantic_available:
         st.error("La biblioteca pydantic-ai no está instalada. La función de memoria no está disponible.")
         return None
         
     try:
-        # Configurar el nombre del modelo para Groq
-        agent_name = f"groq:{model_name}"
-        
-        # Configurar las variables de entorno para el agente
-        os.environ["GROQ_API_KEY"] = api_key
-        
-        # Obtener la API key de Tavily
-        tavily_api_key = get_tavily_api_key()
-        
         # Obtener el system prompt personalizado del usuario
         base_system_prompt = st.session_state.system_prompt
         
-        # Obtener la fecha y hora actuales
-        now = datetime.now()
-        date_time_str = now.strftime("%d/%m/%Y %H:%M:%S")
-        
-        # Añadir información sobre fecha y hora actuales
-        system_prompt = f"{base_system_prompt} La fecha y hora actuales son: {date_time_str}."
-        
-        # Añadir información sobre la búsqueda web solo si está habilitada
-        if st.session_state.usar_tavily and tavily_api_key and tavily_available:
-            # Añadir instrucción sobre el uso de la herramienta de búsqueda web
-            if not "búsqueda web" in system_prompt.lower() and not "tavily" in system_prompt.lower():
-                system_prompt += " Cuando el usuario solicite información actualizada o sobre eventos recientes, utiliza la herramienta de búsqueda web de Tavily para obtener y proporcionar información en tiempo real de fuentes confiables."
+        # La búsqueda web solo se registra si está habilitada y disponible
+        usar_busqueda = busqueda_web_disponible()
         
         # Guardar el system prompt realmente usado
-        st.session_state.system_prompt_actual = system_prompt
-        
-        # Crear un nuevo agente con el system prompt actualizado
-        agent = Agent(
-            agent_name,
-            system_prompt=system_prompt
-        )
-        
-        # Registrar la herramienta de búsqueda web solo si está habilitada y disponible
-        if st.session_state.usar_tavily and tavily_api_key and tavily_available:
-            @agent.tool
-            def search_web(ctx: RunContext[str], query: str, num_results: int = 5) -> str:
-                """
-                Busca información en internet utilizando Tavily Search.
-                
-                Args:
-                    query (str): La consulta a buscar en internet
-                    num_results (int, optional): Número de resultados a mostrar. Default: 5
-                    
-                Returns:
-                    str: Resultados de la búsqueda formateados
-                """
-                resultado = buscar_en_internet(query, num_results)
-                # Registrar el uso de la herramienta para verificación
-                if "herramientas_usadas" not in st.session_state:
-                    st.session_state.herramientas_usadas = []
-                st.session_state.herramientas_usadas.append({
-                    "tool": "search_web", 
-                    "query": query,
-                    "resultado_corto": resultado[:100] + "..." if len(resultado) > 100 else resultado
-                })
-                return resultado
+        st.session_state.system_prompt_actual = f"{build_system_prompt(base_system_prompt, usar_busqueda)} {current_datetime_prompt()}"
         
-        return agent
+        # Reutilizar el agente si ya se creó con la misma configuración (se comparte entre sesiones)
+        return get_agent(api_key, model_name, usar_busqueda, base_system_prompt)
     except Exception as e:
         st.error(f"Error al inicializar el agente PydanticAI: {str(e)}")
         return None
@@ -655,9 +369,10 @@ elif st.session_state.confirmar_cambio_config:
     
     if st.sidebar.button("✅ Sí, ir a configuración", key="confirmar_config_btn", use_container_width=True):
         # Limpiar mensajes y reiniciar historial
-        st.session_state.messages = []
+        iniciar_conversacion()
+        st.session_state.mensajes_visibles = HISTORY_WINDOW_SIZE
         if pydantic_available and st.session_state.memoria_activa:
-            st.session_state.pydantic_history = []
+            st.session_state.resumen_pendiente = None
         st.session_state.confirmar_cambio_config = False
         ir_a_configuracion()
         st.rerun()
@@ -759,7 +474,7 @@ if st.session_state.pagina_actual == 'configuracion':
     
     # Checkbox para activar/desactivar Tavily
     st.session_state.usar_tavily = st.checkbox(
-        f"Habilitar búsqueda web con Tavily ({tavily_status})",
+        f"Habilitar búsqueda web con Tavily y DuckDuckGo (Tavily: {tavily_status})",
         value=st.session_state.usar_tavily,
         help="Permite que el asistente busque información actualizada en internet"
     )
@@ -767,15 +482,64 @@ if st.session_state.pagina_actual == 'configuracion':
     if not get_tavily_api_key() and st.session_state.usar_tavily:
         st.info("Para usar la búsqueda web, añade TAVILY_API_KEY en tu archivo .env")
     
+    # Sección de memoria
+    st.subheader("5. Memoria")
+    
+    # Checkbox para activar/desactivar el resumen de turnos antiguos
+    st.session_state.resumir_historial = st.checkbox(
+        "Resumir automáticamente los turnos antiguos de la conversación",
+        value=st.session_state.resumir_historial,
+        help=f"Cuando el historial crece, los turnos más antiguos se resumen en segundo plano con {SUMMARY_MODEL} para mantener constante el tamaño de cada consulta"
+    )
+    
+    # Checkbox para activar/desactivar la caché de respuestas del modo sin memoria
+    st.session_state.cache_respuestas = st.checkbox(
+        "Reutilizar las respuestas a preguntas repetidas (sin memoria)",
+        value=st.session_state.cache_respuestas,
+        help=f"Sin memoria, una pregunta ya respondida con el mismo modelo, temperatura y system prompt se responde desde la caché, sin llamar a la API. Solo se aplica con temperatura {RESPONSE_CACHE_MAX_TEMPERATURE} o menor"
+    )
+    
+    # Sección de transcripción (solo para los modelos de audio)
+    if tipo_modelo == "Audio a Texto":
+        st.subheader("6. Transcripción de audio")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.session_state.transcripciones_concurrentes = st.number_input(
+                "Audios transcritos a la vez:",
+                min_value=1, max_value=16,
+                value=int(st.session_state.transcripciones_concurrentes),
+                help="Número máximo de archivos de un lote que se transcriben en paralelo"
+            )
+        
+        with col2:
+            st.session_state.transcripciones_por_minuto = st.number_input(
+                "Peticiones por minuto a la API:",
+                min_value=0.0, max_value=600.0, step=1.0,
+                value=float(st.session_state.transcripciones_por_minuto),
+                help="Límite de peticiones de transcripción por minuto (0 para no limitar)"
+            )
+        
+        st.session_state.preprocesar_audio = st.checkbox(
+            "Convertir los audios a 16 kHz en mono antes de enviarlos",
+            value=st.session_state.preprocesar_audio,
+            help="Whisper trabaja a 16 kHz en mono: convertir antes reduce el tamaño de la subida sin afectar a la transcripción. Los WAV se convierten directamente; el resto de formatos requieren ffmpeg"
+        )
+    
     # Botón para restablecer valores predeterminados
     if st.button("🔄 Restablecer valores predeterminados", use_container_width=True):
         # Establecer valores predeterminados
-        st.session_state.tipo_modelo = "Conversación"
-        st.session_state.modelo_seleccionado = "llama-3.3-70b-versatile"
-        st.session_state.temperatura = 0.9
-        st.session_state.max_tokens = 1024
-        st.session_state.system_prompt = "Eres un asistente de inteligencia artificial útil, claro y conciso. Tu objetivo es ayudar al usuario proporcionando respuestas precisas y fáciles de entender. Siempre responde en español, y si el usuario hace una pregunta ambigua, pide amablemente más detalles."
+        st.session_state.tipo_modelo = DEFAULT_MODEL_TYPE
+        st.session_state.modelo_seleccionado = DEFAULT_MODEL
+        st.session_state.temperatura = DEFAULT_TEMPERATURE
+        st.session_state.max_tokens = DEFAULT_MAX_TOKENS
+        st.session_state.system_prompt = DEFAULT_SYSTEM_PROMPT
         st.session_state.usar_tavily = True
+        st.session_state.resumir_historial = True
+        st.session_state.cache_respuestas = RESPONSE_CACHE_ENABLED
+        st.session_state.transcripciones_concurrentes = TRANSCRIPTION_BATCH_CONCURRENCY
+        st.session_state.transcripciones_por_minuto = TRANSCRIPTION_RATE_LIMIT_PER_MINUTE
+        st.session_state.preprocesar_audio = TRANSCRIPTION_PREPROCESS
         st.rerun()
     
     # Botón para guardar la configuración e ir al chat
@@ -836,8 +600,9 @@ elif st.session_state.pagina_actual == 'chat':
 st.sidebar.markdown("---")
 
 # Obtener API key y cliente
-api_key = get_groq_api_key()
-client = get_groq_client(api_key)
+api_key = pedir_groq_api_key()
+# El cliente (y el SDK de Groq) solo se cargan al entrar en el chat
+client = get_groq_client(api_key) if st.session_state.pagina_actual == 'chat' else None
 
 # Si estamos en la página de chat, inicializar el agente con la configuración guardada
 if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada:
@@ -869,44 +634,31 @@ if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada
 
 # Subida de archivos para modelos de audio
 uploaded_file = None
+uploaded_files = []
 if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada:
     if tipo_modelo == "Audio a Texto":
-        uploaded_file = st.file_uploader("Sube un archivo de audio (mp3, wav, m4a, ogg)", type=["mp3", "wav", "m4a", "ogg"])
-        if uploaded_file is not None:
+        uploaded_files = st.file_uploader(
+            "Sube uno o varios archivos de audio (mp3, wav, m4a, ogg)",
+            type=["mp3", "wav", "m4a", "ogg"],
+            accept_multiple_files=True
+        ) or []
+        if len(uploaded_files) == 1:
+            uploaded_file = uploaded_files[0]
             # Determinar el formato correcto para reproducir el audio
             file_type = uploaded_file.type.split('/')[1] if '/' in uploaded_file.type else 'audio/ogg'
             st.audio(uploaded_file, format=file_type)
-
-# Procesar archivo de audio
-def process_audio_file(file, model):
-    try:
-        # Leer el archivo y codificarlo en base64
-        file_bytes = file.getvalue()
-        
-        # Determinar el tipo de archivo para casos donde no se detecta correctamente
-        file_type = file.type
-        if not file_type or '/' not in file_type:
-            # Inferir tipo basado en la extensión
-            if file.name.lower().endswith('.ogg'):
-                file_type = 'audio/ogg'
-            elif file.name.lower().endswith('.mp3'):
-                file_type = 'audio/mpeg'
-            elif file.name.lower().endswith('.wav'):
-                file_type = 'audio/wav'
-            elif file.name.lower().endswith('.m4a'):
-                file_type = 'audio/m4a'
-            else:
-                file_type = 'audio/ogg'  # Default para archivos de WhatsApp
-        
-        # Crear la solicitud a la API
-        transcription = client.audio.transcriptions.create(
-            model=model,
-            file=(file.name, file_bytes)
-        )
+        elif uploaded_files:
+            st.caption(f"{len(uploaded_files)} archivos en cola para transcribir en lote")
         
-        return transcription.text
-    except Exception as e:
-        return f"Error al procesar el audio: {str(e)}"
+        # Descarga de las transcripciones del último lote
+        if st.session_state.exportacion_lote:
+            nombre_exportacion, texto_exportacion = st.session_state.exportacion_lote
+            st.download_button(
+                "📥 Descargar transcripciones del lote",
+                data=texto_exportacion,
+                file_name=nombre_exportacion,
+                mime="text/markdown"
+            )
 
 # Función para limpiar y procesar etiquetas <think> en un mensaje
 def procesar_mensaje_razonamiento(contenido):
@@ -955,322 +707,112 @@ def procesar_mensaje_razonamiento(contenido):
         
     return clean_content
 
-# Función para enviar mensajes a Groq y obtener respuestas con streaming
-def get_response_streaming(messages: List[Dict[str, str]], placeholder, razonamiento_formato=None, tipo_modelo_actual=None):
+# Encolar una generación para la conversación actual. La respuesta se guarda en el almacén al
+# terminar, aunque un rerun haya interrumpido su dibujado o la sesión ya no exista
+def encolar_generacion(generar):
+    conversacion_id = st.session_state.conversacion_id
+    
+    def ejecutar(emit):
+        resultado = generar(emit)
+        # Procesar el mensaje para asegurar un formato correcto de etiquetas <think>
+        resultado["respuesta"] = procesar_mensaje_razonamiento(resultado["respuesta"])
+        get_conversation_store().append_messages(
+            conversacion_id, [{"role": "assistant", "content": resultado["respuesta"]}]
+        )
+        return resultado
+    
+    return get_generation_queue().submit(conversacion_id, ejecutar)
+
+# Generar una respuesta sin memoria en un hilo de la cola de generaciones (sin usar Streamlit)
+def generar_respuesta_sin_memoria(client, params, emit):
     try:
-        if not client:
-            return "Por favor, configura tu API key de Groq en un archivo .env"
-        
-        # Usar el tipo de modelo pasado como parámetro, o el global si no se proporciona
-        tipo_modelo_actual = tipo_modelo_actual or tipo_modelo
-        
-        # Preparar para streaming
-        response_text = ""  # Para almacenar el texto puro sin HTML
-        
-        # Actualizar el primer mensaje (system) con la fecha y hora actuales
-        from datetime import datetime
-        now = datetime.now()
-        date_time_str = now.strftime("%d/%m/%Y %H:%M:%S")
-        
-        # Asegurarse de que hay un mensaje de sistema
-        if messages and messages[0]['role'] == 'system':
-            # Añadir información de fecha y hora al mensaje del sistema
-            base_system_content = messages[0]['content']
-            messages[0]['content'] = f"{base_system_content} La fecha y hora actuales son: {date_time_str}."
-        
-        # Registrar valores para verificación
-        st.session_state['last_request_params'] = {
-            'temperatura': temperatura,
-            'max_tokens': max_tokens,
-            'modelo': modelo_seleccionado
-        }
-        
-        # Configurar los parámetros base
-        params = {
-            "model": modelo_seleccionado,
-            "messages": messages,
-            "temperature": temperatura,
-            "max_tokens": max_tokens,
-            "top_p": 1,
-            "stream": True,
-            "stop": None,
-        }
-        
-        # Añadir el formato de razonamiento si es un modelo de razonamiento
-        if tipo_modelo_actual == "Razonamiento" and razonamiento_formato:
-            params["reasoning_format"] = razonamiento_formato
-        
-        # Crear la solicitud de chat
-        completion = client.chat.completions.create(**params)
-        
-        # Procesar la respuesta en streaming
-        for chunk in completion:
-            content = chunk.choices[0].delta.content or ""
-            if content:
-                # Añadir al texto de respuesta puro (para almacenar)
-                response_text += content
-                
-                # Escapar caracteres especiales HTML para la visualización
-                safe_response = response_text.replace("<", "&lt;").replace(">", "&gt;")
-                
-                # Para modelos de razonamiento con formato "raw", formatear la salida
-                if tipo_modelo_actual == "Razonamiento" and razonamiento_formato == "raw":
-                    # Comprobar si hay etiquetas think incluso cuando no estamos en modelo de razonamiento
-                    # Buscar el patrón <think> y </think> en cualquier tipo de modelo
-                    thinking_start = -1
-                    thinking_end = -1
-                    has_thinking_tags = False
-                    thinking_content = ""
-                    answer_content = ""
-                    
-                    # Buscar las etiquetas sin escapar en el texto original
-                    if "<think>" in response_text and "</think>" in response_text:
-                        has_thinking_tags = True
-                        thinking_start = response_text.find("<think>")
-                        thinking_end = response_text.find("</think>")
-                        
-                        # Extraer pensamiento y respuesta del texto original sin escapar
-                        thinking_content = response_text[thinking_start + 7:thinking_end].strip()
-                        answer_content = response_text[thinking_end + 8:].strip()
-                    # Buscar las etiquetas escapadas en la respuesta ya procesada
-                    elif "&lt;think&gt;" in safe_response and "&lt;/think&gt;" in safe_response:
-                        has_thinking_tags = True
-                        thinking_start = safe_response.find("&lt;think&gt;")
-                        thinking_end = safe_response.find("&lt;/think&gt;")
-                        
-                        # Extraer contenido
-                        thinking_content = safe_response[thinking_start + 12:thinking_end].strip()
-                        answer_content = safe_response[thinking_end + 13:].strip()
-                    
-                    # Si se encontraron etiquetas de pensamiento, mostrar razonamiento y respuesta
-                    if has_thinking_tags:
-                        # Escapar para visualización si no estaba ya escapado
-                        if "<" in thinking_content or ">" in thinking_content:
-                            safe_thinking = thinking_content.replace("<", "&lt;").replace(">", "&gt;")
-                        else:
-                            safe_thinking = thinking_content
-                        
-                        if "<" in answer_content or ">" in answer_content:
-                            safe_answer = answer_content.replace("<", "&lt;").replace(">", "&gt;")
-                        else:
-                            safe_answer = answer_content
-                        
-                        # Si el answer_content está vacío, añadir un mensaje predeterminado
-                        if not safe_answer:
-                            safe_answer = "El modelo proporcionó sólo su razonamiento."
-                        
-                        placeholder.markdown(
-                            f"""
-                            <div class="chat-container assistant-message">
-                                <div class="assistant-header">
-                                    Asistente:
-                                </div>
-                                <div class="reasoning-section">
-                                    <div class="thinking-title">Razonamiento:</div>
-                                    <div class="reasoning-content">{safe_thinking}</div>
-                                </div>
-                                <div class="chat-text">{safe_answer}</div>
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
-                        # Salimos de esta rama, ya procesamos el mensaje
-                        return response_text
-                    else:
-                        # No hay etiquetas de razonamiento, mostrar el mensaje normal
-                        placeholder.markdown(
-                            f"""
-                            <div class="chat-container assistant-message">
-                                <div class="assistant-header">
-                                    Asistente:
-                                </div>
-                                <div class="chat-text">{safe_response}</div>
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
-                else:
-                    # Comprobar si hay etiquetas think incluso cuando no estamos en modelo de razonamiento
-                    thinking_start = -1
-                    thinking_end = -1
-                    has_thinking_tags = False
-                    thinking_content = ""
-                    answer_content = ""
-                    
-                    # Buscar las etiquetas sin escapar en el texto original
-                    if "<think>" in response_text and "</think>" in response_text:
-                        has_thinking_tags = True
-                        thinking_start = response_text.find("<think>")
-                        thinking_end = response_text.find("</think>")
-                        
-                        # Extraer pensamiento y respuesta del texto original sin escapar
-                        thinking_content = response_text[thinking_start + 7:thinking_end].strip()
-                        answer_content = response_text[thinking_end + 8:].strip()
-                    # Buscar las etiquetas escapadas en la respuesta ya procesada
-                    elif "&lt;think&gt;" in safe_response and "&lt;/think&gt;" in safe_response:
-                        has_thinking_tags = True
-                        thinking_start = safe_response.find("&lt;think&gt;")
-                        thinking_end = safe_response.find("&lt;/think&gt;")
-                        
-                        # Extraer contenido
-                        thinking_content = safe_response[thinking_start + 12:thinking_end].strip()
-                        answer_content = safe_response[thinking_end + 13:].strip()
-                    
-                    # Si se encontraron etiquetas de pensamiento, mostrar razonamiento y respuesta
-                    if has_thinking_tags:
-                        # Escapar para visualización si no estaba ya escapado
-                        if "<" in thinking_content or ">" in thinking_content:
-                            safe_thinking = thinking_content.replace("<", "&lt;").replace(">", "&gt;")
-                        else:
-                            safe_thinking = thinking_content
-                        
-                        if "<" in answer_content or ">" in answer_content:
-                            safe_answer = answer_content.replace("<", "&lt;").replace(">", "&gt;")
-                        else:
-                            safe_answer = answer_content
-                        
-                        # Si el answer_content está vacío, añadir un mensaje predeterminado
-                        if not safe_answer:
-                            safe_answer = "El modelo proporcionó sólo su razonamiento."
-                        
-                        placeholder.markdown(
-                            f"""
-                            <div class="chat-container assistant-message">
-                                <div class="assistant-header">
-                                    Asistente:
-                                </div>
-                                <div class="reasoning-section">
-                                    <div class="thinking-title">Razonamiento:</div>
-                                    <div class="reasoning-content">{safe_thinking}</div>
-                                </div>
-                                <div class="chat-text">{safe_answer}</div>
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
-                        return response_text
-                    else:
-                        # No hay etiquetas de razonamiento, mostrar el mensaje normal
-                        placeholder.markdown(
-                            f"""
-                            <div class="chat-container assistant-message">
-                                <div class="assistant-header">
-                                    Asistente:
-                                </div>
-                                <div class="chat-text">{safe_response}</div>
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
-        
-        # Limpiar posibles etiquetas HTML en la respuesta antes de devolverla
-        html_patterns = [
-            "</div>", 
-            '<div class="chat-text">', 
-            '<div class=', 
-            '</div>', 
-            '<span', 
-            '</span>'
-        ]
+        response_parts = []
+        for content in stream_completion(client, params):
+            response_parts.append(content)
+            emit((EVENT_TEXT, content))
         
-        # Verificar si hay etiquetas HTML incorrectas
-        clean_response_text = response_text
-        for pattern in html_patterns:
-            if pattern in clean_response_text:
-                clean_response_text = clean_response_text.replace(pattern, '')
-                
-        # Devolver el texto limpio
-        return clean_response_text.strip()
+        # Devolver el texto sin posibles etiquetas HTML incorrectas
+        return {"respuesta": clean_response_text("".join(response_parts))}
     except Exception as e:
-        return f"Error al comunicarse con Groq: {str(e)}"
+        return {"respuesta": f"Error al comunicarse con Groq: {str(e)}", "error": True}
 
-# Función para obtener respuesta usando PydanticAI (con memoria)
-def get_response_with_memory(user_prompt):
+# Repetir una respuesta de la caché como si llegara en streaming, para dibujarla igual que una nueva
+def repetir_respuesta_cacheada(respuesta, emit):
+    for fragmento in replay_chunks(respuesta):
+        emit((EVENT_TEXT, fragmento))
+    return {"respuesta": respuesta}
+
+# Función para enviar mensajes a Groq en segundo plano; la respuesta se muestra con mostrar_generacion
+def get_response_streaming(messages: List[Dict[str, str]], razonamiento_formato=None, tipo_modelo_actual=None):
+    if not client:
+        return encolar_generacion(lambda emit: {"respuesta": "Por favor, configura tu API key de Groq en un archivo .env"})
+    
+    # Usar el tipo de modelo pasado como parámetro, o el global si no se proporciona
+    tipo_modelo_actual = tipo_modelo_actual or tipo_modelo
+    
+    # Registrar valores para verificación
+    st.session_state['last_request_params'] = {
+        'temperatura': temperatura,
+        'max_tokens': max_tokens,
+        'modelo': modelo_seleccionado
+    }
+    
+    # Parámetros de la petición (con la fecha y hora actuales en el mensaje de sistema)
+    params = build_completion_params(
+        messages,
+        modelo_seleccionado,
+        temperatura,
+        max_tokens,
+        reasoning_format=razonamiento_formato if tipo_modelo_actual == "Razonamiento" else None
+    )
+    
+    groq_client = client
+    if not (st.session_state.config_actual.get('cache_respuestas', False) and cache_enabled(temperatura)):
+        return encolar_generacion(lambda emit: generar_respuesta_sin_memoria(groq_client, params, emit))
+    
+    # Clave de la caché: el system prompt sin la fecha y hora, y el último mensaje del usuario
+    cache = get_response_cache()
+    clave = {
+        'prompt': messages[-1]['content'],
+        'model': modelo_seleccionado,
+        'temperature': temperatura,
+        'max_tokens': max_tokens,
+        'system_prompt': messages[0]['content'] if messages[0]['role'] == 'system' else "",
+        'reasoning_format': params.get('reasoning_format')
+    }
+    respuesta_cacheada = cache.get(**clave)
+    if respuesta_cacheada is not None:
+        return encolar_generacion(lambda emit: repetir_respuesta_cacheada(respuesta_cacheada, emit))
+    
+    def generar(emit):
+        resultado = generar_respuesta_sin_memoria(groq_client, params, emit)
+        if not resultado.get("error") and resultado["respuesta"].strip():
+            cache.set(response=resultado["respuesta"], **clave)
+        return resultado
+    
+    return encolar_generacion(generar)
+
+# Generar una respuesta con el agente PydanticAI en un hilo de la cola de generaciones (sin usar Streamlit)
+def generar_respuesta_con_memoria(agent, user_prompt, message_history, emit):
+    from utils.async_runner import run_coroutine
+    
+    herramientas_usadas = []
+    response_parts = []
+    
+    # Reenviar los eventos del agente al búfer de la generación
+    def reenviar(evento):
+        tipo, dato = evento
+        if tipo == EVENT_TEXT:
+            response_parts.append(dato)
+        elif tipo == EVENT_TOOL:
+            herramientas_usadas.append(dato)
+        emit(evento)
+    
     try:
-        # Verificar que pydantic está disponible
-        if not pydantic_available:
-            return "La función de memoria requiere la biblioteca 'pydantic-ai'"
-        
-        # Actualizar la fecha y hora en el system prompt
-        from datetime import datetime
-        now = datetime.now()
-        date_time_str = now.strftime("%d/%m/%Y %H:%M:%S")
-        
-        # Verificar si el system prompt ha cambiado desde el último uso
-        system_prompt_changed = st.session_state.system_prompt != st.session_state.last_used_system_prompt
-        
-        # Verificar que el agente existe y asegurarse de que esté usando el system prompt actual
-        if st.session_state.pydantic_agent is None or system_prompt_changed:
-            st.session_state.pydantic_agent = setup_pydantic_agent(api_key, modelo_seleccionado)
-            # Actualizar el último system prompt utilizado
-            st.session_state.last_used_system_prompt = st.session_state.system_prompt
-            
-            if st.session_state.pydantic_agent is None:
-                return "No se pudo inicializar el agente de memoria"
-        else:
-            # Si el agente ya existe, solo actualizamos la fecha y hora
-            # Obtener el system prompt base (sin fecha/hora ni instrucciones de Tavily)
-            base_system_prompt = st.session_state.system_prompt
-            
-            # Reconstruir el system prompt con la fecha y hora actualizadas
-            system_prompt = f"{base_system_prompt} La fecha y hora actuales son: {date_time_str}."
-            
-            # Añadir información sobre la búsqueda web si está habilitada
-            if st.session_state.usar_tavily and get_tavily_api_key() and tavily_available:
-                if not "búsqueda web" in system_prompt.lower() and not "tavily" in system_prompt.lower():
-                    system_prompt += " Cuando el usuario solicite información actualizada o sobre eventos recientes, utiliza la herramienta de búsqueda web de Tavily para obtener y proporcionar información en tiempo real de fuentes confiables."
-            
-            # Actualizar el system prompt del agente
-            st.session_state.pydantic_agent._system_prompt = system_prompt
-            
-            # Guardar el system prompt realmente usado
-            st.session_state.system_prompt_actual = system_prompt
-        
-        # Ejecutar el agente con la historia de mensajes
         try:
-            # Placeholder para mostrar información sobre herramientas
-            tools_placeholder = st.empty()
-            tools_placeholder.markdown("⏳ Procesando tu consulta...")
-            
-            # Limpiar registro de herramientas utilizadas para esta consulta
-            if "herramientas_usadas" in st.session_state:
-                st.session_state.herramientas_usadas = []
-            
-            # Ejecutar el agente con la historia de mensajes y mostrar el proceso
-            st.session_state.debug_info = []
-            
-            # Configurar el callback para visualizar el proceso
-            def tool_callback(event_type, event_data):
-                if event_type == "tool_start":
-                    tool_info = f"Usando herramienta: {event_data.get('name', 'desconocida')}, Argumentos: {event_data.get('input')}"
-                    st.session_state.debug_info.append(tool_info)
-                    # Actualizar el placeholder para mostrar la herramienta en uso
-                    tools_placeholder.markdown(f"⚙️ {tool_info}...")
-                elif event_type == "tool_end":
-                    if "result" in event_data:
-                        result_summary = event_data["result"][:500] + "..." if len(event_data["result"]) > 500 else event_data["result"]
-                        tool_result = f"Resultado: {result_summary}"
-                        st.session_state.debug_info.append(tool_result)
-            
-            # Ejecutar el agente con callback
-            try:
-                result = st.session_state.pydantic_agent.run_sync(
-                    user_prompt, 
-                    message_history=st.session_state.pydantic_history,
-                    callbacks=[tool_callback]
-                )
-            except TypeError:
-                # Si el callback causa problemas, ejecutar sin él
-                result = st.session_state.pydantic_agent.run_sync(
-                    user_prompt, 
-                    message_history=st.session_state.pydantic_history
-                )
-            
-            # Actualizar la historia de mensajes
-            st.session_state.pydantic_history = result.all_messages()
-            
-            # Verificar si se utilizaron herramientas
-            response_data = result.data
+            # El agente se ejecuta en el bucle compartido; este hilo espera a que termine
+            all_messages = run_coroutine(stream_agent_turn(agent, user_prompt, message_history, reenviar))
+            response_data = "".join(response_parts)
             
             # Verificar si la respuesta contiene etiquetas de función o solo el nombre de la función
             function_patterns = ["<function=", "search_web("]
@@ -1281,55 +823,39 @@ def get_response_with_memory(user_prompt):
                 if response_data.strip() in ["search_web()", "search_web"]:
                     response_data = "Estoy buscando la información solicitada. Por favor espera un momento..."
                     
-                    # Esperar a que se complete la búsqueda antes de devolver la respuesta
-                    # Esta parte es necesaria para asegurarse de que los resultados estén disponibles
-                    # Comprobar si hay herramientas utilizadas
-                    if "herramientas_usadas" in st.session_state and st.session_state.herramientas_usadas:
-                        # Si hay herramientas usadas, significa que la búsqueda se completó
-                        # Volver a ejecutar el agente con los mismos parámetros para obtener una respuesta completa
+                    # Si hay herramientas usadas, significa que la búsqueda se completó:
+                    # volver a ejecutar el agente para obtener una respuesta completa
+                    if herramientas_usadas:
                         try:
-                            tools_placeholder.markdown("🔄 Procesando los resultados de la búsqueda...")
-                            result = st.session_state.pydantic_agent.run_sync(
+                            emit((EVENT_PROGRESS, "Procesando los resultados de la búsqueda"))
+                            result = run_coroutine(agent.run(
                                 f"Basándote en los resultados de búsqueda que acabas de obtener sobre '{user_prompt}', proporciona una respuesta informativa y completa.",
-                                message_history=st.session_state.pydantic_history
-                            )
+                                message_history=all_messages
+                            ))
                             # Actualizar con la nueva respuesta
-                            response_data = result.data
+                            response_data = result.output
                         except Exception as retry_e:
                             # Si falla el reintento, seguimos con la respuesta original
                             response_data += f"\n\nNo pude procesar completamente los resultados de la búsqueda: {str(retry_e)}"
                 else:
                     # Eliminar las etiquetas de función que están apareciendo en la UI
-                    response_data = response_data.replace("<function=", "").replace("</function>", "")
-                    # Si hay información JSON, intentamos limpiarla también
-                    import re
-                    response_data = re.sub(r'\{.*?\}', '', response_data)
-                    # Limpiar cualquier texto "search_web" suelto
-                    response_data = response_data.replace("search_web()", "").replace("search_web", "").strip()
+                    response_data = clean_function_call_text(response_data)
             
             # Verificar el registro de herramientas utilizadas
-            if "herramientas_usadas" in st.session_state and st.session_state.herramientas_usadas:
-                # Construir un razonamiento con los resultados de Tavily
-                thinking_content = "Consultando fuentes en tiempo real...\n\n"
-                
-                for tool_use in st.session_state.herramientas_usadas:
-                    if tool_use["tool"] == "search_web":
-                        thinking_content += f"Búsqueda web para: '{tool_use['query']}'\n\n"
-                        
-                        # Obtener los resultados completos de la última búsqueda
-                        if "ultima_busqueda" in st.session_state:
-                            thinking_content += st.session_state["ultima_busqueda"]["resultados"]
+            if herramientas_usadas:
+                # Construir un razonamiento con los resultados de la búsqueda web
+                thinking_content = search_thinking(herramientas_usadas)
                 
                 # Si la respuesta está vacía o es solo el mensaje de espera, intentar generar una mejor respuesta
                 if not response_data or response_data == "Estoy buscando la información solicitada. Por favor espera un momento...":
                     try:
-                        tools_placeholder.markdown("📝 Generando respuesta final basada en los resultados...")
+                        emit((EVENT_PROGRESS, "Generando respuesta final basada en los resultados"))
                         # Intento final para obtener una respuesta completa
-                        final_result = st.session_state.pydantic_agent.run_sync(
+                        final_result = run_coroutine(agent.run(
                             f"Basándote en la siguiente información de búsqueda web sobre '{user_prompt}', proporciona una respuesta completa y bien estructurada: {thinking_content}",
-                            message_history=st.session_state.pydantic_history
-                        )
-                        response_data = final_result.data
+                            message_history=all_messages
+                        ))
+                        response_data = final_result.output
                     except Exception:
                         # Si falla, usar una respuesta genérica
                         response_data = "He encontrado algunos resultados relevantes. Por favor revisa la sección de 'Razonamiento' para ver la información en detalle."
@@ -1337,136 +863,148 @@ def get_response_with_memory(user_prompt):
                 # Formatear la respuesta con el formato de pensamiento para que se muestre en la UI
                 response_data = f"<think>{thinking_content}</think>{response_data}"
             
-            # Limpiar el placeholder de herramientas
-            tools_placeholder.empty()
-            
-            # Devolver los datos procesados
-            return response_data
+            return {"respuesta": response_data, "mensajes": all_messages}
             
         except Exception as inner_e:
-            # Si hay un error específico con la ejecución
-            st.warning(f"Ajustando configuración: {str(inner_e)}")
-            result = st.session_state.pydantic_agent.run_sync(user_prompt)
-            
-            # Actualizar la historia de mensajes
-            st.session_state.pydantic_history = result.all_messages()
-            return result.data
+            # Si hay un error específico con la ejecución, reintentar sin historial
+            result = run_coroutine(agent.run(user_prompt))
+            return {
+                "respuesta": result.output,
+                "mensajes": result.all_messages(),
+                "aviso": f"Ajustando configuración: {str(inner_e)}"
+            }
             
     except Exception as e:
-        return f"Error al utilizar la memoria: {str(e)}"
+        return {"respuesta": f"Error al utilizar la memoria: {str(e)}"}
+
+# Función para obtener respuesta usando PydanticAI (con memoria) en segundo plano
+def get_response_with_memory(user_prompt):
+    # Verificar que pydantic está disponible
+    if not pydantic_available:
+        return encolar_generacion(lambda emit: {"respuesta": "La función de memoria requiere la biblioteca 'pydantic-ai'"})
+    
+    # Verificar si el system prompt ha cambiado desde el último uso
+    system_prompt_changed = st.session_state.system_prompt != st.session_state.last_used_system_prompt
+    
+    # Obtener el agente de la configuración actual (se reutiliza si ya existe en caché)
+    if st.session_state.pydantic_agent is None or system_prompt_changed:
+        st.session_state.pydantic_agent = setup_pydantic_agent(api_key, modelo_seleccionado)
+        # Actualizar el último system prompt utilizado
+        st.session_state.last_used_system_prompt = st.session_state.system_prompt
+        
+        if st.session_state.pydantic_agent is None:
+            return encolar_generacion(lambda emit: {"respuesta": "No se pudo inicializar el agente de memoria"})
+    else:
+        # La fecha y hora se añaden en cada ejecución mediante un system prompt dinámico
+        usar_busqueda = busqueda_web_disponible()
+        st.session_state.system_prompt_actual = f"{build_system_prompt(st.session_state.system_prompt, usar_busqueda)} {current_datetime_prompt()}"
+    
+    # Leer el historial del almacén, aplicar el resumen de los turnos antiguos si terminó
+    # entre turnos y recortarlo al presupuesto de tokens del modelo antes de enviarlo
+    historial_guardado = get_conversation_store().get_history(st.session_state.conversacion_id)
+    resumen = st.session_state.resumen_pendiente
+    message_history, tokens_enviados, presupuesto = prepare_history(
+        historial_guardado, resumen, max_tokens
+    )
+    if resumen is not None and resumen.done():
+        st.session_state.resumen_pendiente = None
+    st.session_state.tokens_historial = {
+        "enviados": tokens_enviados,
+        "presupuesto": presupuesto
+    }
+    
+    agent = st.session_state.pydantic_agent
+    
+    def generar(emit):
+        resultado = generar_respuesta_con_memoria(agent, user_prompt, message_history, emit)
+        if "mensajes" in resultado:
+            # Guardar solo los mensajes nuevos (o el historial entero si se recortó o resumió)
+            get_conversation_store().sync_history(conversacion_id, historial_guardado, resultado["mensajes"])
+        return resultado
+    
+    conversacion_id = st.session_state.conversacion_id
+    return encolar_generacion(generar)
+
+# Mostrar una generación en streaming desde su búfer; tras un rerun se vuelve a dibujar desde el principio
+def mostrar_generacion(trabajo, placeholder):
+    tools_placeholder = st.empty()
+    tools_placeholder.markdown("⏳ Procesando tu consulta...")
+    
+    # Registro de las herramientas utilizadas en esta consulta
+    st.session_state.herramientas_usadas = []
+    st.session_state.debug_info = []
+    
+    # Parser incremental: cada fragmento se procesa una sola vez
+    parser = ThinkTagParser()
+    
+    # Agrupar los fragmentos y redibujar como mucho STREAM_MAX_FPS veces por segundo
+    renderer = RenderScheduler(placeholder, parser.render_html, max_fps=STREAM_MAX_FPS)
+    
+    for tipo, dato in trabajo.iter_events():
+        if tipo == EVENT_TEXT:
+            parser.feed(dato)
+            renderer.notify()
+        elif tipo == EVENT_PROGRESS:
+            # Antes de la pausa de una herramienta, dibujar el texto retenido por el límite de frames
+            renderer.flush_pending()
+            st.session_state.debug_info.append(dato)
+            tools_placeholder.markdown(f"⚙️ {dato}...")
+        elif tipo == EVENT_TOOL:
+            renderer.flush_pending()
+            st.session_state.herramientas_usadas.append(dato)
+            st.session_state["ultima_busqueda"] = {
+                "query": dato["query"],
+                "resultados": dato["resultado"]
+            }
+    
+    # Mostrar cualquier texto que quedara pendiente y forzar el último frame
+    parser.finish()
+    renderer.flush()
+    tools_placeholder.empty()
+
+# Guardar el resultado de una generación terminada en la sesión (una sola vez, aunque haya reruns)
+def aplicar_generacion(trabajo):
+    if not get_generation_queue().pop(st.session_state.conversacion_id, trabajo):
+        return None
+    
+    if trabajo.error is not None:
+        resultado = {"respuesta": f"Error al comunicarse con Groq: {str(trabajo.error)}"}
+        st.session_state.messages.append({"role": "assistant", "content": resultado["respuesta"]})
+    else:
+        # La respuesta ya está guardada en el almacén por la generación
+        resultado = trabajo.result
+        st.session_state.messages.refresh()
+    
+    if "mensajes" in resultado:
+        # Si el historial se acerca al límite, resumir los turnos antiguos en segundo plano
+        presupuesto = st.session_state.get("tokens_historial", {}).get("presupuesto")
+        if (presupuesto and st.session_state.config_actual.get('resumir_historial', False)
+                and st.session_state.resumen_pendiente is None
+                and should_summarize(resultado["mensajes"], presupuesto)):
+            st.session_state.resumen_pendiente = start_summary(resultado["mensajes"], client)
+    return resultado
 
 # Mostrar historial de mensajes
 if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada:
     # Utilizar tipo_modelo de la configuración actual
     current_tipo_modelo = st.session_state.config_actual['tipo_modelo']
     
-    for message in st.session_state.messages:
-        role = message["role"]
-        content = message["content"]
+    # Mostrar solo los últimos mensajes; el historial completo sigue en la sesión
+    mensajes_ocultos, mensajes_visibles = history_window(
+        st.session_state.messages, st.session_state.mensajes_visibles
+    )
+    
+    if mensajes_ocultos:
+        with st.expander(f"🗂️ {mensajes_ocultos} mensajes anteriores ocultos", expanded=False):
+            st.markdown(summarize_hidden_messages(st.session_state.messages, mensajes_ocultos))
         
-        if role == "user":
-            # Escapar caracteres especiales HTML en el mensaje del usuario
-            safe_content = content.replace("<", "&lt;").replace(">", "&gt;")
-            
-            st.markdown(f"""
-            <div class="chat-container user-message">
-                <div class="user-header">Tú:</div>
-                <div class="chat-text">{safe_content}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            # Limpiar agresivamente cualquier etiqueta HTML incorrecta
-            # Patrones comunes de etiquetas que podrían aparecer incorrectamente
-            html_patterns = [
-                "</div>", 
-                '<div class="chat-text">', 
-                '<div class=', 
-                '</div>', 
-                '<span', 
-                '</span>'
-            ]
-            
-            # Crear una copia para procesar
-            clean_content = content
-            
-            # Verificar si el contenido ya tiene etiquetas HTML incorrectas
-            has_html_tags = any(pattern in clean_content for pattern in html_patterns)
-            
-            # Limpiar todas las etiquetas HTML posibles
-            if has_html_tags:
-                for pattern in html_patterns:
-                    clean_content = clean_content.replace(pattern, '')
-                clean_content = clean_content.strip()
-            
-            # Escapar caracteres especiales HTML en el mensaje limpio
-            safe_content = clean_content.replace("<", "&lt;").replace(">", "&gt;")
-            
-            # Siempre buscar etiquetas <think> independientemente del tipo de modelo
-            # Buscar con y sin escape en HTML
-            thinking_start = -1
-            thinking_end = -1
-            has_thinking_tags = False
-            thinking_content = ""
-            answer_content = ""
-            
-            # Probar formato sin escapar en el contenido limpio pero sin escapar
-            if "<think>" in clean_content and "</think>" in clean_content:
-                has_thinking_tags = True
-                thinking_start = clean_content.find("<think>")
-                thinking_end = clean_content.find("</think>")
-                
-                # Extraer contenido
-                thinking_content = clean_content[thinking_start + 7:thinking_end].strip()
-                answer_content = clean_content[thinking_end + 8:].strip()
-            # Probar formato escapado como respaldo
-            elif "&lt;think&gt;" in safe_content and "&lt;/think&gt;" in safe_content:
-                has_thinking_tags = True
-                thinking_start = safe_content.find("&lt;think&gt;")
-                thinking_end = safe_content.find("&lt;/think&gt;")
-                
-                # Extraer contenido
-                thinking_content = safe_content[thinking_start + 12:thinking_end].strip()
-                answer_content = safe_content[thinking_end + 13:].strip()
-            
-            # Si se encontraron etiquetas de pensamiento, mostrar razonamiento y respuesta
-            if has_thinking_tags:
-                # Escapar para visualización si no estaba ya escapado
-                if "<" in thinking_content or ">" in thinking_content:
-                    safe_thinking = thinking_content.replace("<", "&lt;").replace(">", "&gt;")
-                else:
-                    safe_thinking = thinking_content
-                    
-                if "<" in answer_content or ">" in answer_content:
-                    safe_answer = answer_content.replace("<", "&lt;").replace(">", "&gt;")
-                else:
-                    safe_answer = answer_content
-                
-                # Si el answer_content está vacío, añadir un mensaje predeterminado
-                if not safe_answer:
-                    safe_answer = "El modelo proporcionó sólo su razonamiento."
-                
-                st.markdown(f"""
-                <div class="chat-container assistant-message">
-                    <div class="assistant-header">
-                        Asistente:
-                    </div>
-                    <div class="reasoning-section">
-                        <div class="thinking-title">Razonamiento:</div>
-                        <div class="reasoning-content">{safe_thinking}</div>
-                    </div>
-                    <div class="chat-text">{safe_answer}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # No hay etiquetas de razonamiento, mostrar el mensaje normal
-                st.markdown(f"""
-                <div class="chat-container assistant-message">
-                    <div class="assistant-header">
-                        Asistente:
-                    </div>
-                    <div class="chat-text">{safe_content}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        if st.button("⬆️ Cargar mensajes anteriores", key="cargar_anteriores_btn", use_container_width=True):
+            st.session_state.mensajes_visibles += HISTORY_WINDOW_SIZE
+            st.rerun()
+    
+    for message in mensajes_visibles:
+        # El HTML de cada mensaje se genera una sola vez y se reutiliza en cada rerun
+        st.markdown(get_message_html(message), unsafe_allow_html=True)
 
 # Input del usuario o procesamiento de audio
 if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada:
@@ -1475,8 +1013,20 @@ if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada
     
     if current_tipo_modelo == "Audio a Texto" and uploaded_file is not None:
         if st.button("Transcribir Audio"):
+            from models.batch_transcription import get_rate_limiter
+            
             with st.spinner("Transcribiendo audio..."):
-                transcription = process_audio_file(uploaded_file, modelo_seleccionado)
+                # El audio suelto comparte el límite de peticiones con los lotes de la misma API key
+                transcription = process_audio_file(
+                    uploaded_file,
+                    modelo_seleccionado,
+                    client,
+                    preprocess=st.session_state.config_actual.get('preprocesar_audio', TRANSCRIPTION_PREPROCESS),
+                    rate_limiter=get_rate_limiter(
+                        api_key,
+                        float(st.session_state.config_actual.get('transcripciones_por_minuto', TRANSCRIPTION_RATE_LIMIT_PER_MINUTE))
+                    )
+                )
                 
                 # Agregar mensaje del usuario al historial
                 archivo_mensaje = f"[Audio: {uploaded_file.name}]"
@@ -1507,12 +1057,77 @@ if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada
                 # Limpiar el archivo subido
                 uploaded_file = None
                 st.rerun()
+    elif current_tipo_modelo == "Audio a Texto" and len(uploaded_files) > 1:
+        if st.button(f"Transcribir {len(uploaded_files)} audios"):
+            from models.batch_transcription import (
+                COMPLETADO,
+                ERROR,
+                PENDIENTE,
+                TRANSCRIBIENDO,
+                export_transcriptions,
+                get_rate_limiter,
+                iter_batch_transcriptions
+            )
+            
+            # Una fila de progreso por archivo
+            iconos = {PENDIENTE: "⏳", TRANSCRIBIENDO: "🎙️", COMPLETADO: "✅", ERROR: "❌"}
+            barra_progreso = st.progress(0.0, text="Transcribiendo audios...")
+            filas = [st.empty() for _ in uploaded_files]
+            for fila, archivo in zip(filas, uploaded_files):
+                fila.markdown(f"{iconos[PENDIENTE]} {archivo.name}")
+            
+            transcripciones = [""] * len(uploaded_files)
+            terminados = 0
+            eventos = iter_batch_transcriptions(
+                client,
+                modelo_seleccionado,
+                uploaded_files,
+                max_concurrency=int(st.session_state.config_actual.get('transcripciones_concurrentes', TRANSCRIPTION_BATCH_CONCURRENCY)),
+                rate_limiter=get_rate_limiter(
+                    api_key,
+                    float(st.session_state.config_actual.get('transcripciones_por_minuto', TRANSCRIPTION_RATE_LIMIT_PER_MINUTE)),
+                    burst=int(st.session_state.config_actual.get('transcripciones_concurrentes', TRANSCRIPTION_BATCH_CONCURRENCY))
+                ),
+                preprocess=st.session_state.config_actual.get('preprocesar_audio', TRANSCRIPTION_PREPROCESS)
+            )
+            for indice, estado, texto in eventos:
+                filas[indice].markdown(f"{iconos[estado]} {uploaded_files[indice].name}")
+                if estado in (COMPLETADO, ERROR):
+                    transcripciones[indice] = texto
+                    terminados += 1
+                    barra_progreso.progress(terminados / len(uploaded_files),
+                                            text=f"{terminados} de {len(uploaded_files)} audios transcritos")
+            
+            # Agregar cada audio y su transcripción al historial, en el orden de subida
+            st.session_state.messages.extend(
+                mensaje
+                for archivo, transcripcion in zip(uploaded_files, transcripciones)
+                for mensaje in ({"role": "user", "content": f"[Audio: {archivo.name}]"},
+                                {"role": "assistant", "content": transcripcion})
+            )
+            
+            # Guardar el documento conjunto para ofrecer su descarga
+            st.session_state.exportacion_lote = (
+                f"transcripciones_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                export_transcriptions([archivo.name for archivo in uploaded_files], transcripciones)
+            )
+            st.rerun()
     else:
-        # Input de texto normal para otros tipos de modelos
-        prompt = st.chat_input("Escribe tu mensaje aquí...")
+        # Input de texto normal para otros tipos de modelos (deshabilitado mientras se genera una respuesta)
+        cola = get_generation_queue()
+        trabajo = cola.get(st.session_state.conversacion_id)
+        entrada_deshabilitada = trabajo is not None and not trabajo.done()
+        prompt = st.chat_input("Escribe tu mensaje aquí...", disabled=entrada_deshabilitada)
+        
+        # Guardar antes la respuesta anterior si un rerun la dejó terminada sin recoger
+        if prompt and trabajo is not None and trabajo.done():
+            aplicar_generacion(trabajo)
+            trabajo = None
+        elif prompt and trabajo is not None:
+            st.warning("Espera a que termine la respuesta en curso.")
         
         # Procesar input del usuario
-        if prompt and api_key:
+        if prompt and api_key and trabajo is None:
             # Agregar mensaje del usuario al historial
             st.session_state.messages.append({"role": "user", "content": prompt})
             
@@ -1524,39 +1139,10 @@ if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada
             </div>
             """, unsafe_allow_html=True)
             
-            # Crear un placeholder para la respuesta en streaming
-            response_placeholder = st.empty()
-            
             # Usar pydantic sólo si la memoria está activada manualmente por el usuario
             if pydantic_available and st.session_state.memoria_activa and current_tipo_modelo in ["Conversación", "Razonamiento"]:
-                # Obtener respuesta con memoria usando PydanticAI
-                with st.spinner("Pensando..."):
-                    response = get_response_with_memory(prompt)
-                    
-                    # Escapar caracteres especiales HTML en la respuesta
-                    safe_response = response.replace("<", "&lt;").replace(">", "&gt;")
-                    
-                    # Formatear la respuesta
-                    formatted_response = f"""
-                    <div class="chat-container assistant-message">
-                        <div class="assistant-header">
-                            Asistente:
-                        </div>
-                        <div class="chat-text">{safe_response}</div>
-                    </div>
-                    """
-                    
-                    # Mostrar la respuesta
-                    response_placeholder.markdown(formatted_response, unsafe_allow_html=True)
-                    
-                    # Procesar el mensaje para asegurar un formato correcto de etiquetas <think>
-                    processed_response = procesar_mensaje_razonamiento(response)
-                    
-                    # Guardar la respuesta procesada en el historial
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": processed_response
-                    })
+                # Generar la respuesta con memoria usando PydanticAI (en segundo plano)
+                trabajo = get_response_with_memory(prompt)
             else:
                 # Mostrar mensaje si pydantic no está disponible pero se intenta usar memoria
                 if current_tipo_modelo in ["Conversación", "Razonamiento"] and st.session_state.memoria_activa and not pydantic_available:
@@ -1580,36 +1166,25 @@ if st.session_state.pagina_actual == 'chat' and st.session_state.config_guardada
                 if current_tipo_modelo == "Razonamiento":
                     current_razonamiento_formato = "raw"
                 
-                # Obtener respuesta del modelo con streaming (sin memoria)
-                response = get_response_streaming(messages_for_api, response_placeholder, current_razonamiento_formato, current_tipo_modelo)
-                
-                # Limpiar cualquier etiqueta HTML antes de guardar en el historial
-                html_patterns = [
-                    "</div>", 
-                    '<div class="chat-text">', 
-                    '<div class=', 
-                    '</div>', 
-                    '<span', 
-                    '</span>'
-                ]
-                
-                # Verificar si el contenido tiene etiquetas HTML incorrectas
-                has_html_tags = any(pattern in response for pattern in html_patterns)
-                
-                # Limpiar la respuesta si es necesario
-                clean_response = response
-                if has_html_tags:
-                    for pattern in html_patterns:
-                        clean_response = clean_response.replace(pattern, '')
-                
-                # Eliminar espacios extras y asegurarse de que la respuesta esté limpia
-                clean_response = clean_response.strip()
-                
-                # Procesar el mensaje para asegurar un formato correcto de etiquetas <think>
-                processed_response = procesar_mensaje_razonamiento(clean_response)
-                
-                # Guardar la respuesta procesada en el historial
-                st.session_state.messages.append({"role": "assistant", "content": processed_response})
+                # Generar la respuesta del modelo en segundo plano (sin memoria)
+                trabajo = get_response_streaming(messages_for_api, current_razonamiento_formato, current_tipo_modelo)
+        
+        # Mostrar la respuesta en curso. Si un rerun interrumpe el dibujado, la generación
+        # sigue en segundo plano y el siguiente rerun la vuelve a mostrar desde su búfer
+        if trabajo is not None:
+            # Crear un placeholder para la respuesta en streaming
+            response_placeholder = st.empty()
+            mostrar_generacion(trabajo, response_placeholder)
+            
+            resultado = aplicar_generacion(trabajo)
+            if resultado is not None:
+                # Mostrar la respuesta final, que puede incluir el razonamiento de las búsquedas
+                response_placeholder.markdown(render_text_html(resultado["respuesta"]), unsafe_allow_html=True)
+                if resultado.get("aviso"):
+                    st.warning(resultado["aviso"])
+                elif entrada_deshabilitada:
+                    # Volver a habilitar el input, que se dibujó deshabilitado en este rerun
+                    st.rerun()
 
 # Mostrar los últimos parámetros utilizados si existen
 if 'last_request_params' in st.session_state:
@@ -1619,6 +1194,29 @@ if 'last_request_params' in st.session_state:
     st.sidebar.text(f"Temperatura: {st.session_state['last_request_params']['temperatura']}")
     st.sidebar.text(f"Tokens máximos: {st.session_state['last_request_params']['max_tokens']}")
 
+# Mostrar las estadísticas de la caché de búsquedas web
+if st.session_state.pagina_actual == 'chat' and st.session_state.config_actual.get('usar_tavily', False):
+    cache_stats = get_search_cache().stats()
+    st.sidebar.caption(
+        f"Caché de búsquedas: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos "
+        f"({cache_stats['entries']}/{cache_stats['max_entries']} entradas)"
+    )
+
+# Mostrar las estadísticas de la caché de respuestas del modo sin memoria
+if st.session_state.pagina_actual == 'chat' and st.session_state.config_actual.get('cache_respuestas', False):
+    cache_stats = get_response_cache().stats()
+    st.sidebar.caption(
+        f"Caché de respuestas: {cache_stats['hits']} aciertos ({cache_stats['semantic_hits']} por similitud), "
+        f"{cache_stats['misses']} fallos ({cache_stats['entries']}/{cache_stats['max_entries']} entradas)"
+    )
+
+# Mostrar cuántos tokens de historial se enviaron en la última consulta con memoria
+if 'tokens_historial' in st.session_state and st.session_state.pagina_actual == 'chat':
+    st.sidebar.caption(
+        f"Historial enviado: ~{st.session_state.tokens_historial['enviados']} tokens "
+        f"(límite {st.session_state.tokens_historial['presupuesto']})"
+    )
+
 # Información sobre cómo obtener API key de Groq
 if st.session_state.pagina_actual == 'configuracion':
     st.sidebar.markdown("---")
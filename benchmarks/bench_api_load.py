@@ -0,0 +1,246 @@
+"""
+Prueba de carga de la API HTTP (`api.server`) contra un stub local de Groq.
+
+Arranca en un hilo un servidor HTTP que imita la API de Groq (chat en streaming
+con una latencia configurable por token y transcripciones) y apunta el cliente
+a él con `GROQ_BASE_URL`. Después abre N conversaciones concurrentes, envía M
+mensajes en cada una y mide el tiempo hasta el primer token, la duración de
+cada turno y el rendimiento total, junto con las peticiones en streaming que
+llegaron al stub (las preguntas idénticas en curso se agrupan en una sola, ver
+`models.request_coalescing`; `REQUEST_COALESCING=0` lo desactiva).
+
+Por defecto la aplicación ASGI se llama en el mismo proceso; con `--url` se
+prueba un servidor ya arrancado (por ejemplo `uvicorn api.server:app`), que
+debe tener `GROQ_BASE_URL` apuntando al stub (`--solo-stub` lo deja corriendo).
+
+Uso:
+    python benchmarks/bench_api_load.py --conversaciones 50 --mensajes 3
+    python benchmarks/bench_api_load.py --solo-stub --puerto-stub 8099
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _StubGroq(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    tokens = 20
+    token_delay = 0.01
+    stream_requests = 0
+    _counter_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("content-length", 0)))
+
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, content: Optional[str], finish: Optional[str] = None) -> bytes:
+        chunk = {
+            "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": finish}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+    def do_POST(self):
+        if self.path.endswith("/audio/transcriptions"):
+            self._read_body()
+            time.sleep(self.token_delay * self.tokens)
+            self._send_json({"text": "texto transcrito"})
+            return
+
+        request = json.loads(self._read_body() or b"{}")
+        self.model = request.get("model", "stub")
+        if not request.get("stream"):
+            time.sleep(self.token_delay * self.tokens)
+            self._send_json({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": self.model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "respuesta " * self.tokens}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": self.tokens, "total_tokens": 10 + self.tokens}
+            })
+            return
+
+        with self._counter_lock:
+            _StubGroq.stream_requests += 1
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        chunks = [self._chunk(f"token{i} ") for i in range(self.tokens)]
+        chunks += [self._chunk(None, "stop"), b"data: [DONE]\n\n"]
+        for chunk in chunks:
+            time.sleep(self.token_delay)
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+def start_stub(port: int, tokens: int, token_delay: float) -> ThreadingHTTPServer:
+    """Arranca el stub de Groq en un hilo y devuelve el servidor."""
+    _StubGroq.tokens = tokens
+    _StubGroq.token_delay = token_delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), _StubGroq)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _parse_sse(body: bytes) -> List[Tuple[str, dict]]:
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+class _InProcessClient:
+    """Llama a la aplicación ASGI directamente, sin red."""
+
+    def __init__(self):
+        from api.server import app
+        self.app = app
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None,
+                      first_token: Optional[list] = None) -> Tuple[int, bytes]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+        status = []
+        chunks = []
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                await asyncio.Event().wait()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif message.get("body"):
+                if first_token is not None and not first_token and b"event: token" in message["body"]:
+                    first_token.append(time.perf_counter())
+                chunks.append(message["body"])
+
+        await self.app(scope, receive, send)
+        return status[0], b"".join(chunks)
+
+    async def close(self):
+        pass
+
+class _HTTPClient:
+    """Prueba un servidor ya arrancado en `url`."""
+
+    def __init__(self, url: str):
+        import httpx
+        self.client = httpx.AsyncClient(base_url=url, timeout=None,
+                                        limits=httpx.Limits(max_connections=None))
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None,
+                      first_token: Optional[list] = None) -> Tuple[int, bytes]:
+        chunks = []
+        async with self.client.stream(method, path, json=payload) as response:
+            async for chunk in response.aiter_bytes():
+                if first_token is not None and not first_token and b"event: token" in chunk:
+                    first_token.append(time.perf_counter())
+                chunks.append(chunk)
+        return response.status_code, b"".join(chunks)
+
+    async def close(self):
+        await self.client.aclose()
+
+async def _conversation(client, messages: int, memory: bool, results: list):
+    status, body = await client.request("POST", "/conversations", {"memory": memory})
+    if status != 201:
+        raise RuntimeError(f"No se pudo crear la conversación: {status} {body!r}")
+    conversation_id = json.loads(body)["id"]
+    for i in range(messages):
+        first_token: List[float] = []
+        start = time.perf_counter()
+        status, body = await client.request("POST", f"/conversations/{conversation_id}/messages",
+                                            {"content": f"Pregunta {i}"}, first_token)
+        end = time.perf_counter()
+        events = _parse_sse(body)
+        ok = status == 200 and bool(events) and events[-1][0] == "done"
+        results.append((ok, (first_token[0] - start) if first_token else None, end - start,
+                        events[-1][1] if events and not ok else None))
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+async def _run(args):
+    client = _HTTPClient(args.url) if args.url else _InProcessClient()
+    results: list = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _conversation(client, args.mensajes, args.memoria, results)
+            for _ in range(args.conversaciones)
+        ))
+    finally:
+        await client.close()
+    duration = time.perf_counter() - start
+
+    ok = [result for result in results if result[0]]
+    print(f"{args.conversaciones} conversaciones x {args.mensajes} mensajes "
+          f"({'memoria' if args.memoria else 'sin memoria'}, {'--url ' + args.url if args.url else 'en proceso'})")
+    print(f"  turnos correctos: {len(ok)}/{len(results)} en {duration:.2f} s "
+          f"({len(ok) / duration:.1f} turnos/s)")
+    errors = [result[3] for result in results if not result[0]]
+    if errors:
+        print(f"  primer error: {errors[0]}")
+    if ok:
+        ttft = [result[1] for result in ok if result[1] is not None]
+        total = [result[2] for result in ok]
+        if ttft:
+            print(f"  primer token: p50 {statistics.median(ttft) * 1000:.0f} ms  "
+                  f"p95 {_percentile(ttft, 0.95) * 1000:.0f} ms")
+        print(f"  turno completo: p50 {statistics.median(total) * 1000:.0f} ms  "
+              f"p95 {_percentile(total, 0.95) * 1000:.0f} ms")
+    if not args.url:
+        print(f"  peticiones en streaming al stub: {_StubGroq.stream_requests}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversaciones", type=int, default=50, help="Conversaciones concurrentes")
+    parser.add_argument("--mensajes", type=int, default=3, help="Mensajes por conversación")
+    parser.add_argument("--tokens", type=int, default=20, help="Tokens por respuesta del stub")
+    parser.add_argument("--latencia-token", type=float, default=0.01, help="Segundos entre tokens del stub")
+    parser.add_argument("--memoria", action="store_true", help="Usar el modo con memoria (requiere pydantic-ai)")
+    parser.add_argument("--url", help="URL de un servidor de la API ya arrancado")
+    parser.add_argument("--puerto-stub", type=int, default=0, help="Puerto del stub de Groq (0: libre)")
+    parser.add_argument("--solo-stub", action="store_true", help="Arrancar solo el stub y esperar")
+    args = parser.parse_args()
+
+    stub = start_stub(args.puerto_stub, args.tokens, args.latencia_token)
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    if args.solo_stub:
+        print(f"Stub de Groq en {base_url} (exporta GROQ_BASE_URL={base_url})")
+        threading.Event().wait()
+
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    asyncio.run(_run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de memoria de la transcripción con subidas de audio concurrentes.
+
+Simula N usuarios que suben a la vez un WAV de M MB (como `BytesIO`, igual que
+los archivos subidos a Streamlit) y mide el pico de memoria residente (RSS) por
+subida en dos escenarios, cada uno en un proceso nuevo:
+
+- copia: se llama a `file.getvalue()` antes de transcribir (comportamiento anterior)
+- streaming: se transcribe directamente desde el archivo subido
+
+El cliente de Groq se sustituye por uno local que lee el archivo por bloques,
+como hace httpx al construir la petición multipart.
+
+Uso:
+    python benchmarks/bench_audio_memory.py --subidas 8 --mb 50
+"""
+
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.transcription import DECODE_SAMPLE_RATE, encode_wav, transcribe_audio  # noqa: E402
+
+class _TranscripcionesFalsas:
+    def create(self, model, file):
+        _, audio = file
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+        # Consumir el archivo por bloques, como httpx al enviarlo
+        while audio.read(64 * 1024):
+            pass
+        # Simular la latencia de la API
+        time.sleep(0.05)
+        return types.SimpleNamespace(text="texto transcrito")
+
+class _ClienteFalso:
+    def __init__(self):
+        self.audio = types.SimpleNamespace(transcriptions=_TranscripcionesFalsas())
+
+def _crear_subida(mb: int, semilla: int) -> io.BytesIO:
+    rng = np.random.default_rng(semilla)
+    muestras = rng.integers(-2000, 2000, size=mb * 1024 * 1024 // 2, dtype=np.int16)
+    return io.BytesIO(encode_wav(muestras, DECODE_SAMPLE_RATE))
+
+def _max_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+def _medir(modo: str, subidas: int, mb: int):
+    archivos = [_crear_subida(mb, i) for i in range(subidas)]
+    base = _max_rss_mb()
+    client = _ClienteFalso()
+
+    def procesar(archivo):
+        audio = archivo.getvalue() if modo == "copia" else archivo
+        return transcribe_audio(client, "whisper-large-v3", audio, "audio.wav", use_cache=False)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=subidas) as pool:
+        list(pool.map(procesar, archivos))
+    duracion = time.perf_counter() - inicio
+
+    pico = _max_rss_mb()
+    print(f"{base:.1f} {pico:.1f} {duracion:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subidas", type=int, default=8, help="Subidas concurrentes")
+    parser.add_argument("--mb", type=int, default=50, help="Tamaño de cada audio en MB")
+    parser.add_argument("--modo", choices=["copia", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        _medir(args.modo, args.subidas, args.mb)
+        return
+
+    print(f"{args.subidas} subidas concurrentes de {args.mb} MB")
+    for modo in ("copia", "streaming"):
+        # Cada escenario en un proceso nuevo para que el pico de RSS sea independiente
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--modo", modo,
+             "--subidas", str(args.subidas), "--mb", str(args.mb)],
+            check=True, capture_output=True, text=True
+        ).stdout.split()
+        base, pico, duracion = (float(valor) for valor in salida)
+        por_subida = (pico - base) / args.subidas
+        print(f"  {modo:<10} pico RSS {pico:8.1f} MB  "
+              f"(+{pico - base:7.1f} MB, {por_subida:6.1f} MB por subida)  {duracion:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de reutilización de conexiones HTTP entre sesiones concurrentes.
+
+Simula N sesiones de Streamlit que hacen varias peticiones cada una contra un
+servidor HTTP local y cuenta cuántas conexiones TCP se abren en dos escenarios:
+
+- por sesión: cada sesión crea su propio cliente HTTP (comportamiento anterior)
+- compartido: todas las sesiones usan el cliente de `utils.http_pool`
+
+Las sesiones se ejecutan como mucho `--concurrencia` a la vez (por defecto, las
+conexiones que el pool compartido mantiene abiertas), de modo que hay más
+sesiones que conexiones en el pool: con el cliente compartido las sesiones
+nuevas reutilizan las conexiones de las anteriores en lugar de abrir otras.
+Con más sesiones a la vez que `HTTP_MAX_KEEPALIVE_CONNECTIONS`, el pool cierra
+las conexiones sobrantes tras cada petición y el recuento lo refleja.
+
+Uso:
+    python benchmarks/bench_connection_pool.py --sesiones 100 --peticiones 5 --concurrencia 20
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import HTTP_MAX_KEEPALIVE_CONNECTIONS  # noqa: E402
+from utils.http_pool import get_shared_http_client  # noqa: E402
+
+class _ContadorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    conexiones = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _ContadorHandler.lock:
+            _ContadorHandler.conexiones += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        # Simular la latencia de la API
+        time.sleep(0.01)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+def _sesion(url: str, peticiones: int, compartido: bool):
+    client = get_shared_http_client() if compartido else httpx.Client()
+    try:
+        for _ in range(peticiones):
+            client.post(url, json={"messages": []}).raise_for_status()
+    finally:
+        if not compartido:
+            client.close()
+
+def _escenario(url: str, sesiones: int, peticiones: int, concurrencia: int, compartido: bool):
+    _ContadorHandler.conexiones = 0
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrencia, sesiones))) as pool:
+        list(pool.map(lambda _: _sesion(url, peticiones, compartido), range(sesiones)))
+    return _ContadorHandler.conexiones, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sesiones", type=int, default=100, help="Sesiones concurrentes simuladas")
+    parser.add_argument("--peticiones", type=int, default=5, help="Peticiones por sesión")
+    parser.add_argument("--concurrencia", type=int, default=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                        help="Sesiones activas a la vez")
+    args = parser.parse_args()
+
+    # La cola de conexiones pendientes por defecto (5) resetea conexiones con muchas sesiones a la vez
+    _Servidor.request_queue_size = max(128, args.sesiones, args.concurrencia)
+    server = _Servidor(("127.0.0.1", 0), _ContadorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+
+    total = args.sesiones * args.peticiones
+    print(f"{args.sesiones} sesiones x {args.peticiones} peticiones = {total} peticiones "
+          f"({args.concurrencia} sesiones a la vez)")
+    for nombre, compartido in (("por sesión", False), ("compartido", True)):
+        conexiones, segundos = _escenario(url, args.sesiones, args.peticiones, args.concurrencia, compartido)
+        print(f"{nombre:>12}: {conexiones:5d} conexiones abiertas, {segundos:6.2f} s")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de memoria del historial de PydanticAI por sesión.
+
+Genera N sesiones sintéticas de T turnos (pregunta, respuesta y, cada pocos
+turnos, una búsqueda web con su resultado) y mide con `tracemalloc` la memoria
+que ocupa el historial de todas las sesiones en tres formatos:
+
+- objetos: la lista de mensajes de PydanticAI (`result.all_messages()`)
+- json: cada mensaje serializado con el JSON completo de PydanticAI
+- compacto: `utils.history_codec.CompactHistory` (bytes, decodificado al enviarlo)
+
+También muestra el tiempo de decodificar el historial compacto de una sesión,
+que es lo que se paga en cada turno al enviarlo al agente.
+
+Uso:
+    python benchmarks/bench_history_memory.py --sesiones 200 --turnos 20
+"""
+
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic_ai.messages import (  # noqa: E402
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart
+)
+
+from utils.history_codec import CompactHistory  # noqa: E402
+
+_PALABRAS = ("el la de que en un una para con por los las del se su al lo como más pero sus "
+             "búsqueda resultado modelo respuesta usuario información datos fecha tiempo").split()
+
+def _texto(rng: random.Random, caracteres: int) -> str:
+    palabras = []
+    total = 0
+    while total < caracteres:
+        palabra = rng.choice(_PALABRAS)
+        palabras.append(palabra)
+        total += len(palabra) + 1
+    return " ".join(palabras)
+
+def _sesion(rng: random.Random, turnos: int, sistema: str) -> list:
+    mensajes = []
+    for turno in range(turnos):
+        partes = [UserPromptPart(_texto(rng, 200))]
+        if turno == 0:
+            partes.insert(0, SystemPromptPart(sistema, dynamic_ref="fecha_y_hora"))
+        mensajes.append(ModelRequest(parts=partes))
+        if turno % 3 == 2:
+            call_id = f"call_{turno}"
+            mensajes.append(ModelResponse(parts=[ToolCallPart("search_web", {"query": _texto(rng, 40)}, call_id)],
+                                          model_name="llama-3.3-70b-versatile"))
+            mensajes.append(ModelRequest(parts=[ToolReturnPart("search_web", _texto(rng, 1500), call_id)]))
+        mensajes.append(ModelResponse(parts=[TextPart(_texto(rng, 800))], model_name="llama-3.3-70b-versatile"))
+    return mensajes
+
+def _medir(construir):
+    gc.collect()
+    tracemalloc.start()
+    datos = construir()
+    gc.collect()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return actual, datos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sesiones", type=int, default=200, help="Número de sesiones")
+    parser.add_argument("--turnos", type=int, default=20, help="Turnos por sesión")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sistema = _texto(rng, 400)
+    sesiones = [_sesion(rng, args.turnos, sistema) for _ in range(args.sesiones)]
+    lineas = [CompactHistory.from_messages(mensajes).to_bytes() for mensajes in sesiones]
+
+    # Cada formato se construye dentro de la medición para contar solo lo que retiene
+    formatos = {
+        "objetos": lambda: [CompactHistory.from_bytes(datos).decode() for datos in lineas],
+        "json": lambda: [[ModelMessagesTypeAdapter.dump_json([mensaje]) for mensaje in mensajes]
+                         for mensajes in sesiones],
+        "compacto": lambda: [CompactHistory.from_messages(mensajes) for mensajes in sesiones]
+    }
+
+    mensajes_por_sesion = len(sesiones[0])
+    print(f"{args.sesiones} sesiones de {args.turnos} turnos ({mensajes_por_sesion} mensajes por sesión)")
+    resultados = {}
+    for nombre, construir in formatos.items():
+        memoria, datos = _medir(construir)
+        # Solo se conserva el historial compacto, para medir después su decodificación
+        resultados[nombre] = (memoria, datos if nombre == "compacto" else None)
+    base = resultados["objetos"][0]
+    for nombre, (memoria, _) in resultados.items():
+        print(f"  {nombre:<9} {memoria / 1024 / 1024:8.2f} MB  "
+              f"({memoria / args.sesiones / 1024:7.1f} KB por sesión, {memoria / base:5.1%} de objetos)")
+
+    compactos = resultados["compacto"][1]
+    tiempos = []
+    for historial in compactos[:50]:
+        inicio = time.perf_counter()
+        historial.decode()
+        tiempos.append(time.perf_counter() - inicio)
+    print(f"\nDecodificar el historial compacto de una sesión: "
+          f"mediana {statistics.median(tiempos) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
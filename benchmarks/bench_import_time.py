@@ -0,0 +1,102 @@
+"""
+Benchmark del tiempo de importación al arrancar la aplicación.
+
+Ejecuta las importaciones de nivel superior de `app.py` en un proceso nuevo con
+`python -X importtime`, varias veces, y muestra la mediana del tiempo total, los
+módulos más lentos y qué dependencias pesadas se han cargado antes de dibujar
+la primera página. Con `--script` se ejecuta `app.py` completo en modo "bare"
+de Streamlit (requiere streamlit instalado).
+
+Uso:
+    python benchmarks/bench_import_time.py --repeticiones 5 --top 15
+"""
+
+import argparse
+import ast
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencias que no deberían cargarse hasta que se usan
+DEPENDENCIAS_PESADAS = ["pydantic_ai", "pydantic", "tavily", "duckduckgo_search", "nest_asyncio",
+                        "groq", "httpx", "numpy"]
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def _importaciones(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [
+        ast.get_source_segment(source, node)
+        for node in ast.parse(source).body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+def _codigo_importaciones(sentencias: List[str]) -> str:
+    # Cada importación por separado para poder medir aunque falte alguna dependencia
+    bloques = []
+    for sentencia in sentencias:
+        bloques.append(f"try:\n    {sentencia.replace(chr(10), ' ')}\n"
+                       f"except ImportError as e:\n    print('No disponible:', e.name)")
+    return "\n".join(bloques)
+
+def _medir(codigo: str) -> Tuple[int, Dict[str, int], str]:
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    acumulado: Dict[str, int] = {}
+    total = 0
+    for linea in proceso.stderr.splitlines():
+        match = _LINEA.match(linea)
+        if not match:
+            continue
+        _, cumulative, sangria, nombre = match.groups()
+        acumulado[nombre] = int(cumulative)
+        # Las líneas sin sangría son importaciones de nivel superior
+        if not sangria.strip(" ") and len(sangria) == 1:
+            total += int(cumulative)
+    return total, acumulado, proceso.stdout
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archivo", default=os.path.join(ROOT, "app.py"), help="Script a medir")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Número de procesos medidos")
+    parser.add_argument("--top", type=int, default=15, help="Módulos más lentos a mostrar")
+    parser.add_argument("--script", action="store_true",
+                        help="Ejecutar el script completo en vez de solo sus importaciones")
+    args = parser.parse_args()
+
+    if args.script:
+        codigo = f"import runpy; runpy.run_path({args.archivo!r}, run_name='__main__')"
+    else:
+        codigo = _codigo_importaciones(_importaciones(args.archivo))
+
+    totales = []
+    acumulado: Dict[str, int] = {}
+    salida = ""
+    for _ in range(max(args.repeticiones, 1)):
+        total, acumulado, salida = _medir(codigo)
+        totales.append(total)
+
+    print(f"Importaciones de {os.path.relpath(args.archivo, ROOT)} ({len(totales)} procesos)")
+    print(f"  mediana: {statistics.median(totales) / 1000:.1f} ms  "
+          f"(mín {min(totales) / 1000:.1f} ms, máx {max(totales) / 1000:.1f} ms)")
+    for linea in salida.splitlines():
+        if linea.startswith("No disponible:"):
+            print(f"  {linea}")
+
+    print("\nMódulos más lentos (acumulado, última ejecución):")
+    for nombre, microsegundos in sorted(acumulado.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {microsegundos / 1000:8.1f} ms  {nombre}")
+
+    cargadas = [nombre for nombre in DEPENDENCIAS_PESADAS if nombre in acumulado]
+    print(f"\nDependencias pesadas cargadas al arrancar: {', '.join(cargadas) if cargadas else 'ninguna'}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ Archivo de configuración global para la aplicación.
 Contiene constantes y configuraciones usadas en toda la aplicación.
 """
 
+import os
+
 # Definición de modelos disponibles
 MODELOS = {
     "Conversación": [
@@ -31,4 +33,125 @@ DEFAULT_SYSTEM_PROMPT = ("Eres un asistente de inteligencia artificial útil, cl
 DEFAULT_TEMPERATURE = 0.9
 DEFAULT_MAX_TOKENS = 1024
 DEFAULT_MODEL_TYPE = "Conversación"
-DEFAULT_MODEL = "llama-3.3-70b-versatile" 
\ No newline at end of file
+DEFAULT_MODEL = "llama-3.3-70b-versatile" 
+
+# Frecuencia máxima de redibujado de las respuestas en streaming (frames por segundo)
+STREAM_MAX_FPS = 15
+
+# Número de mensajes del historial que se muestran de una vez en el chat
+HISTORY_WINDOW_SIZE = 30
+
+# Ventana de contexto (en tokens) de los modelos de texto: todos los de Conversación y
+# Razonamiento admiten 131072 en Groq
+MODEL_CONTEXT_WINDOW = 131072
+
+# Máximo de tokens de historial que se envían al modelo en el modo con memoria. Es un único
+# presupuesto para todos los modelos, muy por debajo de su ventana de contexto: limita el
+# coste y la latencia de cada turno, no el tamaño que admite el modelo
+HISTORY_MAX_TOKENS = 6000
+
+# Longitud máxima (en caracteres) de los resultados de herramientas antiguos en el historial
+HISTORY_TOOL_RETURN_MAX_CHARS = 1500
+
+# Modelo económico usado para resumir los turnos antiguos del historial
+SUMMARY_MODEL = "qwen-2.5-32b"
+
+# Se resume el historial cuando supera esta fracción del presupuesto de tokens
+SUMMARY_TRIGGER_RATIO = 0.6
+
+# Turnos más recientes que nunca se resumen
+SUMMARY_KEEP_TURNS = 2
+
+# Máximo de tokens del resumen generado
+SUMMARY_MAX_TOKENS = 512
+
+# Respuestas del modelo generadas a la vez en segundo plano por proceso (el resto espera en cola)
+GENERATION_MAX_WORKERS = int(os.getenv("GENERATION_MAX_WORKERS", "8"))
+
+# Segundos que se conserva una respuesta terminada que ninguna sesión ha recogido
+GENERATION_JOB_TTL = float(os.getenv("GENERATION_JOB_TTL", "600"))
+
+# Pool de conexiones HTTP compartido por todas las sesiones
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_TIMEOUT = 60.0
+
+# Caché de búsquedas web (tamaño en memoria y tiempo de vida en segundos)
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "256"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+
+# Ruta opcional de un fichero SQLite para persistir la caché de búsquedas
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH")
+
+# Agrupar las peticiones de chat en streaming idénticas que están en curso a la vez
+# (varias sesiones con la misma pregunta comparten un único stream con Groq)
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "1") == "1"
+
+# Caché de respuestas del modo sin memoria (opcional; valor inicial de la opción de la configuración)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+
+# Solo se usa la caché de respuestas con temperaturas iguales o menores que esta
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0.3"))
+
+# Nivel semántico: reutilizar la respuesta de un mensaje parecido (similitud coseno mínima).
+# Requiere sentence-transformers para calcular los embeddings con un modelo local
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "0") == "1"
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+
+# Tiempo máximo (en segundos) de cada proveedor de búsqueda web
+SEARCH_PROVIDER_TIMEOUT = float(os.getenv("SEARCH_PROVIDER_TIMEOUT", "10"))
+
+# Presupuesto de latencia opcional: se devuelven los proveedores que respondan en ese tiempo
+SEARCH_LATENCY_BUDGET = float(os.environ["SEARCH_LATENCY_BUDGET"]) if os.getenv("SEARCH_LATENCY_BUDGET") else None
+
+# Hilos reservados para las llamadas bloqueantes a los proveedores de búsqueda web
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "8"))
+
+# Transcripción por fragmentos de audios largos
+TRANSCRIPTION_CHUNK_SECONDS = 600        # Duración objetivo de cada fragmento
+TRANSCRIPTION_CHUNK_MAX_BYTES = 20 * 1024 * 1024  # Tamaño máximo de cada fragmento WAV
+TRANSCRIPTION_CHUNK_OVERLAP = 2.0        # Solapamiento entre fragmentos (segundos)
+TRANSCRIPTION_MAX_WORDS_PER_SECOND = 4.0  # Ritmo máximo del habla, para acotar las palabras del solapamiento
+TRANSCRIPTION_MIN_OVERLAP_WORDS = 2      # Palabras repetidas mínimas para considerar que hay solapamiento
+TRANSCRIPTION_SILENCE_WINDOW = 20.0      # Margen para buscar un silencio donde cortar (segundos)
+TRANSCRIPTION_MAX_WORKERS = 4            # Fragmentos transcritos en paralelo
+TRANSCRIPTION_MIN_SPLIT_BYTES = 1024 * 1024  # Por debajo de este tamaño el audio se envía sin decodificar
+
+# Convertir los audios a 16 kHz en mono antes de enviarlos (solo si el resultado es más pequeño)
+TRANSCRIPTION_PREPROCESS = os.getenv("TRANSCRIPTION_PREPROCESS", "1") == "1"
+
+# Transcripción por lotes: archivos en paralelo y límite de peticiones por minuto a la API
+TRANSCRIPTION_BATCH_CONCURRENCY = int(os.getenv("TRANSCRIPTION_BATCH_CONCURRENCY", "4"))
+TRANSCRIPTION_RATE_LIMIT_PER_MINUTE = float(os.getenv("TRANSCRIPTION_RATE_LIMIT_PER_MINUTE", "20"))
+# Peticiones que se pueden enviar seguidas antes de aplicar el ritmo por minuto (como mínimo,
+# la concurrencia del lote, para que todos los archivos empiecen a la vez)
+TRANSCRIPTION_RATE_LIMIT_BURST = int(os.getenv("TRANSCRIPTION_RATE_LIMIT_BURST", str(TRANSCRIPTION_BATCH_CONCURRENCY)))
+# Ráfaga máxima que puede pedir una sesión para el límite compartido de su API key
+TRANSCRIPTION_RATE_LIMIT_MAX_BURST = int(os.getenv("TRANSCRIPTION_RATE_LIMIT_MAX_BURST", "16"))
+
+# Tamaño máximo que un audio recibido como flujo se mantiene en memoria antes de pasar a disco
+TRANSCRIPTION_SPOOL_MAX_MEMORY = int(os.getenv("TRANSCRIPTION_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+
+# Almacén de conversaciones ("sqlite" o "memory") y ruta de la base de datos SQLite
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "sqlite")
+CONVERSATION_DB_PATH = os.getenv(
+    "CONVERSATION_DB_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "asistente-groq", "conversaciones.db")
+)
+
+# Tamaño máximo de los cuerpos JSON que acepta la API HTTP (los audios se reciben por bloques)
+API_MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(1024 * 1024)))
+
+# Hilos de la API HTTP para las llamadas bloqueantes a Groq (una por respuesta en streaming)
+API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "64"))
+
+# Caché en disco de transcripciones (clave: SHA-256 del audio y modelo)
+TRANSCRIPTION_CACHE_DIR = os.getenv(
+    "TRANSCRIPTION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "asistente-groq", "transcripciones")
+)
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
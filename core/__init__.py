@@ -0,0 +1,11 @@
+"""
+Núcleo de la aplicación, independiente de Streamlit.
+
+- `core.chat`: motor de chat (agente con memoria, historial y modo sin memoria)
+- `core.store`: almacenes de conversaciones (configuración, mensajes e historial)
+- `models.groq_client` y `models.transcription`: cliente de Groq y transcripción de audio
+- `tools.search_orchestrator`: búsqueda web en varios proveedores
+
+Los módulos no importan Streamlit, por lo que pueden usarse desde workers,
+benchmarks o una API sin interfaz. Las dependencias pesadas se cargan al usarse.
+"""
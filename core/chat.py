@@ -0,0 +1,256 @@
+"""
+Motor de chat independiente de Streamlit.
+
+Construye el agente de PydanticAI (con la búsqueda web como herramienta), prepara
+el historial antes de cada turno, ejecuta los turnos en streaming emitiendo
+eventos y genera las peticiones del modo sin memoria. La interfaz de Streamlit,
+los workers y la API solo se encargan de mostrar o enviar esos eventos.
+"""
+
+import functools
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import SUMMARY_TRIGGER_RATIO
+from utils.history import history_token_budget, history_tokens, trim_history
+from utils.http_pool import get_shared_async_http_client
+from utils.rendering import strip_html_patterns
+from utils.summarizer import apply_summary
+
+# Eventos emitidos durante un turno del agente: (tipo, dato)
+EVENT_TEXT = "texto"            # Fragmento nuevo de la respuesta (str)
+EVENT_MESSAGES = "mensajes"     # Historial completo tras el turno (lista de mensajes)
+EVENT_PROGRESS = "progreso"     # Descripción de la herramienta en curso (str)
+EVENT_TOOL = "herramienta"      # Uso de herramienta terminado (dict)
+
+# Instrucción que se añade al system prompt cuando la búsqueda web está habilitada
+WEB_SEARCH_INSTRUCTION = (" Cuando el usuario solicite información actualizada o sobre eventos recientes, "
+                          "utiliza la herramienta de búsqueda web de Tavily para obtener y proporcionar "
+                          "información en tiempo real de fuentes confiables.")
+
+def current_datetime_prompt() -> str:
+    """
+    Texto con la fecha y hora actuales que se añade al system prompt en cada ejecución.
+    Se redondea al minuto para que las peticiones idénticas de un mismo minuto coincidan
+    y se puedan agrupar (`models.request_coalescing`).
+    """
+    return f"La fecha y hora actuales son: {datetime.now().strftime('%d/%m/%Y %H:%M')}."
+
+def build_system_prompt(base_system_prompt: str, use_search: bool) -> str:
+    """
+    Construye el system prompt fijo del agente (sin la fecha y hora).
+
+    Args:
+        base_system_prompt: Las instrucciones configuradas por el usuario
+        use_search: Si la herramienta de búsqueda web está habilitada
+
+    Returns:
+        El system prompt, con la instrucción de búsqueda web si corresponde
+    """
+    system_prompt = base_system_prompt
+    if use_search:
+        lowered = system_prompt.lower()
+        if "búsqueda web" not in lowered and "tavily" not in lowered:
+            system_prompt += WEB_SEARCH_INSTRUCTION
+    return system_prompt
+
+def create_groq_model(api_key: str, model_name: str):
+    """
+    Crea el modelo de Groq para PydanticAI usando el cliente HTTP asíncrono compartido.
+    """
+    from pydantic_ai.models.groq import GroqModel
+
+    http_client = get_shared_async_http_client()
+    try:
+        from pydantic_ai.providers.groq import GroqProvider
+    except ImportError:
+        # Versiones de pydantic-ai sin proveedores
+        return GroqModel(model_name, api_key=api_key, http_client=http_client)
+    return GroqModel(model_name, provider=GroqProvider(api_key=api_key, http_client=http_client))
+
+@functools.lru_cache(maxsize=32)
+def get_agent(api_key: str, model_name: str, use_search: bool, base_system_prompt: str):
+    """
+    Devuelve el agente de PydanticAI de una configuración, creándolo una sola vez por proceso.
+    El agente no guarda estado de la conversación, así que lo comparten todas las sesiones;
+    cada turno recibe como `deps` la función con la que emitir sus eventos.
+
+    Args:
+        api_key: La API key de Groq
+        model_name: El modelo de chat
+        use_search: Si se registra la herramienta de búsqueda web
+        base_system_prompt: Las instrucciones configuradas por el usuario
+
+    Returns:
+        El agente configurado
+    """
+    from pydantic_ai import Agent, RunContext
+    from tools.search_orchestrator import available_providers, buscar_en_paralelo
+
+    agent = Agent(
+        create_groq_model(api_key, model_name),
+        system_prompt=build_system_prompt(base_system_prompt, use_search)
+    )
+
+    # La fecha y hora se calculan en cada ejecución, también con historial previo
+    @agent.system_prompt(dynamic=True)
+    def fecha_y_hora() -> str:
+        return current_datetime_prompt()
+
+    # Registrar la herramienta de búsqueda web solo si está habilitada y disponible
+    if use_search:
+        @agent.tool
+        async def search_web(ctx: RunContext[Optional[Callable[[tuple], None]]], query: str, num_results: int = 5) -> str:
+            """
+            Busca información en internet consultando a la vez todos los buscadores disponibles.
+
+            Args:
+                query (str): La consulta a buscar en internet
+                num_results (int, optional): Número de resultados a mostrar. Default: 5
+
+            Returns:
+                str: Resultados de la búsqueda formateados
+            """
+            # Notificar el progreso a quien ejecuta el turno (el agente es compartido)
+            if ctx.deps:
+                ctx.deps((EVENT_PROGRESS, f"Usando herramienta: search_web, Argumentos: {query}"))
+            resultado = await buscar_en_paralelo(query, num_results, available_providers(os.getenv("TAVILY_API_KEY")))
+            if ctx.deps:
+                ctx.deps((EVENT_TOOL, {
+                    "tool": "search_web",
+                    "query": query,
+                    "resultado": resultado,
+                    "resultado_corto": resultado[:100] + "..." if len(resultado) > 100 else resultado
+                }))
+            return resultado
+
+    return agent
+
+async def stream_agent_turn(agent, user_prompt: str, message_history: Optional[list] = None,
+                            emit: Optional[Callable[[tuple], None]] = None) -> list:
+    """
+    Ejecuta un turno del agente en streaming, emitiendo sus eventos a medida que llegan.
+    Se usa como productora de `utils.async_runner.stream_events` o directamente desde
+    código asíncrono.
+
+    Args:
+        agent: El agente de `get_agent`
+        user_prompt: El mensaje del usuario
+        message_history: El historial previo de PydanticAI
+        emit: Función que recibe cada evento `(tipo, dato)`
+
+    Returns:
+        El historial completo tras el turno (también emitido como `EVENT_MESSAGES`)
+    """
+    emit = emit or (lambda event: None)
+    async with agent.run_stream(user_prompt, message_history=message_history, deps=emit) as result:
+        async for delta in result.stream_text(delta=True):
+            emit((EVENT_TEXT, delta))
+        messages = result.all_messages()
+    emit((EVENT_MESSAGES, messages))
+    return messages
+
+def prepare_history(history: list, summary_job, max_tokens: int = 0) -> Tuple[list, int, int]:
+    """
+    Prepara el historial antes de un turno: aplica el resumen de los turnos antiguos
+    si ya terminó y lo recorta al presupuesto de tokens de historial.
+
+    Args:
+        history: El historial de PydanticAI
+        summary_job: El resumen en curso (`utils.summarizer.SummaryJob`) o None
+        max_tokens: Tokens reservados para la respuesta
+
+    Returns:
+        Una tupla (historial, tokens enviados, presupuesto). Si el resumen se aplicó,
+        quien llama debe descartar `summary_job`.
+    """
+    if summary_job is not None and summary_job.done():
+        history = apply_summary(history, summary_job)
+    budget = history_token_budget(max_tokens)
+    history, tokens = trim_history(history, budget)
+    return history, tokens, budget
+
+def should_summarize(messages: list, budget: int) -> bool:
+    """Indica si el historial se acerca al presupuesto y conviene resumir los turnos antiguos."""
+    return history_tokens(messages) > budget * SUMMARY_TRIGGER_RATIO
+
+def clean_function_call_text(text: str) -> str:
+    """
+    Elimina las llamadas a herramientas que algunos modelos escriben como texto
+    (`<function=...>`, `search_web(...)`) en lugar de ejecutarlas.
+    """
+    text = text.replace("<function=", "").replace("</function>", "")
+    text = re.sub(r'\{.*?\}', '', text)
+    return text.replace("search_web()", "").replace("search_web", "").strip()
+
+def search_thinking(tool_uses: List[Dict[str, Any]]) -> str:
+    """
+    Construye el razonamiento mostrado con las búsquedas web realizadas en un turno.
+
+    Args:
+        tool_uses: Los eventos `EVENT_TOOL` recibidos durante el turno
+
+    Returns:
+        El texto con las consultas y los resultados de la última búsqueda
+    """
+    thinking = "Consultando fuentes en tiempo real...\n\n"
+    searches = [tool_use for tool_use in tool_uses if tool_use["tool"] == "search_web"]
+    for tool_use in searches:
+        thinking += f"Búsqueda web para: '{tool_use['query']}'\n\n"
+        thinking += searches[-1]["resultado"]
+    return thinking
+
+def build_completion_params(messages: List[Dict[str, str]], model: str, temperature: float,
+                            max_tokens: int, reasoning_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Genera los parámetros de una petición de chat en streaming del modo sin memoria,
+    añadiendo la fecha y hora actuales al mensaje de sistema.
+
+    Args:
+        messages: Los mensajes (el primero puede ser el de sistema; no se modifican)
+        model: El modelo de chat
+        temperature: La temperatura
+        max_tokens: Tokens máximos de la respuesta
+        reasoning_format: Formato del razonamiento para los modelos de razonamiento
+
+    Returns:
+        Los argumentos para `client.chat.completions.create`
+    """
+    messages = list(messages)
+    if messages and messages[0]["role"] == "system":
+        messages[0] = {**messages[0], "content": f"{messages[0]['content']} {current_datetime_prompt()}"}
+
+    params = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": 1,
+        "stream": True,
+        "stop": None,
+    }
+    if reasoning_format:
+        params["reasoning_format"] = reasoning_format
+    return params
+
+def stream_completion(client, params: Dict[str, Any]) -> Iterator[str]:
+    """
+    Ejecuta una petición de chat en streaming y produce el texto de cada fragmento.
+
+    Args:
+        client: El cliente Groq configurado
+        params: Los parámetros de `build_completion_params`
+
+    Yields:
+        Los fragmentos de texto no vacíos, en orden
+    """
+    for chunk in client.chat.completions.create(**params):
+        content = chunk.choices[0].delta.content or ""
+        if content:
+            yield content
+
+def clean_response_text(text: str) -> str:
+    """Elimina de una respuesta completa los fragmentos HTML incorrectos y los espacios sobrantes."""
+    return strip_html_patterns(text).strip()
@@ -0,0 +1,158 @@
+"""
+Cola de generaciones en segundo plano, indexada por conversación.
+
+Las respuestas del modelo se generan en un pool de hilos acotado, fuera del hilo
+del script de Streamlit. Cada generación guarda sus eventos en un búfer propio:
+la interfaz los lee (y puede volver a leerlos desde el principio tras un rerun)
+sin que un rerun cancele ni repita la petición a la API.
+"""
+
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config.settings import GENERATION_JOB_TTL, GENERATION_MAX_WORKERS
+
+class GenerationJob:
+    """
+    Una generación en curso o terminada, con el búfer de los eventos que ha emitido.
+    """
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.events: List[tuple] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished_at: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def emit(self, event: tuple):
+        """Añade un evento al búfer (se puede llamar desde cualquier hilo)."""
+        with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None):
+        with self._condition:
+            self.result = result
+            self.error = error
+            self.finished_at = time.monotonic()
+            self._condition.notify_all()
+
+    def done(self) -> bool:
+        """Indica si la generación ya terminó (con éxito o con error)."""
+        return self.finished_at is not None
+
+    def iter_events(self, start: int = 0) -> Iterator[tuple]:
+        """
+        Produce los eventos del búfer desde la posición `start`, esperando a los nuevos
+        hasta que la generación termine. Varios lectores pueden recorrerlo a la vez.
+
+        Args:
+            start: Índice del primer evento a producir
+
+        Yields:
+            Los eventos `(tipo, dato)`, en orden
+        """
+        index = start
+        while True:
+            with self._condition:
+                while index >= len(self.events) and not self.done():
+                    self._condition.wait()
+                pending = self.events[index:]
+                finished = self.done()
+            yield from pending
+            index += len(pending)
+            if finished and index >= len(self.events):
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Espera a que la generación termine y devuelve su resultado.
+        Si la generación falló, se relanza su excepción.
+        """
+        with self._condition:
+            if not self._condition.wait_for(self.done, timeout):
+                raise TimeoutError("La generación no terminó a tiempo")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class GenerationQueue:
+    """
+    Pool acotado de hilos que ejecuta una generación a la vez por conversación.
+    """
+
+    def __init__(self, max_workers: int = GENERATION_MAX_WORKERS, job_ttl: float = GENERATION_JOB_TTL):
+        """
+        Args:
+            max_workers: Generaciones simultáneas en el proceso (el resto espera en cola)
+            job_ttl: Segundos que se conserva una generación terminada que nadie ha recogido
+        """
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="generacion")
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, job: GenerationJob, func: Callable[[Callable[[tuple], None]], Any]):
+        try:
+            result = func(job.emit)
+        except BaseException as e:
+            job._finish(error=e)
+        else:
+            job._finish(result=result)
+
+    def _prune(self):
+        # Descartar las generaciones terminadas de sesiones que ya no las van a recoger
+        now = time.monotonic()
+        expired = [conversation_id for conversation_id, job in self._jobs.items()
+                   if job.done() and now - job.finished_at > self.job_ttl]
+        for conversation_id in expired:
+            del self._jobs[conversation_id]
+
+    def submit(self, conversation_id: str, func: Callable[[Callable[[tuple], None]], Any]) -> GenerationJob:
+        """
+        Encola una generación para la conversación. Si ya hay una sin terminar, se
+        devuelve esa en lugar de lanzar otra, de modo que la petición nunca se duplica.
+
+        Args:
+            conversation_id: El identificador de la conversación
+            func: Función que recibe `emit(evento)` y devuelve el resultado de la generación
+
+        Returns:
+            La generación de la conversación
+        """
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(conversation_id)
+            if job is not None and not job.done():
+                return job
+            job = GenerationJob(conversation_id)
+            self._jobs[conversation_id] = job
+            self._executor.submit(self._run, job, func)
+            return job
+
+    def get(self, conversation_id: str) -> Optional[GenerationJob]:
+        """Devuelve la última generación de la conversación que aún no se ha recogido."""
+        with self._lock:
+            return self._jobs.get(conversation_id)
+
+    def pop(self, conversation_id: str, job: Optional[GenerationJob] = None) -> bool:
+        """
+        Retira la generación de la conversación (si es `job`, cuando se indica).
+        Devuelve True solo al primero que la retira, para aplicar su resultado una vez.
+        Una generación retirada sin terminar sigue ejecutándose, pero su resultado se descarta.
+        """
+        with self._lock:
+            current = self._jobs.get(conversation_id)
+            if current is None or (job is not None and current is not job):
+                return False
+            del self._jobs[conversation_id]
+            return True
+
+@functools.lru_cache(maxsize=None)
+def get_generation_queue() -> GenerationQueue:
+    """Devuelve la cola de generaciones del proceso, compartida por todas las sesiones."""
+    return GenerationQueue()
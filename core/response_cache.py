@@ -0,0 +1,275 @@
+"""
+Caché de respuestas del modo sin memoria.
+
+En el modo sin memoria cada petición depende solo del modelo, los parámetros,
+el system prompt y el mensaje del usuario, así que una pregunta repetida puede
+responderse sin llamar a Groq. La caché tiene dos niveles:
+
+- exacto: clave con el modelo, la temperatura, los tokens máximos, el formato de
+  razonamiento, el system prompt y el mensaje (con los espacios normalizados),
+  con desalojo LRU y expiración (`utils.cache.TTLCache`)
+- semántico (opcional): índice en memoria con NumPy de los embeddings de los
+  mensajes, calculados con un modelo local de sentence-transformers; una
+  pregunta muy parecida a otra ya respondida con la misma configuración
+  reutiliza su respuesta, salvo que sus números, operadores o negaciones no
+  coincidan (dos preguntas casi iguales con respuestas distintas)
+
+Solo se usa con temperaturas bajas, donde el modelo respondería casi lo mismo.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config.settings import (
+    RESPONSE_CACHE_EMBEDDING_MODEL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_TEMPERATURE,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_SEMANTIC,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_TTL
+)
+from utils.cache import SQLiteCacheBackend, TTLCache
+from utils.lazy_imports import is_available
+
+# Guion entre letras (palabras compuestas), que no es un operador
+_HYPHEN_IN_WORD = re.compile(r"(?<=[^\W\d_])-(?=[^\W\d_])")
+# Números y operadores, en el orden en que aparecen
+_NUMBERS_AND_OPERATORS = re.compile(r"\d+(?:[.,]\d+)*|[+\-*/×÷=<>^%√≠≤≥]")
+_WORD = re.compile(r"\w+(?:'t)?")
+
+# Palabras que niegan una pregunta ("¿No es seguro...?" frente a "¿Es seguro...?")
+NEGATION_WORDS = frozenset({
+    "no", "ni", "nunca", "jamas", "tampoco", "nadie", "nada", "ningun", "ninguna", "ninguno", "sin",
+    "not", "never", "nor", "none", "nobody", "nothing", "without"
+})
+
+def normalize_prompt(prompt: str) -> str:
+    """Normaliza un mensaje para la clave exacta: espacios colapsados y sin espacios en los extremos."""
+    return " ".join(prompt.split())
+
+def cache_enabled(temperature: float) -> bool:
+    """Indica si la caché se puede usar con esta temperatura."""
+    return temperature <= RESPONSE_CACHE_MAX_TEMPERATURE
+
+def prompt_guard(prompt: str) -> tuple:
+    """
+    Rasgos de un mensaje que deben coincidir para reutilizar una respuesta parecida:
+    los números y operadores (en orden) y las negaciones. Los embeddings apenas
+    distinguen "1234 + 5678" de "1234 - 5678" o una pregunta de su negación.
+
+    Returns:
+        Una tupla comparable: (números y operadores, negaciones ordenadas)
+    """
+    folded = "".join(c for c in unicodedata.normalize("NFKD", prompt.lower()) if not unicodedata.combining(c))
+    folded = _HYPHEN_IN_WORD.sub(" ", folded.replace("’", "'"))
+    negations = sorted(word for word in _WORD.findall(folded) if word in NEGATION_WORDS or word.endswith("n't"))
+    return tuple(_NUMBERS_AND_OPERATORS.findall(folded)), tuple(negations)
+
+def load_embedding_function(model_name: str = RESPONSE_CACHE_EMBEDDING_MODEL) -> Optional[Callable[[str], Any]]:
+    """
+    Crea la función de embeddings del nivel semántico con un modelo local de
+    sentence-transformers (dependencia opcional).
+
+    Args:
+        model_name: El modelo de sentence-transformers
+
+    Returns:
+        Una función que devuelve el embedding normalizado (`numpy.float32`) de un texto,
+        o None si sentence-transformers no está instalado
+    """
+    if not is_available("sentence_transformers"):
+        return None
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def embed(text: str):
+        return model.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+
+    return embed
+
+class SemanticIndex:
+    """
+    Índice de vecinos más cercanos en memoria con capacidad fija. Cada entrada
+    guarda el embedding del mensaje, su contexto (modelo, parámetros y system
+    prompt), el hash de su `prompt_guard` y la clave exacta de su respuesta; al
+    llenarse se sustituye la entrada usada hace más tiempo. La matriz de
+    embeddings se crea con la dimensión del primero que se añade.
+    """
+
+    def __init__(self, capacity: int, clock: Callable[[], float] = time.monotonic):
+        import numpy as np
+
+        self.capacity = max(capacity, 1)
+        self.clock = clock
+        self._vectors = None
+        self._contexts = np.zeros(self.capacity, dtype=np.int64)
+        self._guards = np.zeros(self.capacity, dtype=np.int64)
+        self._last_used = np.full(self.capacity, -np.inf)
+        self._keys: List[Optional[str]] = [None] * self.capacity
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, context: int, guard: int, vector, key: str):
+        """Añade (o actualiza) la entrada de la clave `key`."""
+        import numpy as np
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = int(np.argmin(self._last_used))
+                if self._keys[slot] is not None:
+                    del self._slots[self._keys[slot]]
+                self._keys[slot] = key
+                self._slots[key] = slot
+            self._vectors[slot] = vector
+            self._contexts[slot] = context
+            self._guards[slot] = guard
+            self._last_used[slot] = self.clock()
+
+    def search(self, context: int, guard: int, vector, threshold: float) -> Optional[str]:
+        """
+        Devuelve la clave de la entrada más parecida con el mismo contexto y el mismo
+        `prompt_guard`, si su similitud coseno alcanza `threshold`.
+        """
+        import numpy as np
+
+        with self._lock:
+            if not self._slots:
+                return None
+            scores = self._vectors @ vector
+            scores[(self._contexts != context) | (self._guards != guard) | np.isinf(self._last_used)] = -1.0
+            slot = int(np.argmax(scores))
+            if scores[slot] < threshold:
+                return None
+            self._last_used[slot] = self.clock()
+            return self._keys[slot]
+
+    def discard(self, key: str):
+        """Elimina la entrada de la clave `key`, si existe."""
+        import numpy as np
+
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._keys[slot] = None
+                self._last_used[slot] = -np.inf
+
+class ResponseCache:
+    """
+    Caché de respuestas del modo sin memoria, con un nivel exacto y un nivel
+    semántico opcional (solo si se indica una función de embeddings).
+    """
+
+    def __init__(self, cache: TTLCache, embed: Optional[Callable[[str], Any]] = None,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        """
+        Args:
+            cache: Caché exacta donde se guardan las respuestas
+            embed: Función que calcula el embedding normalizado de un mensaje
+                (p. ej. `load_embedding_function()`); sin ella no hay nivel semántico
+            similarity: Similitud coseno mínima para reutilizar una respuesta parecida
+        """
+        self.cache = cache
+        self.similarity = similarity
+        self.embed = embed
+        self.index = SemanticIndex(cache.max_entries) if embed is not None else None
+        self.semantic_hits = 0
+
+    @staticmethod
+    def _context(model: str, temperature: float, max_tokens: int, system_prompt: str,
+                 reasoning_format: Optional[str]) -> str:
+        return f"{model}|{temperature:.2f}|{max_tokens}|{reasoning_format or ''}|{system_prompt}"
+
+    @staticmethod
+    def _key(context: str, prompt: str) -> str:
+        return hashlib.sha256(f"{context}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _hash_id(value: str) -> int:
+        return int.from_bytes(hashlib.sha256(value.encode("utf-8")).digest()[:8], "little", signed=True)
+
+    @classmethod
+    def _guard_id(cls, prompt: str) -> int:
+        return cls._hash_id(repr(prompt_guard(prompt)))
+
+    def get(self, prompt: str, model: str, temperature: float, max_tokens: int, system_prompt: str,
+            reasoning_format: Optional[str] = None) -> Optional[str]:
+        """
+        Busca la respuesta de un mensaje con una configuración.
+
+        Returns:
+            La respuesta guardada, o None si no hay ninguna exacta ni suficientemente parecida
+        """
+        context = self._context(model, temperature, max_tokens, system_prompt, reasoning_format)
+        key = self._key(context, prompt)
+        response = self.cache.get(key)
+        if response is not None or self.index is None:
+            return response
+
+        similar_key = self.index.search(self._hash_id(context), self._guard_id(prompt),
+                                        self.embed(normalize_prompt(prompt)), self.similarity)
+        if similar_key is None:
+            return None
+        response = self.cache.get(similar_key)
+        if response is None:
+            # La respuesta expiró o se desalojó de la caché exacta
+            self.index.discard(similar_key)
+            return None
+        self.semantic_hits += 1
+        return response
+
+    def set(self, prompt: str, model: str, temperature: float, max_tokens: int, system_prompt: str,
+            response: str, reasoning_format: Optional[str] = None):
+        """Guarda la respuesta de un mensaje con una configuración."""
+        context = self._context(model, temperature, max_tokens, system_prompt, reasoning_format)
+        key = self._key(context, prompt)
+        self.cache.set(key, response)
+        if self.index is not None:
+            self.index.add(self._hash_id(context), self._guard_id(prompt), self.embed(normalize_prompt(prompt)), key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché exacta, con los aciertos del nivel semántico."""
+        stats = self.cache.stats()
+        stats["semantic"] = self.index is not None
+        stats["semantic_hits"] = self.semantic_hits
+        return stats
+
+def replay_chunks(text: str, words_per_chunk: int = 3) -> Iterator[str]:
+    """
+    Divide una respuesta guardada en fragmentos de unas pocas palabras para
+    mostrarla con el mismo renderizador en streaming que una respuesta nueva.
+    """
+    pieces = re.findall(r"\s*\S+\s*", text) or [text]
+    for start in range(0, len(pieces), words_per_chunk):
+        yield "".join(pieces[start:start + words_per_chunk])
+
+_cache: Optional[ResponseCache] = None
+_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """
+    Devuelve la caché de respuestas del proceso, creándola la primera vez.
+    Si `RESPONSE_CACHE_PATH` está configurado, usa SQLite como segundo nivel persistente.
+    El nivel semántico se activa con `RESPONSE_CACHE_SEMANTIC` si sentence-transformers
+    está instalado.
+    """
+    global _cache
+    with _lock:
+        if _cache is None:
+            backend = None
+            if RESPONSE_CACHE_PATH:
+                backend = SQLiteCacheBackend(RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES * 4,
+                                             ttl=RESPONSE_CACHE_TTL)
+            _cache = ResponseCache(
+                TTLCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL, backend=backend),
+                embed=load_embedding_function() if RESPONSE_CACHE_SEMANTIC else None
+            )
+        return _cache
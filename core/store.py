@@ -0,0 +1,414 @@
+"""
+Almacenes de conversaciones para usar el motor de chat fuera de Streamlit.
+
+Cada conversación guarda su configuración, los mensajes mostrados al usuario
+(`{"role", "content"}`) y el historial de PydanticAI que se envía al agente.
+`ConversationStore` define la interfaz; `SQLiteConversationStore` (por defecto)
+persiste cada mensaje en una fila propia, solo añadiendo filas nuevas en cada
+turno, y `MemoryConversationStore` mantiene todo en memoria del proceso.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config.settings import CONVERSATION_DB_PATH, CONVERSATION_STORE
+from utils.history_codec import CompactHistory, decode_messages, encode_message
+
+class ConversationNotFound(KeyError):
+    """La conversación solicitada no existe en el almacén."""
+
+class ConversationStore(ABC):
+    """
+    Interfaz de un almacén de conversaciones. Las implementaciones deben ser
+    seguras entre hilos: la API y las sesiones de Streamlit lo comparten.
+    """
+
+    @abstractmethod
+    def create(self, config: Optional[Dict[str, Any]] = None, conversation_id: Optional[str] = None) -> str:
+        """
+        Crea una conversación con la configuración dada y devuelve su id.
+        Si se indica `conversation_id` y ya existe, no se modifica.
+        """
+
+    @abstractmethod
+    def exists(self, conversation_id: str) -> bool:
+        """Indica si la conversación existe."""
+
+    @abstractmethod
+    def get_config(self, conversation_id: str) -> Dict[str, Any]:
+        """Devuelve la configuración de la conversación (lanza `ConversationNotFound` si no existe)."""
+
+    @abstractmethod
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        """Añade mensajes al final de la conversación."""
+
+    @abstractmethod
+    def count_messages(self, conversation_id: str) -> int:
+        """Devuelve el número de mensajes de la conversación."""
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Devuelve los mensajes de la conversación a partir de `offset` (como mucho `limit`)."""
+
+    @abstractmethod
+    def get_history(self, conversation_id: str) -> list:
+        """Devuelve el historial de PydanticAI de la conversación."""
+
+    @abstractmethod
+    def append_history(self, conversation_id: str, messages: list):
+        """Añade mensajes de PydanticAI al final del historial."""
+
+    @abstractmethod
+    def update_history(self, conversation_id: str, changes: Dict[int, Any]):
+        """Sustituye mensajes concretos del historial, indicados por su posición."""
+
+    @abstractmethod
+    def replace_history(self, conversation_id: str, history: list):
+        """Sustituye el historial completo (tras recortarlo o resumirlo)."""
+
+    def sync_history(self, conversation_id: str, previous: list, current: list):
+        """
+        Guarda `current` como historial, sabiendo que el almacén contiene `previous`.
+        Tras un turno normal solo se escriben los mensajes nuevos y los que cambiaron
+        (p. ej. el system prompt dinámico con la fecha); si el historial se acortó
+        al recortarlo o resumirlo, se sustituye entero.
+        """
+        if len(current) < len(previous):
+            self.replace_history(conversation_id, current)
+            return
+        changes = {
+            index: new for index, (old, new) in enumerate(zip(previous, current))
+            if old is not new and old != new
+        }
+        if changes:
+            self.update_history(conversation_id, changes)
+        if len(current) > len(previous):
+            self.append_history(conversation_id, current[len(previous):])
+
+    @abstractmethod
+    def delete(self, conversation_id: str):
+        """Elimina la conversación (no hace nada si no existe)."""
+
+class MemoryConversationStore(ConversationStore):
+    """
+    Almacén en memoria del proceso. Las conversaciones se pierden al reiniciar.
+    El historial de PydanticAI se guarda codificado (`CompactHistory`) y se
+    decodifica solo al leerlo.
+    """
+
+    def __init__(self):
+        self._conversations: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            raise ConversationNotFound(conversation_id)
+        return conversation
+
+    def create(self, config: Optional[Dict[str, Any]] = None, conversation_id: Optional[str] = None) -> str:
+        conversation_id = conversation_id or uuid.uuid4().hex
+        with self._lock:
+            self._conversations.setdefault(conversation_id, {
+                "config": dict(config or {}),
+                "messages": [],
+                "history": CompactHistory()
+            })
+        return conversation_id
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            return conversation_id in self._conversations
+
+    def get_config(self, conversation_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._get(conversation_id)["config"])
+
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            self._get(conversation_id)["messages"].extend(dict(message) for message in messages)
+
+    def count_messages(self, conversation_id: str) -> int:
+        with self._lock:
+            return len(self._get(conversation_id)["messages"])
+
+    def get_messages(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        with self._lock:
+            messages = self._get(conversation_id)["messages"]
+            end = None if limit is None else offset + limit
+            return [dict(message) for message in messages[offset:end]]
+
+    def get_history(self, conversation_id: str) -> list:
+        with self._lock:
+            history = self._get(conversation_id)["history"]
+        return history.decode()
+
+    def append_history(self, conversation_id: str, messages: list):
+        with self._lock:
+            self._get(conversation_id)["history"].append(messages)
+
+    def update_history(self, conversation_id: str, changes: Dict[int, Any]):
+        with self._lock:
+            history = self._get(conversation_id)["history"]
+            for index, message in changes.items():
+                history.replace(index, message)
+
+    def replace_history(self, conversation_id: str, history: list):
+        with self._lock:
+            self._get(conversation_id)["history"] = CompactHistory.from_messages(history)
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Almacén persistente en SQLite. Cada mensaje mostrado y cada mensaje de
+    PydanticAI es una fila, de modo que un turno solo inserta las filas nuevas y
+    los mensajes se pueden leer por páginas sin cargar la conversación entera.
+    Los mensajes de PydanticAI se guardan con la codificación compacta de
+    `utils.history_codec`.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ruta del fichero SQLite (se crea su directorio si no existe)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL permite leer mientras otro proceso (p. ej. la API) escribe
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "id TEXT PRIMARY KEY, config TEXT NOT NULL, created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS history ("
+            "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL, "
+            "PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+    def _check(self, conversation_id: str):
+        if self._conn.execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)).fetchone() is None:
+            raise ConversationNotFound(conversation_id)
+
+    def _next_seq(self, table: str, conversation_id: str) -> int:
+        row = self._conn.execute(
+            f"SELECT MAX(seq) FROM {table} WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def create(self, config: Optional[Dict[str, Any]] = None, conversation_id: Optional[str] = None) -> str:
+        conversation_id = conversation_id or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO conversations (id, config, created) VALUES (?, ?, ?)",
+                (conversation_id, json.dumps(config or {}, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+        return conversation_id
+
+    def exists(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone() is not None
+
+    def get_config(self, conversation_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        if row is None:
+            raise ConversationNotFound(conversation_id)
+        return json.loads(row[0])
+
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            self._check(conversation_id)
+            seq = self._next_seq("messages", conversation_id)
+            self._conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(conversation_id, seq + i, message["role"], message["content"]) for i, message in enumerate(messages)]
+            )
+            self._conn.commit()
+
+    def count_messages(self, conversation_id: str) -> int:
+        with self._lock:
+            self._check(conversation_id)
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()[0]
+
+    def get_messages(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        with self._lock:
+            self._check(conversation_id)
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (conversation_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def get_history(self, conversation_id: str) -> list:
+        with self._lock:
+            self._check(conversation_id)
+            rows = self._conn.execute(
+                "SELECT message FROM history WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+            ).fetchall()
+        return decode_messages(row[0] for row in rows)
+
+    def _insert_history(self, conversation_id: str, seq: int, messages: list):
+        self._conn.executemany(
+            "INSERT INTO history (conversation_id, seq, message) VALUES (?, ?, ?)",
+            [(conversation_id, seq + i, encode_message(message)) for i, message in enumerate(messages)]
+        )
+
+    def append_history(self, conversation_id: str, messages: list):
+        with self._lock:
+            self._check(conversation_id)
+            self._insert_history(conversation_id, self._next_seq("history", conversation_id), messages)
+            self._conn.commit()
+
+    def update_history(self, conversation_id: str, changes: Dict[int, Any]):
+        with self._lock:
+            self._check(conversation_id)
+            self._conn.executemany(
+                "UPDATE history SET message = ? WHERE conversation_id = ? AND seq = ?",
+                [(encode_message(message), conversation_id, index) for index, message in changes.items()]
+            )
+            self._conn.commit()
+
+    def replace_history(self, conversation_id: str, history: list):
+        with self._lock:
+            self._check(conversation_id)
+            self._conn.execute("DELETE FROM history WHERE conversation_id = ?", (conversation_id,))
+            self._insert_history(conversation_id, 0, history)
+            self._conn.commit()
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            for table, column in (("messages", "conversation_id"), ("history", "conversation_id"),
+                                  ("conversations", "id")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (conversation_id,))
+            self._conn.commit()
+
+class MessageLog:
+    """
+    Vista perezosa de los mensajes mostrados de una conversación, con la interfaz
+    de lista que usa la interfaz (`len`, índices, cortes, `append`). Solo se leen
+    del almacén los mensajes que se muestran y solo se guardan en memoria los
+    `max_cached` usados más recientemente (con el HTML que la interfaz cachea en
+    cada mensaje), así que una sesión inactiva apenas ocupa memoria.
+
+    Los mensajes solo se añaden al final, así que cada uno se guarda por su posición
+    y sigue siendo válido tras añadir otros: un turno nuevo solo lee (y renderiza)
+    los mensajes nuevos, aunque la ventana visible se desplace.
+
+    La conversación se crea en el almacén con el primer mensaje.
+    """
+
+    def __init__(self, store: ConversationStore, conversation_id: str, max_cached: int = 200):
+        self.store = store
+        self.conversation_id = conversation_id
+        self.max_cached = max_cached
+        self._count: Optional[int] = None
+        self._messages: "OrderedDict[int, Dict[str, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        if self._count is None:
+            try:
+                self._count = self.store.count_messages(self.conversation_id)
+            except ConversationNotFound:
+                self._count = 0
+        return self._count
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if stop <= start:
+                return []
+            # Leer del almacén solo el tramo que contiene los mensajes que faltan
+            missing = [position for position in range(start, stop) if position not in self._messages]
+            if missing:
+                fetched = self.store.get_messages(self.conversation_id, missing[0], missing[-1] + 1 - missing[0])
+                for position, message in enumerate(fetched, missing[0]):
+                    self._messages.setdefault(position, message)
+            page = []
+            for position in range(start, stop):
+                message = self._messages.get(position)
+                if message is None:
+                    break
+                self._messages.move_to_end(position)
+                page.append(message)
+            while len(self._messages) > max(self.max_cached, stop - start):
+                self._messages.popitem(last=False)
+            return page[::step]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self[index:index + 1][0]
+
+    def refresh(self):
+        """
+        Vuelve a leer el número de mensajes del almacén (p. ej. tras añadir mensajes
+        desde otro hilo). Los mensajes ya leídos no cambian y se conservan.
+        """
+        self._count = None
+
+    def append(self, message: Dict[str, str]):
+        """Guarda un mensaje al final de la conversación."""
+        self.extend([message])
+
+    def extend(self, messages: List[Dict[str, str]]):
+        """Guarda varios mensajes al final de la conversación."""
+        messages = list(messages)
+        if not messages:
+            return
+        # El recuento en memoria puede estar desfasado: la cola de generaciones u otra
+        # pestaña con la misma conversación añaden mensajes directamente al almacén
+        if not self.store.exists(self.conversation_id):
+            self.store.create(conversation_id=self.conversation_id)
+        self.store.append_messages(self.conversation_id, messages)
+        self.refresh()
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    """
+    Devuelve el almacén de conversaciones del proceso, creándolo la primera vez.
+    Por defecto es SQLite en `CONVERSATION_DB_PATH`; con `CONVERSATION_STORE=memory`
+    se guarda en memoria.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if CONVERSATION_STORE == "memory":
+                _store = MemoryConversationStore()
+            else:
+                _store = SQLiteConversationStore(CONVERSATION_DB_PATH)
+        return _store
+
+def set_conversation_store(store: ConversationStore):
+    """
+    Sustituye el almacén de conversaciones del proceso (p. ej. por uno en memoria).
+    """
+    global _store
+    with _store_lock:
+        _store = store
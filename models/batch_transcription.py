@@ -0,0 +1,181 @@
+"""
+Transcripción de varios audios a la vez.
+
+Los archivos se transcriben en paralelo con una concurrencia máxima y las
+peticiones a la API se limitan con un token bucket compartido, de modo que un
+lote de notas de voz tarda aproximadamente lo mismo que la más larga sin
+superar el límite de peticiones por minuto de Groq.
+"""
+
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from config.settings import (
+    TRANSCRIPTION_BATCH_CONCURRENCY,
+    TRANSCRIPTION_PREPROCESS,
+    TRANSCRIPTION_RATE_LIMIT_BURST,
+    TRANSCRIPTION_RATE_LIMIT_MAX_BURST,
+    TRANSCRIPTION_RATE_LIMIT_PER_MINUTE
+)
+
+# Estados de cada archivo del lote
+PENDIENTE = "pendiente"
+TRANSCRIBIENDO = "transcribiendo"
+COMPLETADO = "completado"
+ERROR = "error"
+
+class RateLimiter:
+    """
+    Token bucket seguro entre hilos: permite `rate_per_minute` peticiones por minuto
+    con ráfagas de hasta `burst` peticiones seguidas.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            rate_per_minute: Peticiones permitidas por minuto (0 o menos desactiva el límite)
+            burst: Capacidad del bucket (por defecto, una petición)
+            clock: Reloj monotónico usado para reponer los tokens
+            sleep: Función de espera (sustituible en pruebas)
+        """
+        self.rate = self._per_second(rate_per_minute)
+        self.capacity = float(max(burst or 1, 1))
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _per_second(rate_per_minute: Optional[float]) -> float:
+        return rate_per_minute / 60.0 if rate_per_minute and rate_per_minute > 0 else 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Espera hasta que haya un token disponible y lo consume."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                self._refill(self.clock())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+    def configure(self, rate_per_minute: Optional[float] = None, burst: Optional[int] = None):
+        """
+        Cambia el ritmo y la capacidad del bucket. Los tokens acumulados se
+        conservan hasta la nueva capacidad; ampliarla no añade tokens.
+
+        Args:
+            rate_per_minute: Nuevas peticiones permitidas por minuto (None no lo cambia)
+            burst: Nueva capacidad del bucket (None no la cambia)
+        """
+        with self._lock:
+            self._refill(self.clock())
+            if rate_per_minute is not None:
+                self.rate = self._per_second(rate_per_minute)
+            if burst is not None:
+                self.capacity = float(max(burst, 1))
+                self._tokens = min(self._tokens, self.capacity)
+
+@functools.lru_cache(maxsize=None)
+def _shared_rate_limiter(api_key: str) -> RateLimiter:
+    return RateLimiter(TRANSCRIPTION_RATE_LIMIT_PER_MINUTE, burst=TRANSCRIPTION_RATE_LIMIT_BURST)
+
+def get_rate_limiter(api_key: str, rate_per_minute: Optional[float] = None,
+                     burst: Optional[int] = None) -> RateLimiter:
+    """
+    Devuelve el límite de peticiones del proceso para una API key, compartido por
+    todas las sesiones (el límite de Groq es por clave, no por sesión). Se crea
+    con `TRANSCRIPTION_RATE_LIMIT_PER_MINUTE` y `TRANSCRIPTION_RATE_LIMIT_BURST`.
+
+    Args:
+        api_key: La API key de Groq
+        rate_per_minute: Peticiones por minuto que se fijan en el límite compartido
+            (None mantiene las actuales)
+        burst: Capacidad que se fija en el límite compartido (p. ej. la concurrencia del
+            lote), como mucho `TRANSCRIPTION_RATE_LIMIT_MAX_BURST` (None mantiene la actual)
+
+    Returns:
+        El `RateLimiter` compartido
+    """
+    limiter = _shared_rate_limiter(api_key)
+    if burst is not None:
+        burst = min(burst, TRANSCRIPTION_RATE_LIMIT_MAX_BURST)
+    if rate_per_minute is not None or burst is not None:
+        limiter.configure(rate_per_minute, burst)
+    return limiter
+
+def iter_batch_transcriptions(client, model: str, files: list,
+                              max_concurrency: int = TRANSCRIPTION_BATCH_CONCURRENCY,
+                              rate_limiter: Optional[RateLimiter] = None,
+                              preprocess: bool = TRANSCRIPTION_PREPROCESS) -> Iterator[Tuple[int, str, str]]:
+    """
+    Transcribe varios archivos en paralelo y produce el progreso de cada uno.
+    Los eventos se producen en el hilo que itera, por lo que se pueden usar
+    directamente para actualizar la interfaz de Streamlit.
+
+    Args:
+        client: El cliente Groq configurado
+        model: El modelo de transcripción
+        files: Los archivos subidos (con atributo `name`)
+        max_concurrency: Número máximo de archivos transcritos a la vez
+        rate_limiter: Límite de peticiones compartido por todas las transcripciones
+        preprocess: Si se deben convertir los audios a 16 kHz en mono antes de enviarlos
+
+    Yields:
+        Tuplas (índice del archivo, estado, texto o mensaje de error)
+    """
+    from models.transcription import transcribe_audio
+
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(TRANSCRIPTION_RATE_LIMIT_PER_MINUTE, burst=max_concurrency)
+
+    events: "queue.Queue[Tuple[int, str, str]]" = queue.Queue()
+
+    def transcribe(index: int, file):
+        events.put((index, TRANSCRIBIENDO, ""))
+        try:
+            text = transcribe_audio(client, model, file, file.name, rate_limiter=rate_limiter,
+                                    preprocess=preprocess)
+        except Exception as e:
+            events.put((index, ERROR, f"Error al procesar el audio: {str(e)}"))
+        else:
+            events.put((index, COMPLETADO, text))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(files))),
+                            thread_name_prefix="transcripcion-lote") as pool:
+        for index, file in enumerate(files):
+            pool.submit(transcribe, index, file)
+
+        finished = 0
+        while finished < len(files):
+            event = events.get()
+            if event[1] in (COMPLETADO, ERROR):
+                finished += 1
+            yield event
+
+def export_transcriptions(names: List[str], texts: List[str]) -> str:
+    """
+    Une las transcripciones de un lote en un único documento Markdown.
+
+    Args:
+        names: Los nombres de los archivos, en orden
+        texts: Las transcripciones (o mensajes de error), en el mismo orden
+
+    Returns:
+        El documento con una sección por archivo
+    """
+    return "\n\n".join(f"## {name}\n\n{text.strip()}" for name, text in zip(names, texts)) + "\n"
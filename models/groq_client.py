@@ -1,17 +1,23 @@
 """
 Módulo para la configuración y manejo del cliente Groq.
 Incluye funciones para obtener la API key y procesar archivos de audio.
+No depende de Streamlit: la interfaz pide la API key al usuario si no está en el entorno.
 """
 
+import functools
 import os
-import groq
-import streamlit as st
 from typing import Optional
 
-@st.cache_resource
+from config.settings import REQUEST_COALESCING, TRANSCRIPTION_PREPROCESS
+from utils.http_pool import get_shared_http_client
+
+@functools.lru_cache(maxsize=None)
 def get_groq_client(api_key: str):
     """
-    Obtiene un cliente Groq usando la API key proporcionada.
+    Obtiene un cliente Groq usando la API key proporcionada, creándolo una sola vez
+    por proceso. Todos los clientes comparten el pool de conexiones HTTP y, con
+    `REQUEST_COALESCING`, las peticiones en streaming idénticas en curso comparten
+    un único stream (`models.request_coalescing`).
     
     Args:
         api_key: La API key de Groq
@@ -21,28 +27,25 @@ def get_groq_client(api_key: str):
     """
     if not api_key:
         return None
-    return groq.Groq(api_key=api_key)
+    import groq
+    
+    client = groq.Groq(api_key=api_key, http_client=get_shared_http_client())
+    if REQUEST_COALESCING:
+        from models.request_coalescing import CoalescingClient
+
+        client = CoalescingClient(client)
+    return client
 
 def get_groq_api_key() -> Optional[str]:
     """
-    Obtiene la API key de Groq de manera segura.
+    Obtiene la API key de Groq de las variables de entorno (o del archivo .env ya cargado).
     
     Returns:
         La API key de Groq o None si no se encuentra
     """
-    # Primero intentar obtenerla del archivo .env
-    api_key = os.getenv("GROQ_API_KEY")
-    
-    # Si no está en el archivo .env, intentar obtenerla del entorno
-    if not api_key:
-        # Como último recurso, pedirla al usuario (solo en desarrollo)
-        api_key = st.sidebar.text_input("Introduce tu API key de Groq:", type="password")
-        if not api_key:
-            st.sidebar.warning("Por favor, introduce tu API key de Groq para continuar.")
-    
-    return api_key
+    return os.getenv("GROQ_API_KEY") or None
 
-def process_audio_file(file, model, client):
+def process_audio_file(file, model, client, preprocess: bool = TRANSCRIPTION_PREPROCESS, rate_limiter=None):
     """
     Procesa un archivo de audio usando la API de Groq.
     
@@ -50,35 +53,18 @@ def process_audio_file(file, model, client):
         file: El archivo de audio a procesar
         model: El modelo a utilizar para la transcripción
         client: El cliente Groq configurado
+        preprocess: Si se debe convertir el audio a 16 kHz en mono antes de enviarlo
+        rate_limiter: Límite de peticiones compartido con las transcripciones por lotes
         
     Returns:
         El texto transcrito del archivo de audio
     """
+    from models.transcription import transcribe_audio
+    
     try:
-        # Leer el archivo y codificarlo en base64
-        file_bytes = file.getvalue()
-        
-        # Determinar el tipo de archivo para casos donde no se detecta correctamente
-        file_type = file.type
-        if not file_type or '/' not in file_type:
-            # Inferir tipo basado en la extensión
-            if file.name.lower().endswith('.ogg'):
-                file_type = 'audio/ogg'
-            elif file.name.lower().endswith('.mp3'):
-                file_type = 'audio/mpeg'
-            elif file.name.lower().endswith('.wav'):
-                file_type = 'audio/wav'
-            elif file.name.lower().endswith('.m4a'):
-                file_type = 'audio/m4a'
-            else:
-                file_type = 'audio/ogg'  # Default para archivos de WhatsApp
-        
-        # Crear la solicitud a la API
-        transcription = client.audio.transcriptions.create(
-            model=model,
-            file=(file.name, file_bytes)
-        )
-        
-        return transcription.text
+        # Transcribir el audio directamente desde el archivo subido, sin copiarlo.
+        # El formato se detecta por la cabecera del archivo, los audios se convierten
+        # a 16 kHz en mono si se reduce su tamaño y los largos se dividen en fragmentos
+        return transcribe_audio(client, model, file, file.name, preprocess=preprocess, rate_limiter=rate_limiter)
     except Exception as e:
-        return f"Error al procesar el audio: {str(e)}" 
\ No newline at end of file
+        return f"Error al procesar el audio: {str(e)}"
@@ -0,0 +1,220 @@
+"""
+Agrupación de peticiones de chat en streaming idénticas.
+
+Cuando varias sesiones envían a la vez exactamente la misma petición (mismo
+modelo, mensajes y parámetros), solo la primera abre un stream con Groq; las
+demás se suscriben a él y reciben los mismos fragmentos desde el principio,
+aunque lleguen con el stream ya empezado. No hay hilos propios: el suscriptor
+que necesita el siguiente fragmento lo lee del stream de Groq, así que el
+stream avanza mientras quede alguien leyéndolo y se cierra cuando el último
+suscriptor lo abandona. Una petición que llega cuando el stream ya terminó abre
+uno nuevo (esto no es una caché).
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Marca de que el suscriptor debe leer el siguiente fragmento del stream de Groq
+_READ = object()
+
+def request_key(params: Dict[str, Any]) -> str:
+    """Clave de una petición: sus parámetros serializados en un orden estable."""
+    return json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+class _Flight:
+    """Un stream de Groq en curso compartido por varios suscriptores."""
+
+    def __init__(self, open_stream: Callable[[], Iterable]):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._open_stream = open_stream
+        self._upstream = None
+        self._iterator: Optional[Iterator] = None
+        self._pumping = False
+        self._condition = threading.Condition()
+
+    def _finish(self, error: Optional[BaseException] = None):
+        with self._condition:
+            self._pumping = False
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def _pump(self):
+        # Leer un fragmento del stream de Groq (fuera del cerrojo, puede bloquear)
+        try:
+            if self._iterator is None:
+                self._upstream = self._open_stream()
+                self._iterator = iter(self._upstream)
+            chunk = next(self._iterator)
+        except StopIteration:
+            self._finish()
+            return
+        except BaseException as e:
+            # El error se entrega a todos los suscriptores
+            self._finish(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        with self._condition:
+            self._pumping = False
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    def iter_chunks(self) -> Iterator[Any]:
+        """Produce todos los fragmentos del stream desde el principio; relanza su error, si lo hubo."""
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.chunks) and not self.done and self._pumping:
+                    self._condition.wait()
+                if index < len(self.chunks):
+                    chunk = self.chunks[index]
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    # Nadie está leyendo el stream: lo lee este suscriptor
+                    self._pumping = True
+                    chunk = _READ
+            if chunk is _READ:
+                self._pump()
+                continue
+            index += 1
+            yield chunk
+
+    def close(self):
+        """Cierra el stream de Groq (cuando ya no quedan suscriptores)."""
+        with self._condition:
+            upstream = self._upstream
+            self._upstream = None
+            self.done = True
+            self._condition.notify_all()
+        close = getattr(upstream, "close", None)
+        if close is not None:
+            close()
+
+class CoalescedStream:
+    """
+    Stream devuelto a cada suscriptor. Se itera como el stream del SDK de Groq y
+    admite `close()` y `with`.
+    """
+
+    def __init__(self, coalescer: "RequestCoalescer", key: str, flight: _Flight):
+        self._coalescer = coalescer
+        self._key = key
+        self._flight = flight
+        self._closed = False
+        self._chunks = flight.iter_chunks()
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            yield from self._chunks
+        finally:
+            self.close()
+
+    def close(self):
+        """Deja de recibir fragmentos; el último suscriptor cierra el stream de Groq."""
+        if not self._closed:
+            self._closed = True
+            self._chunks.close()
+            self._coalescer._leave(self._key, self._flight)
+
+    def __enter__(self) -> "CoalescedStream":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class RequestCoalescer:
+    """
+    Registro de los streams en curso, indexados por la clave de su petición.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.upstream_requests = 0
+        self.coalesced_requests = 0
+
+    def stream(self, params: Dict[str, Any], open_stream: Callable[[], Iterable]) -> CoalescedStream:
+        """
+        Devuelve un stream con los fragmentos de la petición, compartiendo el stream
+        en curso de una petición idéntica si existe.
+
+        Args:
+            params: Los parámetros de la petición
+            open_stream: Función que abre el stream de Groq (solo se llama si no hay uno en curso)
+
+        Returns:
+            Un `CoalescedStream` con todos los fragmentos de la respuesta
+        """
+        key = request_key(params)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.done:
+                flight = _Flight(open_stream)
+                self._flights[key] = flight
+                self.upstream_requests += 1
+            else:
+                self.coalesced_requests += 1
+            flight.subscribers += 1
+        return CoalescedStream(self, key, flight)
+
+    def _leave(self, key: str, flight: _Flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers > 0:
+                return
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Peticiones enviadas a Groq y peticiones que se sumaron a un stream en curso."""
+        with self._lock:
+            return {
+                "upstream": self.upstream_requests,
+                "coalesced": self.coalesced_requests,
+                "in_flight": len(self._flights)
+            }
+
+class _CoalescingCompletions:
+    def __init__(self, completions, coalescer: RequestCoalescer):
+        self._completions = completions
+        self._coalescer = coalescer
+
+    def create(self, **params):
+        if not params.get("stream"):
+            return self._completions.create(**params)
+        return self._coalescer.stream(params, lambda: self._completions.create(**params))
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+class _CoalescingChat:
+    def __init__(self, chat, coalescer: RequestCoalescer):
+        self._chat = chat
+        self.completions = _CoalescingCompletions(chat.completions, coalescer)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+class CoalescingClient:
+    """
+    Envoltorio de un cliente Groq síncrono que agrupa las peticiones de chat en
+    streaming idénticas en curso. El resto de llamadas (sin streaming,
+    transcripciones...) se delegan sin cambios al cliente original.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.coalescer = RequestCoalescer()
+        self.chat = _CoalescingChat(client.chat, self.coalescer)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -0,0 +1,603 @@
+"""
+Transcripción de audios largos por fragmentos.
+
+El audio se decodifica a PCM mono, se divide en fragmentos que se cortan en
+silencios y se solapan ligeramente, los fragmentos se transcriben en paralelo
+con un número acotado de hilos y los textos se unen en orden eliminando las
+palabras repetidas en los solapamientos.
+
+El audio nunca se copia entero: los archivos subidos se leen sobre su propio
+búfer (o un archivo temporal en disco) y se envían a la API como archivo.
+"""
+
+import io
+import math
+import mmap
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import (
+    TRANSCRIPTION_CHUNK_MAX_BYTES,
+    TRANSCRIPTION_CHUNK_OVERLAP,
+    TRANSCRIPTION_MAX_WORDS_PER_SECOND,
+    TRANSCRIPTION_MIN_OVERLAP_WORDS,
+    TRANSCRIPTION_CHUNK_SECONDS,
+    TRANSCRIPTION_MAX_WORKERS,
+    TRANSCRIPTION_MIN_SPLIT_BYTES,
+    TRANSCRIPTION_PREPROCESS,
+    TRANSCRIPTION_SILENCE_WINDOW,
+    TRANSCRIPTION_SPOOL_MAX_MEMORY
+)
+from models.transcription_cache import audio_cache_key, get_transcription_cache
+
+# Frecuencia de muestreo con la que trabaja Whisper internamente
+WHISPER_SAMPLE_RATE = 16000
+
+# Frecuencia a la que ffmpeg decodifica el audio
+DECODE_SAMPLE_RATE = WHISPER_SAMPLE_RATE
+
+# Coeficientes del filtro paso bajo aplicado antes de reducir la frecuencia de muestreo
+RESAMPLE_TAPS = 33
+
+# Duración de las ventanas usadas para medir la energía del audio (segundos)
+ENERGY_FRAME_SECONDS = 0.03
+
+# Muestras procesadas a la vez al calcular la energía del audio
+ENERGY_BLOCK_SAMPLES = 1024 * 1024
+
+# Tamaño de los bloques con que se lee el audio al enviarlo a ffmpeg o a un archivo temporal
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+def _open_buffer(audio) -> Optional[memoryview]:
+    """
+    Obtiene una vista de solo lectura del contenido del audio sin copiarlo.
+    Usa el búfer interno de los `BytesIO` (como los archivos subidos a Streamlit)
+    o proyecta en memoria los archivos en disco; devuelve None si no es posible.
+    """
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return memoryview(audio)
+    if isinstance(audio, tempfile.SpooledTemporaryFile):
+        # Antes de pasar a disco el contenido está en un BytesIO interno
+        audio = audio._file
+    if hasattr(audio, "getbuffer"):
+        return audio.getbuffer()
+    try:
+        return memoryview(mmap.mmap(audio.fileno(), 0, access=mmap.ACCESS_READ))
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+def _iter_blocks(audio, block_size: int = STREAM_BLOCK_SIZE):
+    if isinstance(audio, memoryview):
+        for start in range(0, len(audio), block_size):
+            yield audio[start:start + block_size]
+        return
+    audio.seek(0)
+    for block in iter(lambda: audio.read(block_size), b""):
+        yield block
+
+def _audio_size(audio) -> int:
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return len(audio)
+    position = audio.tell()
+    size = audio.seek(0, io.SEEK_END)
+    audio.seek(position)
+    return size
+
+def _decode_wav(buffer: memoryview) -> Optional[Tuple[np.ndarray, int]]:
+    # Recorrer los bloques RIFF para localizar el formato y los datos PCM
+    if len(buffer) < 12 or bytes(buffer[:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        return None
+    offset = 12
+    channels = sample_rate = None
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        size, = struct.unpack_from("<I", buffer, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt " and size >= 16:
+            format_tag, channels, sample_rate = struct.unpack_from("<HHI", buffer, body)
+            bits, = struct.unpack_from("<H", buffer, body + 14)
+            # Solo PCM de 16 bits (1) o su variante extensible (0xFFFE)
+            if format_tag not in (1, 0xFFFE) or bits != 16 or not channels:
+                return None
+        elif chunk_id == b"data":
+            if channels is None:
+                return None
+            # Los WAV grabados en streaming pueden declarar un tamaño mayor que el real
+            size = min(size, len(buffer) - body)
+            frames = size // (2 * channels)
+            # Vista sobre el búfer original: no se copian las muestras
+            samples = np.frombuffer(buffer, dtype="<i2", count=frames * channels, offset=body)
+            if channels > 1:
+                # Mezclar los canales a mono
+                samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32).astype(np.int16)
+            return samples, sample_rate
+        offset = body + size + (size & 1)
+    return None
+
+def _feed_process(stdin, audio):
+    try:
+        for block in _iter_blocks(audio):
+            stdin.write(block)
+    except (BrokenPipeError, OSError, ValueError):
+        pass
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+def _run_ffmpeg(audio, output_args: List[str]) -> Optional[bytes]:
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    process = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-loglevel", "error", "-i", "pipe:0", *output_args, "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    # Enviar el audio por bloques desde otro hilo mientras se lee la salida
+    feeder = threading.Thread(target=_feed_process, args=(process.stdin, audio), daemon=True)
+    feeder.start()
+    output = process.stdout.read()
+    process.stdout.close()
+    returncode = process.wait()
+    feeder.join()
+    if returncode != 0 or not output:
+        return None
+    return output
+
+def _decode_ffmpeg(audio) -> Optional[Tuple[np.ndarray, int]]:
+    pcm = _run_ffmpeg(audio, ["-f", "s16le", "-ac", "1", "-ar", str(DECODE_SAMPLE_RATE)])
+    if pcm is None:
+        return None
+    return np.frombuffer(pcm, dtype="<i2"), DECODE_SAMPLE_RATE
+
+def decode_audio(audio, filename: str = "") -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Decodifica un audio a muestras PCM de 16 bits en mono.
+    Los WAV se leen directamente sobre el búfer del archivo, sin copiarlo;
+    el resto de formatos se envían por bloques a ffmpeg.
+
+    Args:
+        audio: El contenido del audio (bytes o archivo binario abierto)
+        filename: El nombre del archivo (para detectar WAV por la extensión)
+
+    Returns:
+        Una tupla (muestras, frecuencia de muestreo) o None si no se pudo decodificar.
+        Las muestras de un WAV mono son una vista sobre el búfer del archivo, por lo
+        que el archivo no debe cerrarse mientras se usen.
+    """
+    if isinstance(audio, WavSegmentFile):
+        return audio.samples, audio.sample_rate
+
+    buffer = _open_buffer(audio)
+    source = buffer if buffer is not None else audio
+    if buffer is not None:
+        head = bytes(buffer[:4])
+    else:
+        audio.seek(0)
+        head = audio.read(4)
+
+    if filename.lower().endswith(".wav") or head == b"RIFF":
+        if buffer is not None:
+            decoded = _decode_wav(buffer)
+            if decoded is not None:
+                return decoded
+    return _decode_ffmpeg(source)
+
+def spool_upload(stream, max_memory: int = TRANSCRIPTION_SPOOL_MAX_MEMORY) -> tempfile.SpooledTemporaryFile:
+    """
+    Copia por bloques un flujo de entrada (p. ej. el cuerpo de una petición HTTP)
+    a un archivo temporal que se mantiene en memoria hasta `max_memory` bytes y
+    pasa a disco a partir de ese tamaño.
+
+    Args:
+        stream: El flujo binario de origen
+        max_memory: Tamaño máximo en memoria antes de pasar a disco
+
+    Returns:
+        El archivo temporal, posicionado al inicio
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b""):
+        spooled.write(block)
+    spooled.seek(0)
+    return spooled
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    Codifica muestras PCM de 16 bits en mono como un archivo WAV.
+
+    Args:
+        samples: Las muestras de audio
+        sample_rate: La frecuencia de muestreo
+
+    Returns:
+        El contenido del archivo WAV
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+class _WavSegmentReader(io.RawIOBase):
+    """Archivo de solo lectura con una cabecera WAV seguida de las muestras, sin copiarlas."""
+
+    def __init__(self, header: bytes, frames: memoryview):
+        self._parts = [memoryview(header), frames]
+        self._size = len(header) + len(frames)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence]
+        self._position = min(max(base + offset, 0), self._size)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast("B")
+        written = 0
+        offset = self._position
+        for part in self._parts:
+            if offset >= len(part):
+                offset -= len(part)
+                continue
+            count = min(len(part) - offset, len(target) - written)
+            target[written:written + count] = part[offset:offset + count]
+            written += count
+            offset = 0
+            if written == len(target):
+                break
+        self._position += written
+        return written
+
+class WavSegmentFile(io.BufferedReader):
+    """Archivo WAV creado por `wav_segment_file`; conserva las muestras para no volver a decodificarlas."""
+
+    def __init__(self, raw: _WavSegmentReader, samples: np.ndarray, sample_rate: int):
+        super().__init__(raw)
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+def wav_segment_file(samples: np.ndarray, sample_rate: int) -> WavSegmentFile:
+    """
+    Crea un archivo WAV de solo lectura sobre un fragmento de muestras PCM de 16 bits
+    en mono, sin copiar las muestras (a diferencia de `encode_wav`).
+
+    Args:
+        samples: Las muestras de audio (se usan tal cual si ya son int16 contiguas)
+        sample_rate: La frecuencia de muestreo
+
+    Returns:
+        Un archivo binario abierto con el contenido WAV
+    """
+    samples = np.ascontiguousarray(samples, dtype="<i2")
+    frames = memoryview(samples).cast("B")
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(frames), b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(frames)
+    )
+    return WavSegmentFile(_WavSegmentReader(header, frames), samples, sample_rate)
+
+def detect_audio_format(audio) -> Optional[str]:
+    """
+    Detecta el formato de un audio por su cabecera, sin fiarse de la extensión.
+
+    Args:
+        audio: El contenido del audio (bytes o archivo binario abierto)
+
+    Returns:
+        La extensión correspondiente ("wav", "ogg", "flac", "mp3", "m4a", "webm") o None
+    """
+    buffer = _open_buffer(audio)
+    if buffer is not None:
+        head = bytes(buffer[:12])
+    else:
+        position = audio.tell()
+        audio.seek(0)
+        head = audio.read(12)
+        audio.seek(position)
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+def audio_filename(audio, filename: str) -> str:
+    """
+    Corrige la extensión del nombre de archivo según el formato real del audio,
+    ya que la API deduce el formato del nombre (p. ej. notas de WhatsApp sin extensión).
+    """
+    detected = detect_audio_format(audio)
+    base, _, extension = filename.rpartition(".")
+    if not base:
+        base, extension = filename or "audio", ""
+    if detected is None or extension.lower() == detected:
+        return filename
+    if detected == "m4a" and extension.lower() in ("mp4", "m4a", "aac"):
+        return filename
+    return f"{base}.{detected}"
+
+def _lowpass_kernel(cutoff: float, taps: int = RESAMPLE_TAPS) -> np.ndarray:
+    # Filtro FIR de sinc enventanado; `cutoff` en ciclos por muestra (0-0.5)
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int = WHISPER_SAMPLE_RATE,
+             block_size: int = ENERGY_BLOCK_SAMPLES) -> np.ndarray:
+    """
+    Cambia la frecuencia de muestreo de un audio PCM de 16 bits en mono.
+    Al reducir la frecuencia se aplica antes un filtro paso bajo para evitar aliasing;
+    el audio se procesa por bloques para no crear copias en coma flotante del total.
+
+    Args:
+        samples: Las muestras de audio
+        sample_rate: La frecuencia de muestreo original
+        target_rate: La frecuencia de muestreo deseada
+        block_size: Número de muestras de salida calculadas en cada bloque
+
+    Returns:
+        Las muestras remuestreadas (int16)
+    """
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    ratio = sample_rate / target_rate
+    output = np.empty(int(len(samples) / ratio), dtype=np.int16)
+    kernel = _lowpass_kernel(0.45 / ratio) if ratio > 1 else None
+    margin = len(kernel) if kernel is not None else 1
+
+    for start in range(0, len(output), block_size):
+        end = min(start + block_size, len(output))
+        positions = np.arange(start, end) * ratio
+        low = max(int(positions[0]) - margin, 0)
+        high = min(int(positions[-1]) + margin + 2, len(samples))
+        segment = samples[low:high].astype(np.float32)
+        if kernel is not None:
+            segment = np.convolve(segment, kernel, mode="same")
+        values = np.interp(positions - low, np.arange(high - low), segment)
+        output[start:end] = np.clip(np.round(values), -32768, 32767)
+    return output
+
+def transcode_for_whisper(audio, filename: str):
+    """
+    Convierte un audio al formato compacto que usa Whisper: 16 kHz en mono.
+    Los WAV se remuestrean con NumPy; el resto de formatos se convierten a FLAC
+    con ffmpeg si está instalado. El resultado solo se usa si es más pequeño.
+
+    Args:
+        audio: El contenido del audio (bytes o archivo binario abierto)
+        filename: El nombre del archivo
+
+    Returns:
+        Una tupla (archivo convertido, nuevo nombre) o None si no compensa o no es posible
+    """
+    base = filename.rsplit(".", 1)[0] or "audio"
+    if detect_audio_format(audio) == "wav":
+        decoded = decode_audio(audio, filename)
+        if decoded is None:
+            return None
+        samples, sample_rate = decoded
+        if sample_rate > WHISPER_SAMPLE_RATE:
+            samples = resample(samples, sample_rate)
+            sample_rate = WHISPER_SAMPLE_RATE
+        converted = wav_segment_file(samples, sample_rate)
+        name = f"{base}.wav"
+    else:
+        flac = _run_ffmpeg(audio, ["-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-c:a", "flac", "-f", "flac"])
+        if flac is None:
+            return None
+        converted = io.BytesIO(flac)
+        name = f"{base}.flac"
+
+    if _audio_size(converted) >= _audio_size(audio):
+        return None
+    return converted, name
+
+def split_on_silence(samples: np.ndarray, sample_rate: int,
+                     chunk_seconds: float = TRANSCRIPTION_CHUNK_SECONDS,
+                     overlap_seconds: float = TRANSCRIPTION_CHUNK_OVERLAP,
+                     search_seconds: float = TRANSCRIPTION_SILENCE_WINDOW) -> List[Tuple[int, int]]:
+    """
+    Calcula los fragmentos en que dividir el audio, cortando en el punto más silencioso
+    cerca de cada límite objetivo y solapando los fragmentos consecutivos.
+
+    Args:
+        samples: Las muestras de audio en mono
+        sample_rate: La frecuencia de muestreo
+        chunk_seconds: Duración objetivo de cada fragmento
+        overlap_seconds: Solapamiento entre fragmentos consecutivos
+        search_seconds: Margen a cada lado del límite objetivo para buscar un silencio
+
+    Returns:
+        Lista de tuplas (muestra inicial, muestra final) de cada fragmento
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    # Energía media de cada ventana corta, para localizar silencios
+    frame = max(int(ENERGY_FRAME_SECONDS * sample_rate), 1)
+    frame_count = total // frame
+    energy = np.empty(frame_count, dtype=np.float64)
+    # Calcular por bloques para no crear copias temporales del audio completo
+    block = max(ENERGY_BLOCK_SAMPLES // frame, 1)
+    for first in range(0, frame_count, block):
+        last = min(first + block, frame_count)
+        window = samples[first * frame:last * frame].astype(np.int32).reshape(last - first, frame)
+        energy[first:last] = np.abs(window).mean(axis=1)
+
+    search = int(search_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        low = max(target - search, cuts[-1] + chunk // 2) // frame
+        high = min(target + search, total) // frame
+        if high > low:
+            cut = (low + int(np.argmin(energy[low:high]))) * frame
+        else:
+            cut = target
+        cuts.append(cut)
+    cuts.append(total)
+
+    return [
+        (max(start - overlap, 0) if index else start, end)
+        for index, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))
+    ]
+
+def _words(text: str) -> List[str]:
+    return [re.sub(r"[^\w]", "", word.lower()) for word in text.split()]
+
+def stitch_transcripts(texts: List[str], max_overlap_words: int = 30,
+                       min_overlap_words: int = TRANSCRIPTION_MIN_OVERLAP_WORDS) -> str:
+    """
+    Une las transcripciones de fragmentos consecutivos eliminando las palabras
+    repetidas por el solapamiento. Una sola palabra igual al final de un fragmento y
+    al principio del siguiente no cuenta como solapamiento (suele ser una repetición real).
+
+    Args:
+        texts: Las transcripciones en orden
+        max_overlap_words: Número máximo de palabras repetidas a buscar
+        min_overlap_words: Número mínimo de palabras repetidas para eliminarlas
+
+    Returns:
+        El texto completo
+    """
+    result: List[str] = []
+    for text in texts:
+        words = text.split()
+        if result and words:
+            previous = _words(" ".join(result[-max_overlap_words:]))
+            current = _words(" ".join(words[:max_overlap_words]))
+            # Buscar el solapamiento más largo entre el final anterior y el inicio actual
+            for size in range(min(len(previous), len(current)), min_overlap_words - 1, -1):
+                if previous[-size:] == current[:size]:
+                    words = words[size:]
+                    break
+        result.extend(words)
+    return " ".join(result)
+
+def _transcribe(client, model: str, filename: str, audio, rate_limiter=None) -> str:
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    if hasattr(audio, "seek"):
+        audio.seek(0)
+    transcription = client.audio.transcriptions.create(model=model, file=(filename, audio))
+    return transcription.text
+
+def transcribe_audio(client, model: str, audio, filename: str,
+                     max_workers: int = TRANSCRIPTION_MAX_WORKERS,
+                     chunk_seconds: float = TRANSCRIPTION_CHUNK_SECONDS,
+                     use_cache: bool = True, rate_limiter=None,
+                     preprocess: bool = TRANSCRIPTION_PREPROCESS) -> str:
+    """
+    Transcribe un audio con la API de Groq, dividiéndolo en fragmentos paralelos si es largo.
+    Si el audio es corto o no se puede decodificar, se envía en una sola petición.
+    Las transcripciones se guardan en la caché en disco por hash del audio y modelo.
+
+    Args:
+        client: El cliente Groq configurado
+        model: El modelo de transcripción
+        audio: El archivo de audio abierto en modo binario (o su contenido en bytes);
+            se lee por bloques o sobre su búfer, sin copiarlo entero
+        filename: El nombre del archivo
+        max_workers: Número máximo de fragmentos transcritos en paralelo
+        chunk_seconds: Duración objetivo de cada fragmento
+        use_cache: Si se debe consultar y actualizar la caché de transcripciones
+        rate_limiter: Límite de peticiones opcional (con método `acquire`), aplicado a
+            cada petición a la API, incluidos los fragmentos
+        preprocess: Si se debe convertir el audio a 16 kHz en mono antes de enviarlo
+
+    Returns:
+        El texto transcrito
+    """
+    if isinstance(audio, bytes):
+        # BytesIO comparte el contenido de un objeto bytes sin copiarlo
+        audio = io.BytesIO(audio)
+
+    cache = get_transcription_cache() if use_cache else None
+    if cache is None:
+        return _transcribe_uncached(client, model, audio, filename, max_workers, chunk_seconds,
+                                    rate_limiter, preprocess)
+
+    key = audio_cache_key(audio, model)
+    text = cache.get(key)
+    if text is None:
+        text = _transcribe_uncached(client, model, audio, filename, max_workers, chunk_seconds,
+                                    rate_limiter, preprocess)
+        cache.set(key, text)
+    return text
+
+def _transcribe_uncached(client, model: str, audio, filename: str,
+                         max_workers: int, chunk_seconds: float, rate_limiter=None,
+                         preprocess: bool = False) -> str:
+    filename = audio_filename(audio, filename)
+    if preprocess:
+        converted = transcode_for_whisper(audio, filename)
+        if converted is not None:
+            audio, filename = converted
+
+    # Los audios pequeños no se decodifican: se envían directamente
+    if _audio_size(audio) <= TRANSCRIPTION_MIN_SPLIT_BYTES:
+        return _transcribe(client, model, filename, audio, rate_limiter)
+
+    decoded = decode_audio(audio, filename)
+    if decoded is None:
+        return _transcribe(client, model, filename, audio, rate_limiter)
+
+    samples, sample_rate = decoded
+    # Limitar la duración para que cada fragmento WAV no supere el tamaño máximo
+    chunk_seconds = min(chunk_seconds, TRANSCRIPTION_CHUNK_MAX_BYTES / (2 * sample_rate))
+    if len(samples) <= chunk_seconds * sample_rate * 1.2:
+        # Liberar las muestras (y la vista sobre el búfer) antes de subir el archivo
+        del decoded, samples
+        return _transcribe(client, model, filename, audio, rate_limiter)
+
+    segments = split_on_silence(samples, sample_rate, chunk_seconds=chunk_seconds)
+    base_name = filename.rsplit(".", 1)[0] or "audio"
+
+    def transcribe_segment(item):
+        index, (start, end) = item
+        return _transcribe(client, model, f"{base_name}.{index:03d}.wav",
+                           wav_segment_file(samples[start:end], sample_rate), rate_limiter)
+
+    # Transcribir los fragmentos en paralelo; map conserva el orden original
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segments)))) as pool:
+        texts = list(pool.map(transcribe_segment, enumerate(segments)))
+
+    # El solapamiento no puede contener más palabras de las que caben en su duración
+    max_overlap_words = max(TRANSCRIPTION_MIN_OVERLAP_WORDS,
+                            math.ceil(TRANSCRIPTION_CHUNK_OVERLAP * TRANSCRIPTION_MAX_WORDS_PER_SECOND))
+    return stitch_transcripts(texts, max_overlap_words=max_overlap_words)
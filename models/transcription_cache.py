@@ -0,0 +1,121 @@
+"""
+Caché en disco de transcripciones, direccionada por contenido.
+
+La clave es el SHA-256 de los bytes del audio junto con el nombre del modelo,
+de modo que volver a subir el mismo archivo (o pulsar de nuevo "Transcribir")
+no vuelve a llamar a la API. Cuando el tamaño total supera el límite se
+eliminan las transcripciones usadas hace más tiempo.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from config.settings import TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_BYTES
+
+# Tamaño de los bloques con que se calcula el hash del audio
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def audio_cache_key(audio, model: str) -> str:
+    """
+    Calcula la clave de caché de un audio para un modelo.
+
+    Args:
+        audio: El contenido del audio (bytes, memoryview o archivo binario abierto)
+        model: El modelo de transcripción
+
+    Returns:
+        La clave hexadecimal (SHA-256)
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    if hasattr(audio, "read"):
+        # Leer el archivo por bloques sin cargarlo entero en memoria
+        position = audio.tell()
+        audio.seek(0)
+        for block in iter(lambda: audio.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        audio.seek(position)
+    else:
+        digest.update(audio)
+    return digest.hexdigest()
+
+class TranscriptionCache:
+    """
+    Almacén de transcripciones en un directorio, con límite de tamaño total.
+    Cada transcripción se guarda en un archivo `<clave>.txt`; la fecha de
+    modificación se actualiza en cada acierto para desalojar las menos usadas.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Directorio donde se guardan las transcripciones
+            max_bytes: Tamaño total máximo de las transcripciones guardadas
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la transcripción guardada para `key`, o None si no existe."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return text
+
+    def set(self, key: str, text: str):
+        """Guarda la transcripción de `key` y desaloja las más antiguas si hace falta."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".txt"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+_cache: Optional[TranscriptionCache] = None
+_cache_lock = threading.Lock()
+
+def get_transcription_cache() -> Optional[TranscriptionCache]:
+    """
+    Devuelve la caché de transcripciones del proceso, o None si no se puede crear el directorio.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = TranscriptionCache(TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_BYTES)
+            except OSError:
+                return None
+        return _cache
@@ -185,9 +185,12 @@ button[data-testid="baseButton-secondary"]:hover {
 }
 """
 
+# Bloque <style> listo para enviar (se genera una sola vez por proceso)
+STYLE_TAG = f"<style>{CUSTOM_CSS}</style>"
+
 def apply_custom_styles():
     """
     Aplica los estilos CSS personalizados a la aplicación Streamlit.
     """
     import streamlit as st
-    st.markdown(f"<style>{CUSTOM_CSS}</style>", unsafe_allow_html=True) 
\ No newline at end of file
+    st.markdown(STYLE_TAG, unsafe_allow_html=True) 
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Pruebas del nivel semántico de la caché de respuestas con preguntas casi iguales
+que tienen respuestas distintas.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.response_cache import ResponseCache, prompt_guard  # noqa: E402
+from utils.cache import TTLCache  # noqa: E402
+
+CONFIG = {"model": "llama-3.3-70b-versatile", "temperature": 0.0, "max_tokens": 1024, "system_prompt": "sys"}
+
+NEAR_MISSES = [
+    ("cuanto es 1234 + 5678", "cuanto es 1234 - 5678"),
+    ("cuanto es 10 / 2", "cuanto es 2 / 10"),
+    ("¿Es seguro usar eval en Python?", "¿No es seguro usar eval en Python?"),
+    ("Is it safe to use eval?", "Isn't it safe to use eval?"),
+    ("Explica la versión 3.11", "Explica la versión 3.12"),
+]
+
+def _same_vector(text):
+    # Embedding que considera iguales todos los mensajes: solo decide la comprobación de prompt_guard
+    return np.ones(8, dtype=np.float32) / np.sqrt(8)
+
+def _cache(embed=_same_vector):
+    return ResponseCache(TTLCache(max_entries=16, ttl=60), embed=embed)
+
+@pytest.mark.parametrize("cached, asked", NEAR_MISSES)
+def test_prompt_guard_distinguishes_near_misses(cached, asked):
+    assert prompt_guard(cached) != prompt_guard(asked)
+
+@pytest.mark.parametrize("cached, asked", NEAR_MISSES)
+def test_semantic_tier_rejects_near_misses(cached, asked):
+    cache = _cache()
+    cache.set(cached, response="respuesta", **CONFIG)
+    assert cache.get(asked, **CONFIG) is None
+    assert cache.stats()["semantic_hits"] == 0
+
+def test_semantic_tier_reuses_paraphrase():
+    cache = _cache()
+    cache.set("¿Cuál es la capital de Francia?", response="París", **CONFIG)
+    assert cache.get("dime la capital de francia", **CONFIG) == "París"
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_compound_words_are_not_operators():
+    assert prompt_guard("qué es el auto-completado") == prompt_guard("qué es el autocompletado")
+
+def test_semantic_tier_requires_embedding_function():
+    cache = _cache(embed=None)
+    cache.set("Explica el algoritmo quicksort", response="quicksort", **CONFIG)
+    assert cache.stats()["semantic"] is False
+    assert cache.get("Explica el algoritmo mergesort", **CONFIG) is None
+    assert cache.get("Explica el algoritmo  quicksort", **CONFIG) == "quicksort"
@@ -0,0 +1,51 @@
+"""
+Caché compartida de resultados de búsqueda web.
+Las búsquedas repetidas (en la misma sesión o en otras) se sirven desde memoria
+en lugar de volver a llamar a la API de búsqueda.
+"""
+
+import threading
+from typing import Optional
+
+from config.settings import SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_PATH, SEARCH_CACHE_TTL
+from utils.cache import SQLiteCacheBackend, TTLCache
+
+_cache: Optional[TTLCache] = None
+_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
+    """Normaliza una consulta: minúsculas y espacios colapsados."""
+    return " ".join(query.lower().split())
+
+def search_cache_key(provider: str, query: str, num_results: int, search_depth: str = "") -> str:
+    """
+    Calcula la clave de caché de una búsqueda.
+
+    Args:
+        provider: El proveedor de búsqueda (p. ej. "tavily")
+        query: La consulta
+        num_results: Número de resultados solicitados
+        search_depth: Profundidad de búsqueda, si el proveedor la admite
+
+    Returns:
+        La clave de caché
+    """
+    return f"{provider}|{search_depth}|{num_results}|{normalize_query(query)}"
+
+def get_search_cache() -> TTLCache:
+    """
+    Devuelve la caché de búsquedas del proceso, creándola la primera vez.
+    Si `SEARCH_CACHE_PATH` está configurado, usa SQLite como segundo nivel persistente.
+
+    Returns:
+        La caché de búsquedas compartida
+    """
+    global _cache
+    with _lock:
+        if _cache is None:
+            backend = None
+            if SEARCH_CACHE_PATH:
+                backend = SQLiteCacheBackend(SEARCH_CACHE_PATH, max_entries=SEARCH_CACHE_MAX_ENTRIES * 4,
+                                             ttl=SEARCH_CACHE_TTL)
+            _cache = TTLCache(max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL, backend=backend)
+        return _cache
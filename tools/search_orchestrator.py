@@ -0,0 +1,179 @@
+"""
+Orquestador de búsquedas web en varios proveedores a la vez.
+Lanza todas las búsquedas en paralelo con un tiempo máximo por proveedor y
+combina los resultados eliminando duplicados por URL. Opcionalmente devuelve
+lo que haya llegado dentro de un presupuesto de latencia, sin esperar al más lento.
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config.settings import SEARCH_LATENCY_BUDGET, SEARCH_PROVIDER_TIMEOUT
+from tools.web_search import (
+    duckduckgo_search_async,
+    format_search_results,
+    run_blocking,
+    tavily_search_async
+)
+from utils.lazy_imports import is_available
+
+# Un proveedor recibe (query, num_results) y devuelve resultados en el formato común.
+# Puede ser una función asíncrona o síncrona (esta se ejecuta en el pool de hilos de búsqueda)
+SearchProvider = Callable[[str, int], Any]
+
+def available_providers(tavily_api_key: Optional[str] = None) -> Dict[str, SearchProvider]:
+    """
+    Devuelve los proveedores de búsqueda instalados y configurados.
+
+    Args:
+        tavily_api_key: La API key de Tavily (sin ella no se usa Tavily)
+
+    Returns:
+        Diccionario nombre -> proveedor
+    """
+    providers: Dict[str, SearchProvider] = {}
+    if tavily_api_key and is_available("tavily"):
+        providers["tavily"] = functools.partial(tavily_search_async, api_key=tavily_api_key)
+    if is_available("duckduckgo_search"):
+        providers["duckduckgo"] = duckduckgo_search_async
+    return providers
+
+def normalize_url(url: str) -> str:
+    """Normaliza una URL para detectar duplicados (esquema y host en minúsculas, sin fragmento ni '/' final)."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+def merge_results(responses: List[Dict[str, Any]], num_results: int) -> Dict[str, Any]:
+    """
+    Combina los resultados de varios proveedores, intercalándolos por posición y
+    eliminando duplicados por URL.
+
+    Args:
+        responses: Resultados de cada proveedor, en orden de preferencia
+        num_results: Número máximo de resultados combinados
+
+    Returns:
+        Los resultados combinados en el formato común de los proveedores
+    """
+    merged = []
+    seen = set()
+    longest = max((len(response["results"]) for response in responses), default=0)
+    for position in range(longest):
+        for response in responses:
+            if position >= len(response["results"]):
+                continue
+            result = response["results"][position]
+            key = normalize_url(result["url"])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(dict(result, provider=response["provider"]))
+
+    answer = next((response["answer"] for response in responses if response.get("answer")), None)
+    return {
+        "provider": "+".join(response["provider"] for response in responses),
+        "answer": answer,
+        "results": merged[:num_results]
+    }
+
+async def _run_provider(name: str, provider: SearchProvider, query: str, num_results: int,
+                        timeout: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if asyncio.iscoroutinefunction(provider):
+        call = provider(query, num_results)
+    else:
+        call = run_blocking(provider, query, num_results)
+    data = await asyncio.wait_for(call, timeout)
+    return dict(data, provider=name, latency=time.perf_counter() - started)
+
+async def search_all(query: str, num_results: int = 5, providers: Optional[Dict[str, SearchProvider]] = None,
+                     timeout: float = SEARCH_PROVIDER_TIMEOUT,
+                     latency_budget: Optional[float] = SEARCH_LATENCY_BUDGET) -> Dict[str, Any]:
+    """
+    Busca en todos los proveedores a la vez y combina sus resultados.
+
+    Sin `latency_budget` se espera a todos los proveedores (cada uno con su `timeout`).
+    Con `latency_budget`, se devuelven los proveedores que hayan respondido dentro del
+    presupuesto; si ninguno lo hizo, se devuelve el primero que responda con éxito.
+
+    Args:
+        query: La consulta a buscar
+        num_results: Número de resultados a devolver
+        providers: Proveedores a consultar (por defecto, `available_providers()`)
+        timeout: Tiempo máximo de cada proveedor en segundos
+        latency_budget: Presupuesto de latencia en segundos (None para esperar a todos)
+
+    Returns:
+        Los resultados combinados, con las claves adicionales "providers" (proveedores
+        que respondieron), "latencies" y "errors" (errores por proveedor)
+    """
+    if providers is None:
+        providers = available_providers()
+    if not providers:
+        raise ValueError("No hay ningún proveedor de búsqueda disponible.")
+
+    tasks = {
+        asyncio.ensure_future(_run_provider(name, provider, query, num_results, timeout)): name
+        for name, provider in providers.items()
+    }
+    order = list(providers)
+    responses: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+
+    def collect(done):
+        for task in done:
+            name = tasks[task]
+            if task.cancelled():
+                continue
+            exc = task.exception()
+            if exc is None:
+                responses[name] = task.result()
+            elif isinstance(exc, asyncio.TimeoutError):
+                errors[name] = f"sin respuesta en {timeout:.0f} s"
+            else:
+                errors[name] = str(exc)
+
+    done, pending = await asyncio.wait(tasks, timeout=latency_budget)
+    collect(done)
+
+    # Con presupuesto de latencia: si nadie respondió a tiempo, quedarse con el primero que lo haga
+    while pending and not responses and latency_budget is not None:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        collect(done)
+
+    for task in pending:
+        task.cancel()
+        errors[tasks[task]] = "descartado por el presupuesto de latencia"
+
+    if not responses:
+        raise RuntimeError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+    ordered = [responses[name] for name in order if name in responses]
+    merged = merge_results(ordered, num_results)
+    merged["providers"] = [response["provider"] for response in ordered]
+    merged["latencies"] = {response["provider"]: response["latency"] for response in ordered}
+    merged["errors"] = errors
+    return merged
+
+async def buscar_en_paralelo(query: str, num_results: int = 5,
+                             providers: Optional[Dict[str, SearchProvider]] = None) -> str:
+    """
+    Busca en todos los proveedores disponibles a la vez y formatea los resultados.
+
+    Args:
+        query (str): La consulta a buscar
+        num_results (int): Número de resultados a devolver (default: 5)
+        providers: Proveedores a consultar (por defecto, `available_providers()`)
+
+    Returns:
+        str: Resultados de la búsqueda formateados como texto
+    """
+    try:
+        data = await search_all(query, num_results, providers)
+    except Exception as e:
+        return f"Error al realizar la búsqueda: {str(e)}"
+    return format_search_results(query, data, header=f"Resultados de búsqueda ({', '.join(data['providers'])}) para")
@@ -0,0 +1,247 @@
+"""
+Proveedores de búsqueda web (Tavily y DuckDuckGo).
+Cada proveedor devuelve los resultados en un formato común:
+{"provider": str, "answer": Optional[str], "results": [{"title", "url", "content", "score"}]}
+Las búsquedas se guardan en la caché compartida de `tools.search_cache`.
+
+Cada proveedor tiene una versión asíncrona que no bloquea el bucle de eventos:
+usa el cliente asíncrono del proveedor si existe y, si no, ejecuta la versión
+síncrona en un pool de hilos acotado reservado para las búsquedas.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+from config.settings import SEARCH_MAX_WORKERS
+from tools.search_cache import get_search_cache, search_cache_key
+
+# Hilos reservados para las llamadas bloqueantes a los proveedores de búsqueda
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="busqueda-web")
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una función bloqueante en el pool de hilos de búsqueda sin bloquear el bucle.
+
+    Args:
+        func: La función a ejecutar
+        *args, **kwargs: Argumentos de la función
+
+    Returns:
+        El resultado de la función
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_search_executor, lambda: func(*args, **kwargs))
+
+@lru_cache(maxsize=8)
+def get_tavily_client(api_key: str):
+    """
+    Obtiene un cliente de Tavily compartido por todas las sesiones.
+
+    Args:
+        api_key: La API key de Tavily
+
+    Returns:
+        Un cliente `TavilyClient` configurado
+    """
+    from tavily import TavilyClient
+    return TavilyClient(api_key=api_key)
+
+def tavily_search(query: str, num_results: int = 5, api_key: str = None,
+                  search_depth: str = "advanced") -> Dict[str, Any]:
+    """
+    Realiza una búsqueda con Tavily Search API, usando la caché de búsquedas.
+
+    Args:
+        query: La consulta a buscar
+        num_results: Número de resultados a devolver
+        api_key: La API key de Tavily
+        search_depth: Profundidad de la búsqueda ("basic" o "advanced")
+
+    Returns:
+        Los resultados en el formato común de los proveedores
+    """
+    if not api_key:
+        raise ValueError("No se encontró la API key de Tavily. Configura TAVILY_API_KEY en el archivo .env.")
+
+    search_cache = get_search_cache()
+    cache_key = search_cache_key("tavily", query, num_results, search_depth=search_depth)
+    data = search_cache.get(cache_key)
+    if data is not None:
+        return data
+
+    search_results = get_tavily_client(api_key).search(
+        query=query, max_results=num_results, search_depth=search_depth, include_answer=True
+    )
+    data = _normalize_tavily(search_results, num_results)
+    search_cache.set(cache_key, data)
+    return data
+
+@lru_cache(maxsize=8)
+def get_async_tavily_client(api_key: str):
+    """
+    Obtiene un cliente asíncrono de Tavily, o None si la versión instalada no lo incluye.
+
+    Args:
+        api_key: La API key de Tavily
+
+    Returns:
+        Un cliente `AsyncTavilyClient` configurado o None
+    """
+    try:
+        from tavily import AsyncTavilyClient
+    except ImportError:
+        return None
+    return AsyncTavilyClient(api_key=api_key)
+
+async def tavily_search_async(query: str, num_results: int = 5, api_key: str = None,
+                              search_depth: str = "advanced") -> Dict[str, Any]:
+    """
+    Versión asíncrona de `tavily_search`.
+    """
+    client = get_async_tavily_client(api_key) if api_key else None
+    if client is None:
+        return await run_blocking(tavily_search, query, num_results, api_key=api_key, search_depth=search_depth)
+
+    # La caché puede leer y escribir en SQLite: se consulta fuera del bucle de eventos
+    search_cache = get_search_cache()
+    cache_key = search_cache_key("tavily", query, num_results, search_depth=search_depth)
+    data = await run_blocking(search_cache.get, cache_key)
+    if data is not None:
+        return data
+
+    search_results = await client.search(
+        query=query, max_results=num_results, search_depth=search_depth, include_answer=True
+    )
+    data = _normalize_tavily(search_results, num_results)
+    await run_blocking(search_cache.set, cache_key, data)
+    return data
+
+def _normalize_tavily(search_results: Dict[str, Any], num_results: int) -> Dict[str, Any]:
+    return {
+        "provider": "tavily",
+        "answer": search_results.get("answer") or None,
+        "results": [
+            {
+                "title": result.get("title", "Sin título"),
+                "url": result.get("url", "Sin URL"),
+                "content": result.get("content", "Sin contenido"),
+                "score": result.get("score", 0)
+            }
+            for result in (search_results.get("results") or [])[:num_results]
+        ]
+    }
+
+def duckduckgo_search(query: str, num_results: int = 5) -> Dict[str, Any]:
+    """
+    Realiza una búsqueda con DuckDuckGo Search, usando la caché de búsquedas.
+
+    Args:
+        query: La consulta a buscar
+        num_results: Número de resultados a devolver
+
+    Returns:
+        Los resultados en el formato común de los proveedores
+    """
+    search_cache = get_search_cache()
+    cache_key = search_cache_key("duckduckgo", query, num_results)
+    data = search_cache.get(cache_key)
+    if data is not None:
+        return data
+
+    # Importamos aquí para evitar problemas de importación si no está disponible
+    from duckduckgo_search import DDGS
+
+    search_results = list(DDGS().text(query, max_results=num_results))
+    data = {
+        "provider": "duckduckgo",
+        "answer": None,
+        "results": [
+            {
+                "title": result.get("title", "Sin título"),
+                "url": result.get("href", "Sin URL"),
+                "content": result.get("body", "Sin contenido"),
+                "score": None
+            }
+            for result in search_results
+        ]
+    }
+    search_cache.set(cache_key, data)
+    return data
+
+async def duckduckgo_search_async(query: str, num_results: int = 5) -> Dict[str, Any]:
+    """
+    Versión asíncrona de `duckduckgo_search` (se ejecuta en el pool de hilos de búsqueda).
+    La caché se consulta una sola vez, dentro de `duckduckgo_search` y fuera del bucle.
+    """
+    return await run_blocking(duckduckgo_search, query, num_results)
+
+def format_search_results(query: str, data: Dict[str, Any], header: str = "Resultados de búsqueda para") -> str:
+    """
+    Formatea los resultados de búsqueda como texto para el modelo.
+
+    Args:
+        query: La consulta buscada
+        data: Los resultados en el formato común de los proveedores
+        header: El encabezado del texto
+
+    Returns:
+        Los resultados formateados como texto
+    """
+    results_text = f"{header}: '{query}'\n\n"
+
+    # Añadir respuesta generada por el proveedor si está disponible
+    if data.get("answer"):
+        results_text += f"RESPUESTA GENERADA:\n{data['answer']}\n\n"
+
+    # Añadir resultados de la búsqueda
+    if data.get("results"):
+        results_text += "FUENTES:\n"
+        for i, result in enumerate(data["results"], 1):
+            results_text += f"{i}. {result['title']}\n   URL: {result['url']}\n"
+            if result.get("score") is not None:
+                results_text += f"   Relevancia: {result['score']:.2f}\n"
+            results_text += f"   {result['content'][:200]}...\n\n"
+    else:
+        results_text += "No se encontraron resultados para esta consulta.\n"
+
+    return results_text
+
+def buscar_en_internet(query: str, num_results: int = 5, api_key: str = None) -> str:
+    """
+    Realiza una búsqueda en internet utilizando Tavily Search API.
+
+    Args:
+        query (str): La consulta a buscar
+        num_results (int): Número de resultados a devolver (default: 5)
+        api_key (str): La API key de Tavily
+
+    Returns:
+        str: Resultados de la búsqueda formateados como texto
+    """
+    try:
+        return format_search_results(query, tavily_search(query, num_results, api_key=api_key))
+    except ImportError:
+        return "Error: La biblioteca tavily-python no está instalada. Instálala con 'pip install tavily-python'."
+    except Exception as e:
+        return f"Error al realizar la búsqueda: {str(e)}"
+
+def buscar_en_duckduckgo(query: str, num_results: int = 5) -> str:
+    """
+    Realiza una búsqueda en internet utilizando DuckDuckGo Search.
+
+    Args:
+        query (str): La consulta a buscar
+        num_results (int): Número de resultados a devolver (default: 5)
+
+    Returns:
+        str: Resultados de la búsqueda formateados como texto
+    """
+    try:
+        return format_search_results(query, duckduckgo_search(query, num_results),
+                                     header="Resultados de búsqueda en DuckDuckGo para")
+    except ImportError:
+        return "Error: La biblioteca duckduckgo-search no está instalada. Instálala con 'pip install duckduckgo-search'."
+    except Exception as e:
+        return f"Error al realizar la búsqueda en DuckDuckGo: {str(e)}"
@@ -0,0 +1,87 @@
+"""
+Bucle de eventos asyncio compartido por todo el proceso.
+
+Todas las ejecuciones asíncronas (agentes PydanticAI, clientes HTTP asíncronos)
+se realizan en un único bucle que corre en un hilo en segundo plano. Así los
+clientes HTTP asíncronos y sus conexiones se pueden compartir entre todas las
+sesiones de Streamlit, que se ejecutan cada una en su propio hilo.
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Iterator, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+# Marca el final de un generador de eventos
+_FIN = object()
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Devuelve el bucle de eventos compartido, creándolo la primera vez.
+
+    Returns:
+        El bucle de eventos que corre en el hilo en segundo plano
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="bucle-asyncio", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+def submit(coro: Coroutine) -> Future:
+    """
+    Programa una corrutina en el bucle compartido sin esperar su resultado.
+
+    Args:
+        coro: La corrutina a ejecutar
+
+    Returns:
+        Un `concurrent.futures.Future` con el resultado de la corrutina
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Ejecuta una corrutina en el bucle compartido y espera su resultado.
+
+    Args:
+        coro: La corrutina a ejecutar
+        timeout: Tiempo máximo de espera en segundos
+
+    Returns:
+        El resultado de la corrutina
+    """
+    return submit(coro).result(timeout=timeout)
+
+def stream_events(producer: Callable[[Callable[[Any], None]], Coroutine]) -> Iterator[Any]:
+    """
+    Ejecuta una corrutina productora en el bucle compartido y entrega sus eventos
+    en el hilo que llama, a medida que se producen.
+
+    La productora recibe una función `emit(evento)` que puede llamarse desde el
+    bucle o desde cualquier otro hilo (por ejemplo, desde una herramienta síncrona).
+
+    Args:
+        producer: Función que recibe `emit` y devuelve la corrutina a ejecutar
+
+    Yields:
+        Los eventos emitidos, en orden. Si la corrutina falla, se relanza su excepción.
+    """
+    events: "queue.Queue[Any]" = queue.Queue()
+    future = submit(producer(events.put))
+    future.add_done_callback(lambda _: events.put(_FIN))
+
+    while True:
+        event = events.get()
+        if event is _FIN:
+            # Relanzar la excepción de la corrutina, si la hubo
+            future.result()
+            return
+        yield event
@@ -0,0 +1,182 @@
+"""
+Cachés genéricas con expiración (TTL) y desalojo LRU.
+Incluye una caché en memoria segura entre hilos y un almacén opcional en SQLite
+que puede usarse como segundo nivel persistente.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+class SQLiteCacheBackend:
+    """
+    Almacén persistente en SQLite con expiración y límite de entradas.
+    Los valores se guardan serializados como JSON.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: Ruta del fichero SQLite
+            max_entries: Número máximo de entradas antes de desalojar las menos usadas
+            ttl: Tiempo de vida de cada entrada en segundos (None para no expirar)
+            clock: Reloj usado para las expiraciones
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor guardado para `key`, o None si no existe o expiró."""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """
+        Devuelve el valor guardado para `key` con su expiración.
+
+        Returns:
+            Una tupla (valor, segundos de vida restantes o None si no expira),
+            o None si la entrada no existe o expiró
+        """
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0]), (row[1] - now if row[1] is not None else None)
+
+    def set(self, key: str, value: Any):
+        """Guarda `value` para `key` y desaloja las entradas sobrantes."""
+        now = self.clock()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires, now)
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Elimina todas las entradas."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+class TTLCache:
+    """
+    Caché en memoria con desalojo LRU y expiración por entrada, segura entre hilos.
+
+    Si se indica un `backend` (por ejemplo `SQLiteCacheBackend`), se usa como segundo
+    nivel: los fallos en memoria se buscan en él y cada escritura se guarda en ambos.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 600,
+                 backend: Optional[SQLiteCacheBackend] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_entries: Número máximo de entradas en memoria
+            ttl: Tiempo de vida de cada entrada en segundos (None para no expirar)
+            backend: Almacén persistente opcional de segundo nivel
+            clock: Reloj usado para las expiraciones
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self.clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Devuelve el valor guardado para `key`, o None si no existe o expiró.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        entry = self.backend.get_entry(key) if self.backend is not None else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # La entrada subida a memoria conserva el tiempo de vida que le queda en el backend
+            value, remaining = entry
+            self._store(key, value, remaining)
+        return value
+
+    def _store(self, key: str, value: Any, remaining: Optional[float] = None):
+        ttl = self.ttl
+        if remaining is not None:
+            ttl = min(ttl, remaining) if ttl else remaining
+        expires = self.clock() + ttl if ttl else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def set(self, key: str, value: Any):
+        """Guarda `value` para `key` en memoria y, si existe, en el backend."""
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def clear(self):
+        """Elimina todas las entradas y reinicia las estadísticas."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve las estadísticas de uso de la caché.
+
+        Returns:
+            Diccionario con aciertos, fallos, tasa de aciertos y número de entradas
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._data),
+                "max_entries": self.max_entries
+            }
@@ -0,0 +1,161 @@
+"""
+Gestión del historial de mensajes de PydanticAI.
+Recorta el historial para que no supere un presupuesto de tokens:
+primero se acortan los resultados de herramientas antiguos y después se
+eliminan los turnos más antiguos, conservando siempre el system prompt.
+"""
+
+import dataclasses
+import json
+from typing import List, Optional, Tuple
+
+from config.settings import (
+    HISTORY_MAX_TOKENS,
+    HISTORY_TOOL_RETURN_MAX_CHARS,
+    MODEL_CONTEXT_WINDOW
+)
+
+# Aproximación habitual: un token equivale a unos 4 caracteres
+CHARS_PER_TOKEN = 4
+
+def history_token_budget(max_tokens: int = 0) -> int:
+    """
+    Calcula el presupuesto de tokens de historial: `HISTORY_MAX_TOKENS`, sin
+    superar lo que queda de la ventana de contexto tras reservar la respuesta.
+
+    Args:
+        max_tokens: Tokens reservados para la respuesta
+
+    Returns:
+        El número máximo de tokens de historial a enviar
+    """
+    return max(min(MODEL_CONTEXT_WINDOW - max_tokens, HISTORY_MAX_TOKENS), 0)
+
+def estimate_tokens(text: str) -> int:
+    """Estima el número de tokens de un texto."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def part_text(part) -> str:
+    """Devuelve el texto de una parte de un mensaje para estimar su tamaño."""
+    content = getattr(part, "content", None)
+    if content is None:
+        # Llamadas a herramientas: contar el nombre y los argumentos
+        args = getattr(part, "args", None)
+        if args is not None and not isinstance(args, str):
+            args = getattr(args, "args_json", None) or getattr(args, "args_dict", args)
+            if not isinstance(args, str):
+                args = json.dumps(args, ensure_ascii=False, default=str)
+        return f"{getattr(part, 'tool_name', '')}{args or ''}"
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+def message_tokens(message) -> int:
+    """Estima los tokens de un mensaje (`ModelRequest` o `ModelResponse`)."""
+    return sum(estimate_tokens(part_text(part)) for part in message.parts)
+
+def history_tokens(messages: list) -> int:
+    """Estima los tokens de todo el historial."""
+    return sum(message_tokens(message) for message in messages)
+
+def _is_user_turn_start(message) -> bool:
+    return getattr(message, "kind", None) == "request" and any(
+        part.part_kind == "user-prompt" for part in message.parts
+    )
+
+def split_turns(messages: list) -> List[list]:
+    """
+    Divide el historial en turnos. Cada turno empieza con una petición que contiene
+    un mensaje del usuario e incluye las llamadas y resultados de herramientas asociados.
+    """
+    turns: List[list] = []
+    for message in messages:
+        if not turns or _is_user_turn_start(message):
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def _truncate_tool_returns(message, max_chars: int):
+    if getattr(message, "kind", None) != "request":
+        return message
+
+    changed = False
+    parts = []
+    for part in message.parts:
+        content = getattr(part, "content", None)
+        if part.part_kind == "tool-return" and isinstance(content, str) and len(content) > max_chars:
+            part = dataclasses.replace(part, content=content[:max_chars] + "... [resultado recortado]")
+            changed = True
+        parts.append(part)
+
+    return dataclasses.replace(message, parts=parts) if changed else message
+
+def with_system_parts(message, system_parts: list):
+    """Devuelve una copia del mensaje cuyo system prompt es `system_parts`."""
+    if not system_parts:
+        return message
+    other_parts = [part for part in message.parts if part.part_kind != "system-prompt"]
+    return dataclasses.replace(message, parts=list(system_parts) + other_parts)
+
+def trim_history(messages: list, budget: int, keep_last_turns: int = 1,
+                 tool_return_max_chars: Optional[int] = None) -> Tuple[list, int]:
+    """
+    Recorta el historial de PydanticAI para que no supere `budget` tokens.
+
+    Primero acorta los resultados de herramientas de los turnos antiguos y, si no es
+    suficiente, elimina los turnos más antiguos. Los últimos `keep_last_turns` turnos
+    nunca se modifican y el system prompt del primer mensaje se conserva siempre.
+
+    Args:
+        messages: El historial de mensajes (`result.all_messages()`)
+        budget: El número máximo de tokens a enviar
+        keep_last_turns: Turnos recientes que no se recortan
+        tool_return_max_chars: Longitud máxima de los resultados de herramientas antiguos
+
+    Returns:
+        Una tupla (historial recortado, tokens estimados del historial)
+    """
+    if not messages:
+        return messages, 0
+
+    total = history_tokens(messages)
+    if total <= budget:
+        return messages, total
+
+    if tool_return_max_chars is None:
+        tool_return_max_chars = HISTORY_TOOL_RETURN_MAX_CHARS
+
+    turns = split_turns(messages)
+    old_count = max(len(turns) - keep_last_turns, 0)
+
+    # 1. Acortar los resultados de herramientas antiguos, del más antiguo al más reciente
+    for turn_index in range(old_count):
+        if total <= budget:
+            break
+        turn = turns[turn_index]
+        for message_index, message in enumerate(turn):
+            trimmed = _truncate_tool_returns(message, tool_return_max_chars)
+            if trimmed is not message:
+                total += message_tokens(trimmed) - message_tokens(message)
+                turn[message_index] = trimmed
+
+    # 2. Eliminar los turnos más antiguos, conservando el system prompt
+    first = messages[0]
+    system_parts = [part for part in first.parts if part.part_kind == "system-prompt"] \
+        if getattr(first, "kind", None) == "request" else []
+    system_tokens = sum(estimate_tokens(part_text(part)) for part in system_parts)
+
+    dropped = 0
+    while total > budget and dropped < old_count:
+        turn_tokens = sum(message_tokens(message) for message in turns[dropped])
+        total -= turn_tokens
+        dropped += 1
+        if dropped == 1:
+            # El system prompt se volverá a añadir al nuevo primer mensaje
+            total += system_tokens
+
+    remaining = [message for turn in turns[dropped:] for message in turn]
+    if dropped and remaining:
+        remaining[0] = with_system_parts(remaining[0], system_parts)
+
+    return remaining, total
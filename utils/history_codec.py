@@ -0,0 +1,152 @@
+"""
+Codificación compacta del historial de PydanticAI.
+
+Cada mensaje se guarda como una línea JSON sin los campos que tienen su valor por
+defecto (la mayoría de los metadatos son nulos o cero), con los nombres de campo
+más frecuentes y los tipos de mensaje y de parte sustituidos por códigos de una
+letra. `CompactHistory` mantiene el historial en memoria como bytes y solo lo
+convierte en objetos de PydanticAI cuando se envía al agente.
+"""
+
+import json
+from typing import Iterable, Iterator, List
+
+# Campo que indica el tipo de mensaje o de parte en la codificación compacta
+KIND_FIELD = "K"
+
+# Tipos de mensaje (`ModelRequest.kind`, `ModelResponse.kind`)
+MESSAGE_KINDS = {"request": "q", "response": "r"}
+
+# Tipos de parte (`part_kind`)
+PART_KINDS = {
+    "system-prompt": "s",
+    "user-prompt": "u",
+    "text": "t",
+    "tool-call": "c",
+    "tool-return": "r",
+    "retry-prompt": "e",
+    "thinking": "h"
+}
+
+# Nombres de campo frecuentes de los mensajes y sus partes. Los códigos van en
+# mayúsculas para no coincidir nunca con un campo real (siempre en minúsculas)
+FIELD_CODES = {
+    "parts": "P",
+    "content": "C",
+    "timestamp": "T",
+    "tool_name": "N",
+    "tool_call_id": "I",
+    "args": "A",
+    "usage": "U",
+    "model_name": "M",
+    "instructions": "S"
+}
+
+_MESSAGE_KIND_NAMES = {code: name for name, code in MESSAGE_KINDS.items()}
+_PART_KIND_NAMES = {code: name for name, code in PART_KINDS.items()}
+_FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+def _compact_fields(data: dict, kind_code: str) -> dict:
+    # Solo se renombran los campos de este nivel; el contenido (p. ej. los argumentos
+    # de una herramienta) se deja tal cual
+    compact = {KIND_FIELD: kind_code}
+    for key, value in data.items():
+        compact[FIELD_CODES.get(key, key)] = value
+    return compact
+
+def _expand_fields(data: dict, kind_field: str, kind_names: dict) -> dict:
+    expanded = {}
+    for key, value in data.items():
+        if key == KIND_FIELD:
+            expanded[kind_field] = kind_names.get(value, value)
+        else:
+            expanded[_FIELD_NAMES.get(key, key)] = value
+    return expanded
+
+def encode_message(message) -> bytes:
+    """
+    Codifica un mensaje de PydanticAI (`ModelRequest` o `ModelResponse`) en una línea JSON compacta.
+    """
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+
+    data = ModelMessagesTypeAdapter.dump_python([message], mode="json", exclude_defaults=True)[0]
+    # Los campos `kind` y `part_kind` tienen valor por defecto, así que se añaden como códigos
+    parts = [
+        _compact_fields(part_data, PART_KINDS.get(part.part_kind, part.part_kind))
+        for part, part_data in zip(message.parts, data.pop("parts", []))
+    ]
+    compact = _compact_fields(data, MESSAGE_KINDS.get(message.kind, message.kind))
+    compact[FIELD_CODES["parts"]] = parts
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _expand_message(data: dict) -> dict:
+    # Las líneas en el formato completo de PydanticAI ya tienen `kind` y se devuelven tal cual
+    if KIND_FIELD not in data:
+        return data
+    message = _expand_fields(data, "kind", _MESSAGE_KIND_NAMES)
+    message["parts"] = [_expand_fields(part, "part_kind", _PART_KIND_NAMES) for part in message.get("parts", [])]
+    return message
+
+def decode_messages(lines: Iterable) -> list:
+    """
+    Reconstruye los mensajes de PydanticAI a partir de sus líneas codificadas.
+    Acepta también mensajes serializados con el formato JSON completo de PydanticAI.
+
+    Args:
+        lines: Las líneas (bytes o str), una por mensaje
+
+    Returns:
+        La lista de mensajes de PydanticAI
+    """
+    data = [_expand_message(json.loads(line)) for line in lines]
+    if not data:
+        return []
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+
+    return ModelMessagesTypeAdapter.validate_python(data)
+
+class CompactHistory:
+    """
+    Historial de PydanticAI guardado como una lista de líneas codificadas (bytes).
+    Añadir mensajes solo codifica los nuevos; los objetos de PydanticAI se crean
+    únicamente al llamar a `decode`.
+    """
+
+    def __init__(self, lines: Iterable[bytes] = ()):
+        self._lines: List[bytes] = list(lines)
+
+    @classmethod
+    def from_messages(cls, messages: Iterable) -> "CompactHistory":
+        """Codifica una lista de mensajes de PydanticAI."""
+        return cls(encode_message(message) for message in messages)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._lines)
+
+    def append(self, messages: Iterable):
+        """Codifica y añade mensajes de PydanticAI al final del historial."""
+        self._lines.extend(encode_message(message) for message in messages)
+
+    def replace(self, index: int, message):
+        """Sustituye el mensaje de la posición `index`."""
+        self._lines[index] = encode_message(message)
+
+    def decode(self) -> list:
+        """Devuelve los mensajes de PydanticAI del historial."""
+        return decode_messages(self._lines)
+
+    def nbytes(self) -> int:
+        """Tamaño total de las líneas codificadas, en bytes."""
+        return sum(len(line) for line in self._lines)
+
+    def to_bytes(self) -> bytes:
+        """El historial en formato JSON lines (una línea por mensaje)."""
+        return b"\n".join(self._lines)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactHistory":
+        """Carga un historial en formato JSON lines sin decodificar sus mensajes."""
+        return cls(line for line in data.split(b"\n") if line)
@@ -0,0 +1,57 @@
+"""
+Clientes HTTP compartidos por todo el proceso.
+
+Los clientes de Groq (síncrono y asíncrono) de todas las sesiones reutilizan el
+mismo pool de conexiones, evitando abrir un pool y un handshake TLS por sesión.
+El cliente asíncrono debe usarse solo desde el bucle de `utils.async_runner`.
+"""
+
+import threading
+from typing import TYPE_CHECKING
+
+from config.settings import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_TIMEOUT
+
+if TYPE_CHECKING:
+    import httpx
+
+_sync_client = None
+_async_client = None
+_lock = threading.Lock()
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+def get_shared_http_client() -> "httpx.Client":
+    """
+    Devuelve el cliente HTTP síncrono compartido, creándolo la primera vez.
+
+    Returns:
+        Un `httpx.Client` con pool de conexiones compartido
+    """
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            import httpx
+
+            _sync_client = httpx.Client(limits=_limits(), timeout=HTTP_TIMEOUT)
+        return _sync_client
+
+def get_shared_async_http_client() -> "httpx.AsyncClient":
+    """
+    Devuelve el cliente HTTP asíncrono compartido, creándolo la primera vez.
+
+    Returns:
+        Un `httpx.AsyncClient` con pool de conexiones compartido
+    """
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            import httpx
+
+            _async_client = httpx.AsyncClient(limits=_limits(), timeout=HTTP_TIMEOUT)
+        return _async_client
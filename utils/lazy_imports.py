@@ -0,0 +1,27 @@
+"""
+Comprobación de dependencias opcionales sin importarlas.
+
+`app.py` se vuelve a ejecutar en cada interacción de Streamlit, así que las
+comprobaciones se guardan una vez por proceso. Las dependencias pesadas
+(pydantic_ai, tavily, duckduckgo_search, groq, numpy) se importan dentro de
+las funciones que las usan, la primera vez que se necesitan.
+"""
+
+import functools
+import importlib.util
+
+@functools.lru_cache(maxsize=None)
+def is_available(module_name: str) -> bool:
+    """
+    Indica si un módulo está instalado, sin importarlo.
+
+    Args:
+        module_name: El nombre del módulo de nivel superior (p. ej. "tavily")
+
+    Returns:
+        True si el módulo se puede importar
+    """
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
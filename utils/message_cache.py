@@ -0,0 +1,72 @@
+"""
+Caché del HTML renderizado de los mensajes del historial.
+Cada mensaje guarda su HTML junto a un hash de su contenido, de modo que en cada
+rerun de Streamlit solo se renderizan los mensajes nuevos o modificados.
+"""
+
+import hashlib
+from typing import Dict
+
+from styles.styling import CUSTOM_CSS
+from utils.rendering import TEMPLATE_VERSION, escape_html, render_user_html, strip_html_patterns
+from utils.streaming import render_text_html
+
+# Cambia cuando cambian las plantillas o el CSS, invalidando todo el HTML cacheado
+RENDER_VERSION = hashlib.sha1(f"{TEMPLATE_VERSION}\0{CUSTOM_CSS}".encode("utf-8")).hexdigest()[:12]
+
+# Clave del mensaje donde se guarda la tupla (hash, html)
+HTML_CACHE_KEY = "html_cache"
+
+def render_message_html(message: Dict[str, str]) -> str:
+    """
+    Genera el HTML de un mensaje del historial.
+
+    Args:
+        message: Diccionario con las claves "role" y "content"
+
+    Returns:
+        El bloque HTML del mensaje
+    """
+    content = message["content"]
+
+    if message["role"] == "user":
+        return render_user_html(escape_html(content))
+
+    # Limpiar cualquier etiqueta HTML incorrecta antes de buscar el razonamiento
+    clean_content = strip_html_patterns(content)
+
+    # Aceptar también etiquetas <think> que llegaron ya escapadas
+    if "<think>" not in clean_content and "&lt;think&gt;" in clean_content and "&lt;/think&gt;" in clean_content:
+        clean_content = clean_content.replace("&lt;think&gt;", "<think>", 1).replace("&lt;/think&gt;", "</think>", 1)
+
+    return render_text_html(clean_content)
+
+def message_cache_key(message: Dict[str, str]) -> str:
+    """
+    Calcula la clave de caché de un mensaje a partir de su rol, contenido y la versión de render.
+    """
+    digest = hashlib.sha1()
+    digest.update(RENDER_VERSION.encode("utf-8"))
+    digest.update(message["role"].encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(message["content"].encode("utf-8"))
+    return digest.hexdigest()
+
+def get_message_html(message: Dict[str, str]) -> str:
+    """
+    Devuelve el HTML de un mensaje, renderizándolo solo si no está cacheado o cambió.
+
+    Args:
+        message: Diccionario del mensaje; se le añade la clave `HTML_CACHE_KEY`
+
+    Returns:
+        El bloque HTML del mensaje
+    """
+    key = message_cache_key(message)
+    cached = message.get(HTML_CACHE_KEY)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    html = render_message_html(message)
+    message[HTML_CACHE_KEY] = (key, html)
+    return html
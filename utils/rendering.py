@@ -0,0 +1,150 @@
+"""
+Funciones para generar el HTML de los mensajes del chat.
+"""
+
+# Versión de las plantillas HTML; incrementarla invalida el HTML cacheado de los mensajes
+TEMPLATE_VERSION = "1"
+
+# Fragmentos HTML que pueden colarse por error en las respuestas del modelo
+HTML_PATTERNS = [
+    "</div>", 
+    '<div class="chat-text">', 
+    '<div class=', 
+    '</div>', 
+    '<span', 
+    '</span>'
+]
+
+def escape_html(text: str) -> str:
+    """
+    Escapa los caracteres especiales HTML de un texto para mostrarlo en la UI.
+
+    Args:
+        text: El texto a escapar
+
+    Returns:
+        El texto con '<' y '>' escapados
+    """
+    return text.replace("<", "&lt;").replace(">", "&gt;")
+
+def strip_html_patterns(text: str) -> str:
+    """
+    Elimina de un texto los fragmentos HTML incorrectos de `HTML_PATTERNS`.
+
+    Args:
+        text: El texto a limpiar
+
+    Returns:
+        El texto limpio (sin espacios al inicio y al final si se eliminó algo)
+    """
+    if not any(pattern in text for pattern in HTML_PATTERNS):
+        return text
+    for pattern in HTML_PATTERNS:
+        text = text.replace(pattern, '')
+    return text.strip()
+
+def render_user_html(safe_content: str, header: str = "Tú:") -> str:
+    """
+    Genera el HTML de un mensaje del usuario.
+
+    Args:
+        safe_content: El contenido ya escapado
+        header: El encabezado del mensaje
+
+    Returns:
+        El bloque HTML del mensaje
+    """
+    return f"""
+        <div class="chat-container user-message">
+            <div class="user-header">{header}</div>
+            <div class="chat-text">{safe_content}</div>
+        </div>
+        """
+
+def render_assistant_html(safe_answer: str, safe_thinking: str = "", has_thinking: bool = False,
+                          thinking_closed: bool = True) -> str:
+    """
+    Genera el HTML de un mensaje del asistente, con sección de razonamiento opcional.
+
+    Args:
+        safe_answer: La respuesta ya escapada
+        safe_thinking: El razonamiento ya escapado
+        has_thinking: Si el mensaje contiene una sección de razonamiento
+        thinking_closed: Si la etiqueta </think> ya se ha recibido
+
+    Returns:
+        El bloque HTML del mensaje
+    """
+    if not has_thinking:
+        return f"""
+        <div class="chat-container assistant-message">
+            <div class="assistant-header">
+                Asistente:
+            </div>
+            <div class="chat-text">{safe_answer}</div>
+        </div>
+        """
+
+    # Si el razonamiento terminó sin respuesta, añadir un mensaje predeterminado
+    if not safe_answer and thinking_closed:
+        safe_answer = "El modelo proporcionó sólo su razonamiento."
+
+    return f"""
+        <div class="chat-container assistant-message">
+            <div class="assistant-header">
+                Asistente:
+            </div>
+            <div class="reasoning-section">
+                <div class="thinking-title">Razonamiento:</div>
+                <div class="reasoning-content">{safe_thinking}</div>
+            </div>
+            <div class="chat-text">{safe_answer}</div>
+        </div>
+        """
+
+def history_window(messages: list, visible_count: int):
+    """
+    Selecciona los últimos mensajes del historial que se deben mostrar.
+
+    Args:
+        messages: La lista completa de mensajes
+        visible_count: Número máximo de mensajes a mostrar
+
+    Returns:
+        Una tupla (número de mensajes ocultos, lista de mensajes visibles)
+    """
+    hidden_count = max(len(messages) - visible_count, 0)
+    return hidden_count, messages[hidden_count:]
+
+def summarize_hidden_messages(messages: list, hidden_count: int, max_items: int = 10,
+                              max_chars: int = 80) -> str:
+    """
+    Genera un resumen breve en Markdown de los mensajes ocultos del historial.
+    Solo se listan las últimas `max_items` preguntas del usuario para que el coste
+    no crezca con la longitud de la conversación.
+
+    Args:
+        messages: La lista completa de mensajes
+        hidden_count: Número de mensajes ocultos al inicio de la lista
+        max_items: Número máximo de preguntas a listar
+        max_chars: Longitud máxima de cada pregunta
+
+    Returns:
+        El resumen en formato Markdown
+    """
+    items = []
+    for message in reversed(messages[max(hidden_count - 2 * max_items, 0):hidden_count]):
+        if message["role"] != "user":
+            continue
+        content = " ".join(message["content"].split())
+        if len(content) > max_chars:
+            content = content[:max_chars] + "..."
+        items.append(f"- {escape_html(content)}")
+        if len(items) >= max_items:
+            break
+
+    turns = (hidden_count + 1) // 2
+    summary = f"{hidden_count} mensajes anteriores (~{turns} turnos) ocultos."
+    if items:
+        summary += " Últimas preguntas ocultas:\n\n" + "\n".join(reversed(items))
+    return summary
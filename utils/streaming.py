@@ -0,0 +1,180 @@
+"""
+Utilidades para procesar respuestas en streaming.
+Incluye un parser incremental de etiquetas <think> que solo procesa el fragmento nuevo
+y un planificador que limita la frecuencia de redibujado del placeholder.
+"""
+
+import time
+from typing import Callable, List
+
+from utils.rendering import escape_html, render_assistant_html
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+def _partial_tag_suffix(text: str, tag: str) -> int:
+    """
+    Calcula la longitud del sufijo más largo de `text` que es prefijo de `tag`.
+    Sirve para no emitir una etiqueta que llega partida entre dos fragmentos.
+    """
+    max_len = min(len(text), len(tag) - 1)
+    for length in range(max_len, 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+class ThinkTagParser:
+    """
+    Parser incremental de etiquetas <think> para respuestas en streaming.
+
+    Cada llamada a `feed` procesa únicamente el fragmento recibido, por lo que el
+    coste por fragmento es proporcional a su longitud y no a la de toda la respuesta.
+    Mantiene por separado el razonamiento y la respuesta, ya escapados para HTML.
+    """
+
+    def __init__(self):
+        self._thinking_parts: List[str] = []
+        self._answer_parts: List[str] = []
+        self._pending = ""
+        self.has_thinking = False
+        self.thinking_closed = False
+
+    @property
+    def inside_think(self) -> bool:
+        """Indica si el texto recibido actualmente pertenece al razonamiento."""
+        return self.has_thinking and not self.thinking_closed
+
+    def _emit(self, text: str):
+        if not text:
+            return
+        if self.inside_think:
+            self._thinking_parts.append(escape_html(text))
+        else:
+            self._answer_parts.append(escape_html(text))
+
+    def feed(self, delta: str):
+        """
+        Procesa un nuevo fragmento de la respuesta.
+
+        Args:
+            delta: El texto nuevo recibido del modelo
+        """
+        text = self._pending + delta
+        self._pending = ""
+
+        while text:
+            # Solo se reconoce el primer bloque <think>...</think>, como en el historial
+            if self.thinking_closed:
+                self._emit(text)
+                return
+
+            tag = THINK_CLOSE if self.inside_think else THINK_OPEN
+            index = text.find(tag)
+            if index >= 0:
+                self._emit(text[:index])
+                if self.inside_think:
+                    self.thinking_closed = True
+                else:
+                    self.has_thinking = True
+                    # Descartar lo anterior a <think> (normalmente espacios)
+                    self._answer_parts.clear()
+                text = text[index + len(tag):]
+            else:
+                # Guardar un posible inicio de etiqueta para el siguiente fragmento
+                pending_len = _partial_tag_suffix(text, tag)
+                self._emit(text[:len(text) - pending_len])
+                self._pending = text[len(text) - pending_len:]
+                return
+
+    def finish(self):
+        """Emite cualquier texto pendiente al terminar el streaming."""
+        pending, self._pending = self._pending, ""
+        self._emit(pending)
+
+    @property
+    def safe_thinking(self) -> str:
+        """El razonamiento recibido hasta ahora, escapado para HTML."""
+        return "".join(self._thinking_parts).strip()
+
+    @property
+    def safe_answer(self) -> str:
+        """La respuesta recibida hasta ahora, escapada para HTML."""
+        return "".join(self._answer_parts).strip()
+
+    def render_html(self) -> str:
+        """
+        Genera el HTML del mensaje del asistente con el estado actual del parser.
+
+        Returns:
+            El bloque HTML listo para `placeholder.markdown`
+        """
+        return render_assistant_html(
+            self.safe_answer,
+            self.safe_thinking,
+            has_thinking=self.has_thinking,
+            thinking_closed=self.thinking_closed
+        )
+
+class RenderScheduler:
+    """
+    Limita la frecuencia con la que se redibuja un placeholder de Streamlit.
+
+    Los fragmentos recibidos solo marcan el estado como pendiente; el HTML se genera
+    y se envía como mucho `max_fps` veces por segundo, siempre con el último estado.
+    `flush` fuerza el dibujado final para no perder los últimos fragmentos y
+    `flush_pending` dibuja lo retenido antes de una pausa del stream (p. ej. mientras
+    se ejecuta una herramienta), ya que no hay temporizador que dibuje el último frame.
+    """
+
+    def __init__(self, placeholder, render: Callable[[], str], max_fps: float = 15,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            placeholder: El contenedor de Streamlit donde se dibuja (p. ej. `st.empty()`)
+            render: Función sin argumentos que genera el HTML del estado actual
+            max_fps: Número máximo de redibujados por segundo (0 o menos desactiva el límite)
+            clock: Reloj monotónico usado para medir los intervalos
+        """
+        self.placeholder = placeholder
+        self.render = render
+        self.min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.clock = clock
+        self._last_render = None
+        self._dirty = False
+        self.renders = 0
+
+    def _draw(self):
+        self.placeholder.markdown(self.render(), unsafe_allow_html=True)
+        self._last_render = self.clock()
+        self._dirty = False
+        self.renders += 1
+
+    def notify(self):
+        """Marca que hay contenido nuevo y redibuja solo si ya toca un nuevo frame."""
+        self._dirty = True
+        if self._last_render is None or self.clock() - self._last_render >= self.min_interval:
+            self._draw()
+
+    def flush(self):
+        """Fuerza el dibujado del último estado, haya o no cambios pendientes."""
+        self._draw()
+
+    def flush_pending(self):
+        """Dibuja el último estado solo si hay cambios que aún no se han dibujado."""
+        if self._dirty:
+            self._draw()
+
+def render_text_html(text: str) -> str:
+    """
+    Genera el HTML de una respuesta completa del asistente.
+
+    Args:
+        text: El texto completo de la respuesta, con posibles etiquetas <think>
+
+    Returns:
+        El bloque HTML del mensaje
+    """
+    parser = ThinkTagParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.render_html()
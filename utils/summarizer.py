@@ -0,0 +1,142 @@
+"""
+Resumen progresivo de los turnos antiguos del historial de PydanticAI.
+El resumen se genera en un hilo en segundo plano entre turnos del usuario y se
+aplica al inicio del turno siguiente, sustituyendo los turnos más antiguos por
+un único mensaje de sistema con el resumen.
+"""
+
+import dataclasses
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from config.settings import SUMMARY_KEEP_TURNS, SUMMARY_MAX_TOKENS, SUMMARY_MODEL
+from utils.history import part_text, with_system_parts, split_turns
+
+SUMMARY_PREFIX = "Resumen de la conversación anterior:"
+
+SUMMARY_INSTRUCTIONS = ("Resume de forma concisa la siguiente conversación entre un usuario y un "
+                        "asistente. Conserva los datos, nombres, decisiones y preguntas pendientes "
+                        "que puedan ser útiles más adelante. Responde solo con el resumen, en español.")
+
+# Hilos compartidos por todas las sesiones para generar los resúmenes
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="resumen-historial")
+
+class SummaryJob:
+    """
+    Resumen en curso de los primeros `message_count` mensajes del historial.
+    """
+
+    def __init__(self, future: Future, message_count: int, last_message):
+        self.future = future
+        self.message_count = message_count
+        self.last_message = last_message
+
+    def done(self) -> bool:
+        """Indica si el resumen ya terminó (con éxito o con error)."""
+        return self.future.done()
+
+def _is_summary_part(part) -> bool:
+    return part.part_kind == "system-prompt" and str(part.content).startswith(SUMMARY_PREFIX)
+
+def history_to_text(messages: list) -> str:
+    """
+    Convierte una parte del historial en texto plano para resumirla.
+    Se incluye el resumen previo, si existe, pero no el system prompt.
+    """
+    lines: List[str] = []
+    for message in messages:
+        for part in message.parts:
+            kind = part.part_kind
+            if kind == "system-prompt":
+                if _is_summary_part(part):
+                    lines.append(str(part.content))
+            elif kind == "user-prompt":
+                lines.append(f"Usuario: {part_text(part)}")
+            elif kind == "text":
+                lines.append(f"Asistente: {part_text(part)}")
+            elif kind == "tool-return":
+                lines.append(f"Resultado de {part.tool_name}: {part_text(part)[:500]}")
+    return "\n".join(lines)
+
+def _summarize(client, model: str, transcript: str) -> str:
+    completion = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": transcript}
+        ],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
+    return completion.choices[0].message.content.strip()
+
+def start_summary(messages: list, client, model: str = SUMMARY_MODEL,
+                  keep_turns: int = SUMMARY_KEEP_TURNS) -> Optional[SummaryJob]:
+    """
+    Lanza en segundo plano el resumen de los turnos antiguos del historial.
+
+    Args:
+        messages: El historial de mensajes de PydanticAI
+        client: El cliente Groq configurado
+        model: El modelo usado para resumir
+        keep_turns: Turnos recientes que no se resumen
+
+    Returns:
+        El trabajo en curso, o None si no hay turnos suficientes para resumir
+    """
+    if not client:
+        return None
+
+    turns = split_turns(messages)
+    if len(turns) <= keep_turns:
+        return None
+
+    old_messages = [message for turn in turns[:-keep_turns] for message in turn]
+    transcript = history_to_text(old_messages)
+    if not transcript:
+        return None
+
+    future = _executor.submit(_summarize, client, model, transcript)
+    return SummaryJob(future, len(old_messages), old_messages[-1])
+
+def _make_summary_part(summary: str, template):
+    content = f"{SUMMARY_PREFIX} {summary}"
+    if template is not None:
+        changes = {"content": content}
+        if "dynamic_ref" in {field.name for field in dataclasses.fields(template)}:
+            changes["dynamic_ref"] = None
+        return dataclasses.replace(template, **changes)
+
+    from pydantic_ai.messages import SystemPromptPart
+    return SystemPromptPart(content=content)
+
+def apply_summary(messages: list, job: SummaryJob) -> list:
+    """
+    Sustituye los mensajes resumidos por el resumen, si el trabajo terminó con éxito
+    y el historial no cambió en la parte resumida.
+
+    Args:
+        messages: El historial de mensajes actual
+        job: El trabajo de resumen terminado
+
+    Returns:
+        El historial con los turnos antiguos resumidos, o el original si no se pudo aplicar
+    """
+    try:
+        summary = job.future.result(timeout=0)
+    except Exception:
+        return messages
+
+    count = job.message_count
+    if not summary or len(messages) <= count or messages[count - 1] != job.last_message:
+        return messages
+
+    first = messages[0]
+    system_parts = [part for part in first.parts if part.part_kind == "system-prompt"] \
+        if getattr(first, "kind", None) == "request" else []
+    base_parts = [part for part in system_parts if not _is_summary_part(part)]
+    template = system_parts[0] if system_parts else None
+
+    remaining = list(messages[count:])
+    remaining[0] = with_system_parts(remaining[0], base_parts + [_make_summary_part(summary, template)])
+    return remaining